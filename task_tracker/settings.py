@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
 import os
 import sys
 from datetime import timedelta
@@ -53,11 +54,27 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
-    "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("users.authentication.CachedJWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
+    "DEFAULT_RENDERER_CLASSES": [
+        "tasks.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
+# MessagePack (Accept / Content-Type: application/msgpack) подключается, если установлен пакет msgpack
+if importlib.util.find_spec("msgpack"):
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].append("tasks.renderers.MessagePackRenderer")
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"].append("tasks.renderers.MessagePackParser")
+
 MIDDLEWARE = [
+    "tasks.metrics.MetricsMiddleware",
+    "tasks.instrumentation.ServerTimingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -66,6 +83,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "tasks.profiling.ProfilingMiddleware",
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True  # Разрешает все домены (только для разработки!)
@@ -174,3 +192,47 @@ SIMPLE_JWT = {
 AUTH_USER_MODEL = "users.User"
 
 CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://redis:6379/1"}}
+
+if "test" in sys.argv:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Время жизни пользователя в общем кэше и в кэше процесса при JWT-аутентификации, в секундах
+USER_CACHE_TIMEOUT = 60
+USER_LOCAL_CACHE_TIMEOUT = 5
+
+# Время жизни закэшированных ответов busy_employees и important_tasks, в секундах
+TASKS_CACHE_TIMEOUT = 300
+
+# Срок хранения отметок об удалении задач (команда prune_tombstones). Токены синхронизации старше него отклоняются
+TASK_TOMBSTONE_RETENTION = timedelta(days=30)
+
+# Выгрузки pending и running без изменений дольше EXPORT_STALE_TIMEOUT секунд отмечаются ошибкой командой
+# fail_stale_exports (периодически и с --timeout 0 при запуске web): их поток пропал вместе с процессом
+EXPORT_STALE_TIMEOUT = 600
+
+# Заголовок Server-Timing с количеством и временем SQL-запросов и временем этапов обработки запроса.
+# Запросы дольше SLOW_REQUEST_THRESHOLD секунд пишутся в лог с SLOW_REQUEST_SQL_COUNT самыми медленными SQL
+SERVER_TIMING_ENABLED = True
+SLOW_REQUEST_THRESHOLD = 0.5
+SLOW_REQUEST_SQL_COUNT = 5
+
+if "test" in sys.argv:
+    # Регистрация хэширует пароль дольше порога и засоряла бы вывод тестов; журнал проверяется с явным порогом
+    SLOW_REQUEST_THRESHOLD = 10
+
+# Метрики Prometheus на /metrics. В нескольких процессах задайте переменную окружения PROMETHEUS_MULTIPROC_DIR.
+# Каталог должен быть общим для всех процессов, в том числе для web и web-async: /metrics отдает web, а метрики
+# воркеров uvicorn попадают в него через общий том prometheus_data. Каталог очищается один раз при запуске
+# (сервис metrics-init в docker-compose.yaml), а не каждым сервисом.
+# /metrics требует заголовок Authorization: Bearer <METRICS_TOKEN>, без METRICS_TOKEN метрики закрыты.
+# Открыть их без токена можно только явно, переменной окружения METRICS_PUBLIC=1
+METRICS_ENABLED = True
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC") in ("1", "true")
+
+# Профилирование запроса сотрудника по заголовку X-Profile или параметру ?profile= (cprofile, sample или 1).
+# Хранятся PROFILING_MAX_PROFILES последних профилей, стек для sample снимается раз в PROFILING_SAMPLE_INTERVAL секунд
+PROFILING_ENABLED = True
+PROFILING_DIR = BASE_DIR / "profiles"
+PROFILING_MAX_PROFILES = 50
+PROFILING_SAMPLE_INTERVAL = 0.005
@@ -21,6 +21,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from tasks.views import metrics
+
 schema_view = get_schema_view(
     openapi.Info(
         title="TaskTracker API Documentation",
@@ -36,6 +38,8 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("users.urls", namespace="users")),
     path("", include("tasks.urls", namespace="tasks")),
+    # метрики Prometheus
+    path("metrics", metrics, name="metrics"),
     # документация
     path("swagger/", schema_view.with_ui("swagger", cache_timeout=0), name="schema-swagger-ui"),
     path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
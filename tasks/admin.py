@@ -1,11 +1,11 @@
 from django.contrib import admin
 
-from tasks.models import Employee, Task
+from tasks.models import Employee, ExportJob, Task
 
 
 @admin.register(Employee)
 class EmployeeAdmin(admin.ModelAdmin):
-    list_display = ("id", "fullname", "position")
+    list_display = ("id", "fullname", "position", "active_tasks_count")
     list_filter = ("fullname",)
     search_fields = ("fullname", "position")
 
@@ -15,3 +15,9 @@ class TaskAdmin(admin.ModelAdmin):
     list_display = ("id", "name", "description", "parent_task", "executor", "period", "status")
     list_filter = ("name", "executor", "status")
     search_fields = ("name", "executor", "status")
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "format", "status", "processed_rows", "total_rows", "created_by", "created_at")
+    list_filter = ("kind", "status")
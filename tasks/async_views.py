@@ -0,0 +1,120 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from rest_framework.exceptions import APIException, AuthenticationFailed, MethodNotAllowed, NotAuthenticated, NotFound
+
+from users.authentication import AsyncJWTAuthentication
+
+from .cache import acached_response
+from .instrumentation import timing
+from .mixins import get_sparse_fields, narrow_queryset
+from .models import Employee, Task
+from .paginators import EmployeePagination, TaskPagination
+from .renderers import ORJSONRenderer
+from .serializers import EmployeeSerializer, ImportantTaskSerializer, TaskSerializer
+from .services import search_employee
+from .views import BusyEmployeesAPIView, EmployeeViewSet, ImportantTasksViewSet, TaskViewSet
+
+
+def render(data, status=200):
+    return HttpResponse(ORJSONRenderer().render(data), status=status, content_type="application/json")
+
+
+def async_api_view(view):
+    """Асинхронное представление только для чтения с JWT-аутентификацией.
+
+    Представление возвращает данные ответа, ошибки возвращаются в формате DRF.
+    Пользователь загружается через async ORM, поэтому запрос не занимает поток на время ожидания базы.
+    """
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        authenticator = AsyncJWTAuthentication()
+        try:
+            if request.method != "GET":
+                raise MethodNotAllowed(request.method)
+
+            credentials = await authenticator.aauthenticate(request)
+            if credentials is None:
+                raise NotAuthenticated()
+            request.user, request.auth = credentials
+
+            return render(await view(request, *args, **kwargs))
+        except Http404 as exc:
+            return handle_exception(request, NotFound(str(exc)), authenticator)
+        except APIException as exc:
+            return handle_exception(request, exc, authenticator)
+
+    return wrapper
+
+
+def handle_exception(request, exc, authenticator):
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    response = render(data, status=exc.status_code)
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        response.headers["WWW-Authenticate"] = authenticator.authenticate_header(request)
+    return response
+
+
+@async_api_view
+async def task_list(request):
+    """Асинхронный список задач."""
+    fields, expand = get_sparse_fields(request, TaskSerializer)
+    paginator = TaskPagination()
+    queryset = narrow_queryset(TaskViewSet.queryset, TaskSerializer, fields, expand, required=paginator.ordering)
+    tasks = await paginator.apaginate_queryset(queryset, request)
+    return paginator.get_paginated_data(TaskSerializer(tasks, many=True, fields=fields, expand=expand).data)
+
+
+@async_api_view
+async def task_detail(request, pk):
+    """Асинхронное получение задачи."""
+    fields, expand = get_sparse_fields(request, TaskSerializer)
+    task = await aget_object_or_404(narrow_queryset(Task.objects.all(), TaskSerializer, fields, expand), pk=pk)
+    return TaskSerializer(task, fields=fields, expand=expand).data
+
+
+@async_api_view
+async def employee_list(request):
+    """Асинхронный список сотрудников с задачами."""
+    fields, expand = get_sparse_fields(request, EmployeeSerializer)
+    paginator = EmployeePagination()
+    queryset = narrow_queryset(
+        EmployeeViewSet.queryset, EmployeeSerializer, fields, expand, required=paginator.ordering
+    )
+    employees = await paginator.apaginate_queryset(queryset, request)
+    return paginator.get_paginated_data(EmployeeSerializer(employees, many=True, fields=fields, expand=expand).data)
+
+
+@async_api_view
+async def busy_employees(request):
+    """Асинхронный список занятых сотрудников."""
+    fields, expand = get_sparse_fields(request, EmployeeSerializer)
+
+    async def build():
+        queryset = narrow_queryset(BusyEmployeesAPIView().get_queryset(), EmployeeSerializer, fields, expand)
+        employees = [employee async for employee in queryset]
+        return EmployeeSerializer(employees, many=True, fields=fields, expand=expand).data
+
+    return await acached_response("busy_employees", request, build)
+
+
+@async_api_view
+async def important_tasks(request):
+    """Асинхронный список важных задач с рекомендованными сотрудниками."""
+
+    async def build():
+        queryset = ImportantTasksViewSet().get_queryset()
+        if not await queryset.aexists():
+            return {"message": "Важные задачи не найдены", "important_tasks": []}
+
+        with timing("search"):
+            recommended_employees = await sync_to_async(search_employee)(queryset, Employee.objects.all())
+        tasks = [task async for task in queryset]
+        context = {"recommended_employees": recommended_employees}
+        with timing("serialize"):
+            return ImportantTaskSerializer(tasks, many=True, context=context).data
+
+    return await acached_response("important_tasks", request, build)
@@ -0,0 +1,380 @@
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .cache import bump_generation
+from .models import Employee, Task
+from .renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+from .serializers import TaskSerializer, ValuesSerializer
+from .services import delete_task_subtree, search_employee
+from .synthetic import seed_synthetic
+
+# Эндпоинты чтения, которые замеряет сценарий endpoints
+ENDPOINTS = {
+    "tasks": "/tasks/",
+    "employees": "/employees/",
+    "busy_employees": "/busy_employees/",
+    "important_tasks": "/important_tasks/",
+}
+
+# Суффиксы метрик, для которых ухудшение - рост значения, и метрик, для которых ухудшение - снижение
+HIGHER_IS_WORSE = ("_seconds", "_ms", "_queries", "_kb", "_bytes")
+LOWER_IS_WORSE = ("_per_second", "speedup")
+
+
+@contextmanager
+def rollback_atomic():
+    """Выполняет блок в транзакции, которая всегда откатывается."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+@contextmanager
+def timer(results, key):
+    """Записывает время выполнения блока в секундах в results[key]."""
+    start = time.perf_counter()
+    yield
+    results[key] = round(time.perf_counter() - start, 4)
+
+
+def bench_search_employee(tasks=10_000, employees=2_000):
+    """Замер рекомендаций сотрудников для tasks важных задач и employees сотрудников."""
+    results = {"tasks": tasks, "employees": employees}
+    period = timezone.now() + timedelta(days=7)
+
+    with rollback_atomic():
+        staff = Employee.objects.bulk_create(
+            Employee(fullname=f"Employee {i}", position="Bench") for i in range(employees)
+        )
+        parents = Task.objects.bulk_create(
+            Task(name=f"Parent {i}", period=period, status="In Progress", executor=staff[i % employees])
+            for i in range(max(tasks // 10, 1))
+        )
+        Task.objects.bulk_create(
+            Task(name=f"Important {i}", period=period, status="Open", parent_task=parents[i % len(parents)])
+            for i in range(tasks)
+        )
+
+        employees_stats = Employee.objects.all()
+        important_tasks = Task.objects.filter(
+            status="Open", parent_task__isnull=False, parent_task__status="In Progress"
+        )
+
+        with timer(results, "seconds"):
+            recommended_employees = search_employee(important_tasks, employees_stats)
+
+        results["recommended"] = len(recommended_employees)
+
+    return results
+
+
+def get_api_client():
+    """Клиент API, авторизованный временным пользователем."""
+    client = APIClient()
+    client.force_authenticate(user=get_user_model().objects.create(username="bench"))
+    return client
+
+
+def bench_bulk_create(tasks=1_000):
+    """Сравнение создания tasks задач по одной через tasks/create/ и одним запросом через tasks/bulk_create/."""
+    results = {"tasks": tasks}
+    period = (timezone.now() + timedelta(days=7)).isoformat()
+
+    with rollback_atomic():
+        client = get_api_client()
+        executor = Employee.objects.create(fullname="Employee", position="Bench")
+        items = [{"name": f"Task {i}", "period": period, "executor": executor.id} for i in range(tasks)]
+
+        with timer(results, "per_item_seconds"):
+            for item in items:
+                client.post("/tasks/create/", data=item, format="json")
+
+        with timer(results, "bulk_seconds"):
+            client.post("/tasks/bulk_create/", data=items, format="json")
+
+    results["per_item_rows_per_second"] = round(tasks / results["per_item_seconds"])
+    results["bulk_rows_per_second"] = round(tasks / results["bulk_seconds"])
+    return results
+
+
+def walk_subtree(task):
+    """Обход поддерева по related_tasks: один запрос на каждую задачу."""
+    count = 1
+    for child in task.related_tasks.all():
+        count += walk_subtree(child)
+    return count
+
+
+def bench_task_tree(width=10_000, depth=50):
+    """Сравнение рекурсивного запроса поддерева с обходом по уровням на широком и глубоком дереве."""
+    results = {"width": width, "depth": depth}
+    period = timezone.now() + timedelta(days=7)
+
+    with rollback_atomic():
+        wide_root = Task.objects.create(name="Wide root", period=period)
+        Task.objects.bulk_create(Task(name=f"Leaf {i}", period=period, parent_task=wide_root) for i in range(width))
+
+        deep_root = parent = Task.objects.create(name="Deep root", period=period)
+        for i in range(depth):
+            parent = Task.objects.create(name=f"Level {i}", period=period, parent_task=parent)
+
+        for name, root in (("wide", wide_root), ("deep", deep_root)):
+            with timer(results, f"{name}_cte_seconds"):
+                len(list(Task.objects.subtree(root.pk)))
+            with timer(results, f"{name}_walk_seconds"):
+                walk_subtree(root)
+
+        with timer(results, "deep_ancestors_seconds"):
+            len(list(Task.objects.ancestors(parent.pk)))
+
+    return results
+
+
+def create_task_tree(descendants, branches=100):
+    """Создает корневую задачу с branches подзадачами, у каждой из которых есть свои подзадачи."""
+    period = timezone.now() + timedelta(days=7)
+    executor = Employee.objects.create(fullname="Employee", position="Bench")
+
+    root = Task.objects.create(name="Root", period=period, executor=executor)
+    level1 = Task.objects.bulk_create(
+        Task(name=f"Branch {i}", period=period, parent_task=root, executor=executor) for i in range(branches)
+    )
+    Task.objects.bulk_create(
+        (
+            Task(name=f"Leaf {i}", period=period, parent_task=level1[i % branches], executor=executor)
+            for i in range(descendants - branches)
+        ),
+        batch_size=5_000,
+    )
+    return root
+
+
+def bench_cascade_delete(descendants=100_000):
+    """Сравнение удаления дерева сборщиком Django и каскадом на стороне базы."""
+    results = {"descendants": descendants}
+
+    with rollback_atomic():
+        root = create_task_tree(descendants)
+        with timer(results, "collector_seconds"):
+            root.delete()
+
+    with rollback_atomic():
+        root = create_task_tree(descendants)
+        with timer(results, "database_seconds"):
+            results["deleted"] = delete_task_subtree(root.pk)
+
+    return results
+
+
+def bench_serialize_tasks(tasks=100_000):
+    """Сравнение сериализации tasks задач через ModelSerializer и через ValuesSerializer, вместе с выборкой."""
+    results = {"tasks": tasks}
+    period = timezone.now() + timedelta(days=7)
+
+    with rollback_atomic():
+        executor = Employee.objects.create(fullname="Employee", position="Bench")
+        Task.objects.bulk_create(
+            (
+                Task(name=f"Task {i}", description="Description", period=period, executor=executor)
+                for i in range(tasks)
+            ),
+            batch_size=5_000,
+        )
+        queryset = Task.objects.all()
+
+        with timer(results, "model_serializer_seconds"):
+            TaskSerializer(queryset, many=True).data
+
+        with timer(results, "values_serializer_seconds"):
+            serializer = ValuesSerializer(TaskSerializer())
+            serializer.serialize(serializer.get_queryset(queryset))
+
+    results["speedup"] = round(results["model_serializer_seconds"] / results["values_serializer_seconds"], 1)
+    return results
+
+
+def bench_renderers(sizes=(10_000, 100_000, 1_000_000)):
+    """Время рендеринга и размер ответа списка задач в форматах JSON, orjson и MessagePack."""
+    results = {}
+    period = timezone.now() + timedelta(days=7)
+    renderers = {"json": JSONRenderer(), "orjson": ORJSONRenderer()}
+    if msgpack is not None:
+        renderers["msgpack"] = MessagePackRenderer()
+
+    with rollback_atomic():
+        executor = Employee.objects.create(fullname="Employee", position="Bench")
+        Task.objects.bulk_create(
+            (
+                Task(name=f"Task {i}", description="Description", period=period, executor=executor)
+                for i in range(max(sizes))
+            ),
+            batch_size=5_000,
+        )
+        serializer = ValuesSerializer(TaskSerializer())
+        data = serializer.serialize(serializer.get_queryset(Task.objects.all()))
+
+    for size in sizes:
+        for name, renderer in renderers.items():
+            with timer(results, f"{name}_{size}_seconds"):
+                content = renderer.render(data[:size])
+            results[f"{name}_{size}_bytes"] = len(content)
+
+    return results
+
+
+def percentile(values, fraction):
+    """Перцентиль отсортированного списка values методом ближайшего ранга."""
+    if not values:
+        return 0
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def load_test(url, headers=None, concurrency=50, requests=1_000, timeout=30):
+    """Нагрузочный тест работающего сервера: requests GET-запросов к url, не более concurrency одновременно.
+
+    Возвращает пропускную способность, перцентили задержки в миллисекундах и количество ошибок.
+    """
+
+    def fetch(_):
+        request = urllib.request.Request(url, headers=headers or {})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+            ok = True
+        except (urllib.error.URLError, TimeoutError):
+            ok = False
+        return ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        responses = list(executor.map(fetch, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency * 1000 for ok, latency in responses if ok)
+    return {
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "errors": requests - len(latencies),
+    }
+
+
+def measure(call, repeat=20):
+    """Перцентили задержки call в миллисекундах, количество SQL-запросов и пиковая память одного вызова.
+
+    Запросы и память считаются в отдельном первом вызове: tracemalloc замедляет выполнение.
+    Запросы считаются через execute_wrapper: тестовый клиент очищает connection.queries в начале запроса.
+    """
+    queries = []
+
+    def count_query(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_query):
+        tracemalloc.start()
+        try:
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    return {
+        "p50_ms": round(percentile(latencies, 0.5), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "queries": len(queries),
+        "peak_kb": round(peak / 1024),
+    }
+
+
+def bench_endpoints(sizes=(1_000, 10_000), repeat=20, seed=0):
+    """Замер эндпоинтов чтения и search_employee на синтетических данных из sizes задач.
+
+    Сотрудников в десять раз меньше, чем задач. Кэш ответов сбрасывается перед каждым запросом.
+    """
+    results = {"repeat": repeat, "seed": seed}
+
+    for size in sizes:
+        with rollback_atomic():
+            seed_synthetic(employees=max(size // 10, 1), tasks=size, seed=seed)
+            client = get_api_client()
+
+            for name, url in ENDPOINTS.items():
+
+                def request(url=url):
+                    bump_generation()
+                    response = client.get(url)
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{url} вернул {response.status_code}")
+
+                for metric, value in measure(request, repeat).items():
+                    results[f"{name}_{size}_{metric}"] = value
+
+            important_tasks = Task.objects.filter(
+                status="Open", parent_task__isnull=False, parent_task__status="In Progress"
+            )
+            for metric, value in measure(
+                lambda: search_employee(important_tasks, Employee.objects.all()), repeat
+            ).items():
+                results[f"search_employee_{size}_{metric}"] = value
+
+    return results
+
+
+def compare_reports(baseline, current, threshold=0.2):
+    """Регрессии отчета current относительно baseline: список (сценарий, метрика, было, стало).
+
+    Отчеты - словари {сценарий: {метрика: значение}}. Время, память и скорость считаются ухудшенными,
+    если изменились в худшую сторону больше чем на долю threshold, количество запросов - при любом росте.
+    Метрики без известного суффикса (параметры сценария) не сравниваются.
+    """
+    regressions = []
+    for scenario, metrics in current.items():
+        for metric, value in metrics.items():
+            old = baseline.get(scenario, {}).get(metric)
+            if not isinstance(old, (int, float)) or not isinstance(value, (int, float)):
+                continue
+
+            if metric.endswith(LOWER_IS_WORSE):
+                worse = value < old * (1 - threshold)
+            elif metric.endswith("_queries"):
+                worse = value > old
+            elif metric.endswith(HIGHER_IS_WORSE):
+                worse = value > old * (1 + threshold)
+            else:
+                continue
+
+            if worse:
+                regressions.append((scenario, metric, old, value))
+    return regressions
+
+
+SCENARIOS = {
+    "search_employee": bench_search_employee,
+    "bulk_create": bench_bulk_create,
+    "task_tree": bench_task_tree,
+    "cascade_delete": bench_cascade_delete,
+    "serialize_tasks": bench_serialize_tasks,
+    "renderers": bench_renderers,
+    "endpoints": bench_endpoints,
+}
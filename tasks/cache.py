@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_KEY = "tasks:generation"
+HITS_KEY = "tasks:cache:hits"
+MISSES_KEY = "tasks:cache:misses"
+
+# Время жизни закэшированного ответа и блокировки на его построение, в секундах
+RESPONSE_TIMEOUT = getattr(settings, "TASKS_CACHE_TIMEOUT", 300)
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_generation():
+    """Текущее поколение данных задач и сотрудников."""
+    # Начальное значение от времени: после вытеснения ключа старые ответы не совпадут с новым поколением
+    return cache.get_or_set(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def bump_generation():
+    """Делает недействительными все закэшированные ответы."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate():
+    """Сбрасывает кэш сразу и повторно после фиксации транзакции.
+
+    Повторный сброс нужен, чтобы ответ, построенный по данным до фиксации, не остался в кэше.
+    """
+    bump_generation()
+    transaction.on_commit(bump_generation)
+
+
+async def aget_generation():
+    return await cache.aget_or_set(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+async def aincrement(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 1, timeout=None)
+
+
+def get_cache_stats():
+    """Количество попаданий и промахов кэша ответов."""
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {"hits": stats.get(HITS_KEY, 0), "misses": stats.get(MISSES_KEY, 0)}
+
+
+def get_response_key(name, request, generation=None):
+    """Ключ ответа с учетом текущего поколения данных и параметров запроса."""
+    if generation is None:
+        generation = get_generation()
+    query = hashlib.md5(request.GET.urlencode().encode()).hexdigest()
+    return f"tasks:response:{name}:{generation}:{query}"
+
+
+def cached_response(name, request, build):
+    """Возвращает закэшированные данные ответа или строит их функцией build.
+
+    Ключ включает поколение данных и параметры запроса. Построение защищено блокировкой:
+    при одновременных промахах данные строит один запрос, остальные ждут его результат.
+    """
+    key = get_response_key(name, request)
+
+    data = cache.get(key)
+    if data is not None:
+        increment(HITS_KEY)
+        return data
+
+    lock_key = f"{key}:lock"
+    if not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            data = cache.get(key)
+            if data is not None:
+                increment(HITS_KEY)
+                return data
+
+    increment(MISSES_KEY)
+    try:
+        data = build()
+        cache.set(key, data, timeout=RESPONSE_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+    return data
+
+
+async def acached_response(name, request, build):
+    """Асинхронный вариант cached_response, build - корутинная функция.
+
+    Ключи и блокировка общие с cached_response, поэтому синхронные и асинхронные
+    представления используют одни и те же закэшированные данные.
+    """
+    key = get_response_key(name, request, await aget_generation())
+
+    data = await cache.aget(key)
+    if data is not None:
+        await aincrement(HITS_KEY)
+        return data
+
+    lock_key = f"{key}:lock"
+    if not await cache.aadd(lock_key, 1, timeout=LOCK_TIMEOUT):
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            data = await cache.aget(key)
+            if data is not None:
+                await aincrement(HITS_KEY)
+                return data
+
+    await aincrement(MISSES_KEY)
+    try:
+        data = await build()
+        await cache.aset(key, data, timeout=RESPONSE_TIMEOUT)
+    finally:
+        await cache.adelete(lock_key)
+    return data
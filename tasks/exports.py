@@ -0,0 +1,112 @@
+import csv
+import gzip
+import logging
+import threading
+from datetime import timedelta
+from pathlib import Path
+
+import orjson
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import ExportJob
+from .renderers import encode_default
+from .serializers import EXPORT_SERIALIZERS, ValuesSerializer
+
+logger = logging.getLogger(__name__)
+
+# Строки читаются итератором (на Postgres - серверным курсором) частями такого размера,
+# после каждой части обновляется прогресс выгрузки
+EXPORT_CHUNK_SIZE = 2_000
+
+STALE_EXPORT_ERROR = "Выгрузка прервана: процесс, выполнявший ее, был остановлен"
+
+
+def start_export(job):
+    """Запускает выгрузку в отдельном потоке после фиксации транзакции, в которой создана job."""
+
+    def start():
+        threading.Thread(target=run_export_thread, args=(job.pk,), name=f"export-{job.pk}", daemon=True).start()
+
+    transaction.on_commit(start)
+
+
+def run_export_thread(job_id):
+    try:
+        run_export(job_id)
+    finally:
+        # Поток не обрабатывается циклом запросов Django, поэтому соединения закрываются здесь
+        connections.close_all()
+
+
+def run_export(job_id):
+    """Выполняет выгрузку job_id. Ошибка сохраняется в задаче выгрузки со статусом failed."""
+    job = ExportJob.objects.get(pk=job_id)
+    update_job(job_id, status="running")
+
+    try:
+        name = write_export(job)
+    except Exception as exc:
+        logger.exception("Выгрузка %s завершилась с ошибкой", job_id)
+        update_job(job_id, status="failed", error=str(exc), finished_at=timezone.now())
+        return
+
+    update_job(job_id, status="done", file=name, finished_at=timezone.now())
+
+
+def update_job(job_id, **fields):
+    """Изменяет поля выгрузки и время ее изменения: update() не заполняет поля auto_now."""
+    ExportJob.objects.filter(pk=job_id).update(updated_at=timezone.now(), **fields)
+
+
+def fail_stale_exports(timeout=None):
+    """Отмечает ошибкой выгрузки pending и running без изменений дольше timeout секунд.
+
+    Выгрузка идет в потоке процесса и пропадает при его перезапуске или падении, а прогресс работающей
+    выгрузки обновляется после каждой части строк. По умолчанию timeout - EXPORT_STALE_TIMEOUT.
+    Возвращает количество отмеченных выгрузок.
+    """
+    if timeout is None:
+        timeout = settings.EXPORT_STALE_TIMEOUT
+    now = timezone.now()
+    stale = ExportJob.objects.filter(
+        status__in=["pending", "running"], updated_at__lt=now - timedelta(seconds=timeout)
+    )
+    return stale.update(status="failed", error=STALE_EXPORT_ERROR, finished_at=now, updated_at=now)
+
+
+def get_export_file_name(job):
+    name = f"exports/{job.kind}-{job.pk}.{job.format}"
+    return f"{name}.gz" if job.compress else name
+
+
+def write_export(job):
+    """Записывает объекты выгрузки в файл в MEDIA_ROOT. Возвращает имя файла относительно MEDIA_ROOT."""
+    serializer = ValuesSerializer(EXPORT_SERIALIZERS[job.kind](fields=job.fields))
+    rows = serializer.get_queryset(serializer.model.objects.filter(**job.filter))
+    columns = [name for name, column, _ in serializer.fields if column is not None]
+
+    update_job(job.pk, total_rows=rows.count())
+
+    name = get_export_file_name(job)
+    path = Path(settings.MEDIA_ROOT) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    open_file = gzip.open if job.compress else open
+
+    processed = 0
+    with open_file(path, "wt", encoding="utf-8", newline="") as file:
+        if job.format == "csv":
+            writer = csv.DictWriter(file, fieldnames=columns)
+            writer.writeheader()
+
+        for chunk in serializer.serialize_chunks(rows, EXPORT_CHUNK_SIZE):
+            if job.format == "csv":
+                writer.writerows(chunk)
+            else:
+                file.writelines(orjson.dumps(item, default=encode_default).decode() + "\n" for item in chunk)
+
+            processed += len(chunk)
+            update_job(job.pk, processed_rows=processed)
+
+    return name
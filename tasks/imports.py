@@ -0,0 +1,234 @@
+import csv
+import io
+import time
+from collections import Counter
+from pathlib import Path
+
+import orjson
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import cache
+from .models import Employee, Task, active_executor_id
+from .services import get_initial_status, shift_active_tasks_count
+
+BATCH_SIZE = 5_000
+
+# Поля строк файла, которые проверяются полями модели
+EMPLOYEE_FIELDS = ("fullname", "position")
+TASK_FIELDS = ("name", "description", "period", "status")
+
+
+def read_rows(path, file_format=None):
+    """Строки файла CSV или NDJSON как словари, по одной, без чтения файла целиком."""
+    file_format = file_format or ("csv" if Path(path).suffix.lower() == ".csv" else "ndjson")
+
+    with open(path, newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            yield from csv.DictReader(file)
+            return
+
+        for line in file:
+            if line.strip():
+                yield orjson.loads(line)
+
+
+def copy_insert(model, objs):
+    """Вставка строк через COPY FROM STDIN (только Postgres).
+
+    COPY не возвращает id, поэтому они заранее выделяются из последовательности таблицы.
+    """
+    table = model._meta.db_table
+    fields = model._meta.concrete_fields
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)", [table, len(objs)]
+        )
+        for obj, (pk,) in zip(objs, cursor.fetchall()):
+            obj.pk = pk
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in objs:
+            row = []
+            for field in fields:
+                value = field.get_db_prep_save(field.pre_save(obj, True), connection)
+                row.append(r"\N" if value is None else value)
+            writer.writerow(row)
+        buffer.seek(0)
+
+        cursor.copy_expert(
+            f"COPY {connection.ops.quote_name(table)} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+        )
+    return objs
+
+
+class Importer:
+    """Потоковый импорт сотрудников и задач.
+
+    Строки ссылаются друг на друга внешними id из файлов: задача - на исполнителя (executor) и родителя (parent).
+    Внешние id сопоставляются с id в базе через словари в памяти. Родитель может находиться дальше в файле,
+    поэтому связи с родителями проставляются после вставки всех задач.
+    В режиме dry_run строки и ссылки только проверяются.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, dry_run=False, use_copy=True, progress=None):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.use_copy = use_copy and connection.vendor == "postgresql"
+        self.progress = progress or (lambda message: None)
+
+        self.employee_ids = {}
+        self.task_ids = {}
+        # (внешний id задачи, внешний id родителя, номер записи в файле)
+        self.parent_links = []
+        self.errors = []
+        self.counts = Counter()
+        # Изменения счетчиков активных задач сотрудников {id сотрудника: количество задач}
+        self.active_tasks = Counter()
+        self.started_at = time.monotonic()
+
+    def run(self, employee_rows=(), task_rows=()):
+        """Импортирует строки в одной транзакции. При ошибках ничего не сохраняется."""
+        with transaction.atomic():
+            self.load("employees", employee_rows, self.build_employee, Employee, self.employee_ids)
+            self.load("tasks", task_rows, self.build_task, Task, self.task_ids)
+            self.link_parents()
+
+            if self.errors or self.dry_run:
+                transaction.set_rollback(True)
+                return
+
+            # bulk_create и COPY не отправляют сигналы, поэтому счетчики и кэш обновляются здесь
+            shift_active_tasks_count(self.active_tasks)
+            cache.invalidate()
+
+    def load(self, kind, rows, build, model, id_map):
+        batch = []
+        for line, row in enumerate(rows, start=1):
+            if not isinstance(row, dict):
+                self.add_error(kind, line, "Запись должна быть объектом")
+                continue
+
+            external_id = str(row.get("id") or "")
+            if not external_id:
+                self.add_error(kind, line, "Не указан id")
+                continue
+            if external_id in id_map:
+                self.add_error(kind, line, f"Повторный id {external_id}")
+                continue
+
+            obj, parent = build(kind, line, row)
+            id_map[external_id] = None
+            if obj is not None:
+                batch.append((external_id, obj, parent, line))
+
+            if len(batch) >= self.batch_size:
+                self.flush(kind, batch, model, id_map)
+                batch = []
+
+        self.flush(kind, batch, model, id_map)
+
+    def flush(self, kind, batch, model, id_map):
+        objs = [obj for _, obj, _, _ in batch]
+        if objs and not self.dry_run and not self.errors:
+            if self.use_copy:
+                copy_insert(model, objs)
+            else:
+                model.objects.bulk_create(objs)
+
+        for external_id, obj, parent, line in batch:
+            id_map[external_id] = obj.pk
+            if parent:
+                self.parent_links.append((external_id, parent, line))
+            if model is Task:
+                self.active_tasks[active_executor_id(obj.executor_id, obj.status)] += 1
+
+        self.counts[kind] += len(batch)
+        elapsed = time.monotonic() - self.started_at
+        rate = sum(self.counts.values()) / elapsed if elapsed else 0
+        self.progress(f"{kind}: {self.counts[kind]} строк, {rate:.0f} строк/с")
+
+    def clean(self, kind, line, model, fields, row):
+        values = {}
+        for name in fields:
+            field = model._meta.get_field(name)
+            value = row.get(name)
+            if value == "" and field.null:
+                value = None
+            try:
+                values[name] = field.clean(value, None)
+            except ValidationError as exc:
+                self.add_error(kind, line, f"{name}: {' '.join(exc.messages)}")
+        return values
+
+    def build_employee(self, kind, line, row):
+        values = self.clean(kind, line, Employee, EMPLOYEE_FIELDS, row)
+        if len(values) != len(EMPLOYEE_FIELDS):
+            return None, None
+        return Employee(**values), None
+
+    def build_task(self, kind, line, row):
+        if not row.get("status"):
+            row = {**row, "status": get_initial_status(row.get("executor"))}
+        values = self.clean(kind, line, Task, TASK_FIELDS, row)
+
+        executor = str(row.get("executor") or "")
+        if executor and executor not in self.employee_ids:
+            self.add_error(kind, line, f"executor: неизвестный сотрудник {executor}")
+            return None, None
+        if len(values) != len(TASK_FIELDS):
+            return None, None
+
+        if timezone.is_naive(values["period"]):
+            values["period"] = timezone.make_aware(values["period"])
+        task = Task(**values, executor_id=self.employee_ids[executor] if executor else None)
+        return task, str(row.get("parent") or "")
+
+    def link_parents(self):
+        """Проставляет родителей задач после вставки всех задач.
+
+        Задачи из цикла ссылок на родителей не имели бы корня, и обход деревьев от корней до них не доходил бы,
+        поэтому циклы считаются ошибкой.
+        """
+        parents = {}
+        for external_id, parent, line in self.parent_links:
+            if parent not in self.task_ids:
+                self.add_error("tasks", line, f"parent: неизвестная задача {parent}")
+            elif parent == external_id:
+                self.add_error("tasks", line, "parent: задача не может быть родителем самой себя")
+            else:
+                parents[external_id] = (parent, line)
+
+        self.check_cycles(parents)
+
+        if parents and not self.errors and not self.dry_run:
+            updates = [
+                Task(pk=self.task_ids[external_id], parent_task_id=self.task_ids[parent])
+                for external_id, (parent, _) in parents.items()
+            ]
+            Task.objects.bulk_update(updates, ["parent_task"], batch_size=self.batch_size)
+
+    def check_cycles(self, parents):
+        """Ошибка для каждого цикла в ссылках {внешний id задачи: (внешний id родителя, номер записи)}."""
+        # Номер обхода, в котором задача была посещена: у каждой задачи не больше одного родителя,
+        # поэтому цикл найден, если обход пришел в задачу, посещенную им же
+        visited = {}
+        for start in parents:
+            node = start
+            while node in parents and node not in visited:
+                visited[node] = start
+                node = parents[node][0]
+
+            if node in parents and visited[node] == start:
+                cycle = [node]
+                while (parent := parents[cycle[-1]][0]) != node:
+                    cycle.append(parent)
+                line = min(parents[external_id][1] for external_id in cycle)
+                self.add_error("tasks", line, f"parent: цикл из задач {', '.join(cycle)}")
+
+    def add_error(self, kind, line, message):
+        self.errors.append(f"{kind}, запись {line}: {message}")
@@ -0,0 +1,176 @@
+import heapq
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import orjson
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+# Метрики текущего запроса. ContextVar, а не атрибут потока: значение доступно и в асинхронных представлениях
+current_metrics = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Метрики одного запроса: количество и время SQL-запросов, время этапов обработки в секундах."""
+
+    def __init__(self, slow_sql_count=5):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.timings = {}
+        self.active = set()
+        self.slow_sql_count = slow_sql_count
+        # Куча (длительность, номер, SQL) самых медленных запросов
+        self.slowest = []
+
+    def add_query(self, sql, duration):
+        self.query_count += 1
+        self.db_time += duration
+        if len(self.slowest) < self.slow_sql_count:
+            heapq.heappush(self.slowest, (duration, self.query_count, sql))
+        elif self.slowest and duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (duration, self.query_count, sql))
+
+    def get_slowest_sql(self):
+        return [
+            {"ms": round(duration * 1000, 2), "sql": sql} for duration, _, sql in sorted(self.slowest, reverse=True)
+        ]
+
+    def get_durations(self, total):
+        """Длительности этапов в миллисекундах. Интервалы вложены: db входит в serialize и total."""
+        durations = {"db": self.db_time, **self.timings, "total": total}
+        return {name: round(duration * 1000, 2) for name, duration in durations.items()}
+
+
+def record_query(execute, sql, params, many, context):
+    """Обертка execute_wrapper соединений: замеряет SQL-запросы, выполненные при обработке запроса к API.
+
+    Устанавливается на каждое соединение при подключении, см. tasks.signals. Соединения свои в каждом потоке,
+    поэтому обертка на одном соединении не видела бы запросов асинхронных представлений из sync_to_async.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - start)
+
+
+@contextmanager
+def timing(name):
+    """Добавляет время выполнения блока к этапу name текущего запроса.
+
+    Вне запроса ничего не замеряется. Вложенные блоки с тем же name не учитываются повторно.
+    """
+    metrics = current_metrics.get()
+    if metrics is None or name in metrics.active:
+        yield
+        return
+
+    metrics.active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] = metrics.timings.get(name, 0.0) + time.perf_counter() - start
+        metrics.active.discard(name)
+
+
+class InstrumentationMiddleware:
+    """Основа middleware, которые обрабатывают метрики запроса после ответа.
+
+    Метрики запроса общие: внутренний middleware использует метрики, созданные внешним.
+    Поддерживает ASGI без переключения в поток. Отключается настройкой enabled_setting = False.
+    """
+
+    sync_capable = True
+    async_capable = True
+    enabled_setting = None
+
+    def __init__(self, get_response):
+        if not getattr(settings, self.enabled_setting, True):
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.slow_sql_count = getattr(settings, "SLOW_REQUEST_SQL_COUNT", 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def start_metrics(self):
+        """Метрики текущего запроса и токен для сброса ContextVar (None, если метрики созданы раньше)."""
+        metrics = current_metrics.get()
+        if metrics is not None:
+            return metrics, None
+        metrics = RequestMetrics(self.slow_sql_count)
+        return metrics, current_metrics.set(metrics)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics, token = self.start_metrics()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                current_metrics.reset(token)
+        return self.process_metrics(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics, token = self.start_metrics()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                current_metrics.reset(token)
+        return self.process_metrics(request, response, metrics, time.perf_counter() - start)
+
+    def process_metrics(self, request, response, metrics, total):
+        """Обрабатывает метрики запроса, total - время обработки в секундах. Возвращает ответ."""
+        raise NotImplementedError
+
+
+class ServerTimingMiddleware(InstrumentationMiddleware):
+    """Замеряет SQL-запросы и этапы обработки запроса и отдает их в заголовке Server-Timing.
+
+    Этапы: db - SQL-запросы, serialize, render, search - блоки timing(), total - обработка запроса целиком.
+    Запросы медленнее SLOW_REQUEST_THRESHOLD секунд пишутся в лог вместе с самыми медленными SQL-запросами.
+    Отключается настройкой SERVER_TIMING_ENABLED = False.
+    """
+
+    enabled_setting = "SERVER_TIMING_ENABLED"
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.slow_request_threshold = getattr(settings, "SLOW_REQUEST_THRESHOLD", 0.5)
+
+    def process_metrics(self, request, response, metrics, total):
+        durations = metrics.get_durations(total)
+        response.headers["Server-Timing"] = ", ".join(
+            f'{name};dur={duration};desc="{metrics.query_count} queries"' if name == "db" else f"{name};dur={duration}"
+            for name, duration in durations.items()
+        )
+
+        if total >= self.slow_request_threshold:
+            self.log_slow_request(request, response, metrics, durations)
+        return response
+
+    def log_slow_request(self, request, response, metrics, durations):
+        data = {
+            "method": request.method,
+            "path": request.get_full_path(),
+            "status": response.status_code,
+            "queries": metrics.query_count,
+            **{f"{name}_ms": duration for name, duration in durations.items()},
+            "slowest_sql": metrics.get_slowest_sql(),
+        }
+        logger.warning("Медленный запрос %s", orjson.dumps(data).decode(), extra={"request_metrics": data})
@@ -0,0 +1,67 @@
+import json
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from tasks.benchmarks import SCENARIOS, compare_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Запускает замеры производительности. Тестовые данные создаются в откатываемой транзакции. "
+        "Результаты можно сохранить в JSON-отчет и сравнить с другим отчетом."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenarios", nargs="*", help=f"Сценарии: {', '.join(SCENARIOS)} (по умолчанию все)")
+        parser.add_argument("--output", help="Сохранить результаты в JSON-отчет")
+        parser.add_argument(
+            "--compare",
+            nargs="+",
+            metavar="REPORT",
+            help="Сравнить результаты с отчетом BASELINE. С двумя отчетами BASELINE CURRENT замеры не запускаются",
+        )
+        parser.add_argument(
+            "--threshold", type=float, default=0.2, help="Допустимое ухудшение времени и памяти, доля (0.2 - 20%%)"
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options["scenarios"]) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+
+        compare = options["compare"] or []
+        if len(compare) > 2:
+            raise CommandError("--compare принимает один или два отчета")
+
+        if len(compare) == 2:
+            report = self.load_report(compare[1])
+        else:
+            report = {"created_at": timezone.now().isoformat(), "database": connection.vendor, "scenarios": {}}
+            for name in options["scenarios"] or SCENARIOS:
+                results = SCENARIOS[name]()
+                report["scenarios"][name] = results
+                metrics = ", ".join(f"{key}={value}" for key, value in results.items())
+                self.stdout.write(f"{name}: {metrics}")
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Отчет сохранен в {options['output']}")
+
+        if compare:
+            baseline = self.load_report(compare[0])
+            regressions = compare_reports(baseline["scenarios"], report["scenarios"], options["threshold"])
+            for scenario, metric, old, new in regressions:
+                self.stdout.write(f"РЕГРЕССИЯ {scenario}.{metric}: {old} -> {new}")
+            if regressions:
+                raise CommandError(f"Найдено регрессий: {len(regressions)}")
+            self.stdout.write("Регрессий не найдено")
+
+    def load_report(self, path):
+        try:
+            with open(path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Не удалось прочитать отчет {path}: {exc}")
@@ -0,0 +1,48 @@
+from django.core.management import BaseCommand
+from django.db import connection
+
+from tasks.models import Employee, Task
+from tasks.paginators import EmployeePagination, TaskPagination
+from tasks.views import BusyEmployeesAPIView, EmployeeViewSet, ImportantTasksViewSet, TaskViewSet
+
+
+def endpoint_queries():
+    """Запросы, которые выполняют эндпоинты, в порядке их выполнения.
+
+    Для ?expand=tasks выводится только дополнительный запрос задач.
+    """
+    # Пустой IN не компилируется в SQL, поэтому на пустой базе план строится для несуществующего id
+    employee_ids = list(Employee.objects.values_list("id", flat=True)[: EmployeePagination.page_size]) or [0]
+
+    return {
+        "tasks/": [TaskViewSet.queryset.order_by(*TaskPagination.ordering)[: TaskPagination.page_size + 1]],
+        "employees/": [
+            EmployeeViewSet.queryset.order_by(*EmployeePagination.ordering)[: EmployeePagination.page_size + 1],
+        ],
+        "employees/?expand=tasks": [Task.objects.filter(executor__in=employee_ids)],
+        "busy_employees/": [BusyEmployeesAPIView().get_queryset()],
+        "busy_employees/?expand=tasks": [Task.objects.filter(executor__in=employee_ids)],
+        "important_tasks/": [
+            ImportantTasksViewSet().get_queryset(),
+            Employee.objects.all(),
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = "Выводит планы выполнения (EXPLAIN) запросов каждого эндпоинта."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE (только Postgres)")
+
+    def handle(self, *args, **options):
+        explain_options = {}
+        if options["analyze"] and connection.vendor == "postgresql":
+            explain_options["analyze"] = True
+
+        for endpoint, querysets in endpoint_queries().items():
+            self.stdout.write(self.style.MIGRATE_HEADING(endpoint))
+            for queryset in querysets:
+                self.stdout.write(str(queryset.query))
+                self.stdout.write(queryset.explain(**explain_options))
+                self.stdout.write("")
@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from tasks.exports import fail_stale_exports
+
+
+class Command(BaseCommand):
+    help = (
+        "Отмечает ошибкой выгрузки, которые не изменялись дольше EXPORT_STALE_TIMEOUT секунд. "
+        "При запуске процесса, выполняющего выгрузки, используйте --timeout 0: его прежние выгрузки прерваны."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--timeout", type=int, help="Время без изменений в секундах")
+
+    def handle(self, *args, **options):
+        failed = fail_stale_exports(options["timeout"])
+        self.stdout.write(f"Прерванных выгрузок: {failed}")
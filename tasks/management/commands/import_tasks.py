@@ -0,0 +1,52 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from tasks.imports import BATCH_SIZE, Importer, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует сотрудников и задачи из файлов CSV или NDJSON. "
+        "Сотрудники: id, fullname, position. Задачи: id, name, description, parent, executor, period, status. "
+        "parent и executor - id из файлов импорта."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", help="Файл сотрудников")
+        parser.add_argument("--tasks", help="Файл задач")
+        parser.add_argument(
+            "--format", choices=["csv", "ndjson"], help="Формат файлов, по умолчанию определяется по расширению"
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Количество строк в одной вставке")
+        parser.add_argument("--dry-run", action="store_true", help="Только проверить файлы, ничего не сохраняя")
+        parser.add_argument("--no-copy", action="store_true", help="Не использовать COPY на Postgres")
+
+    def handle(self, *args, **options):
+        if not options["employees"] and not options["tasks"]:
+            raise CommandError("Укажите --employees и/или --tasks")
+
+        importer = Importer(
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+            use_copy=not options["no_copy"],
+            progress=self.stdout.write,
+        )
+        employee_rows = read_rows(options["employees"], options["format"]) if options["employees"] else ()
+        task_rows = read_rows(options["tasks"], options["format"]) if options["tasks"] else ()
+
+        try:
+            importer.run(employee_rows, task_rows)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Не удалось прочитать файл: {exc}")
+
+        if importer.errors:
+            raise CommandError("Импорт отменен, ошибки:\n" + "\n".join(importer.errors))
+
+        elapsed = time.monotonic() - importer.started_at
+        total = sum(importer.counts.values())
+        prefix = "Проверено" if options["dry_run"] else "Импортировано"
+        self.stdout.write(
+            f"{prefix}: сотрудников {importer.counts['employees']}, задач {importer.counts['tasks']} "
+            f"за {elapsed:.1f} с ({total / elapsed if elapsed else 0:.0f} строк/с)"
+        )
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tasks.benchmarks import load_test
+
+ENDPOINTS = ["tasks/", "employees/", "busy_employees/", "important_tasks/"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест работающего сервера: сравнивает пропускную способность эндпоинтов чтения "
+        "на WSGI (синхронные представления) и на ASGI (асинхронные представления async/...)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("endpoints", nargs="*", help=f"Эндпоинты (по умолчанию {', '.join(ENDPOINTS)})")
+        parser.add_argument("--username", required=True, help="Пользователь, от имени которого выполняются запросы")
+        parser.add_argument("--wsgi-url", default="http://localhost/", help="Адрес WSGI-сервера")
+        parser.add_argument("--asgi-url", default="http://localhost/async/", help="Адрес асинхронных эндпоинтов")
+        parser.add_argument("--concurrency", type=int, default=50, help="Количество одновременных запросов")
+        parser.add_argument("--requests", type=int, default=1_000, help="Количество запросов к каждому эндпоинту")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options["username"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Пользователь {options['username']} не найден")
+
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+        for endpoint in options["endpoints"] or ENDPOINTS:
+            for name in ("wsgi", "asgi"):
+                results = load_test(
+                    options[f"{name}_url"] + endpoint,
+                    headers=headers,
+                    concurrency=options["concurrency"],
+                    requests=options["requests"],
+                )
+                metrics = ", ".join(f"{key}={value}" for key, value in results.items())
+                self.stdout.write(f"{name} {endpoint}: {metrics}")
@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from tasks.services import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = "Удаляет отметки об удалении задач старше TASK_TOMBSTONE_RETENTION."
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(f"Удалено отметок: {deleted}")
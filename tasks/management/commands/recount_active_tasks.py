@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from tasks.models import Employee
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счетчики активных задач сотрудников."
+
+    def handle(self, *args, **options):
+        repaired = Employee.objects.recount_active_tasks()
+        self.stdout.write(f"Исправлено счетчиков: {repaired}")
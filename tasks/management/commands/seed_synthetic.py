@@ -0,0 +1,49 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from tasks.models import Employee
+from tasks.services import delete_task_trees
+from tasks.synthetic import STATUS_WEIGHTS, parse_status_weights, seed_synthetic
+
+
+class Command(BaseCommand):
+    help = "Создает синтетических сотрудников и задачи. Одинаковые параметры и seed дают одинаковые данные."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", type=int, default=1_000, help="Количество сотрудников")
+        parser.add_argument("--tasks", type=int, default=10_000, help="Количество задач")
+        parser.add_argument("--depth", type=int, default=3, help="Максимальная глубина деревьев задач")
+        parser.add_argument(
+            "--statuses",
+            default=",".join(f"{status}={weight}" for status, weight in STATUS_WEIGHTS.items()),
+            help='Распределение статусов, например "Open=30,In Progress=50,Closed=20"',
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Начальное значение генератора")
+        parser.add_argument("--clear", action="store_true", help="Удалить существующих сотрудников и задачи")
+
+    def handle(self, *args, **options):
+        if options["depth"] < 1:
+            raise CommandError("--depth должен быть не меньше 1")
+        try:
+            status_weights = parse_status_weights(options["statuses"])
+        except ValueError as exc:
+            raise CommandError(f"Неверное распределение статусов --statuses: {exc}")
+
+        with transaction.atomic():
+            if options["clear"]:
+                # Задачи удаляются каскадом в базе, без загрузки деревьев в Python
+                delete_task_trees("parent_task_id IS NULL", [])
+                Employee.objects.all().delete()
+
+            levels = seed_synthetic(
+                employees=options["employees"],
+                tasks=options["tasks"],
+                depth=options["depth"],
+                status_weights=status_weights,
+                seed=options["seed"],
+            )
+
+        by_level = ", ".join(f"{level}: {count}" for level, count in levels.items())
+        self.stdout.write(
+            f"Создано сотрудников: {options['employees']}, задач: {options['tasks']} (по уровням {by_level})"
+        )
@@ -0,0 +1,87 @@
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from .cache import get_cache_stats
+from .instrumentation import InstrumentationMiddleware
+
+# Маршруты приложений, для которых метрики собираются по отдельности, остальные учитываются как "other"
+METRICS_NAMESPACES = ("tasks", "users")
+
+# Метрики хранятся в памяти процесса. Если задана переменная окружения PROMETHEUS_MULTIPROC_DIR,
+# каждый процесс (воркер gunicorn или uvicorn) пишет их в свои файлы в этом каталоге через mmap,
+# и /metrics суммирует файлы всех процессов. Каталог нужно очищать при запуске сервера.
+REQUESTS = Counter("tasks_http_requests", "Количество запросов", ["view", "route", "method", "status"])
+LATENCY = Histogram(
+    "tasks_http_request_duration_seconds",
+    "Время обработки запроса",
+    ["view", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+QUERIES = Histogram(
+    "tasks_http_request_db_queries",
+    "Количество SQL-запросов при обработке запроса",
+    ["view", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+
+
+class ResponseCacheCollector:
+    """Попадания и промахи кэша ответов. Счетчики хранятся в общем кэше и общие для всех процессов."""
+
+    def collect(self):
+        stats = get_cache_stats()
+        total = stats["hits"] + stats["misses"]
+
+        hits = CounterMetricFamily("tasks_response_cache_hits", "Попадания в кэш ответов")
+        hits.add_metric([], stats["hits"])
+        misses = CounterMetricFamily("tasks_response_cache_misses", "Промахи кэша ответов")
+        misses.add_metric([], stats["misses"])
+        ratio = GaugeMetricFamily("tasks_response_cache_hit_ratio", "Доля попаданий в кэш ответов")
+        ratio.add_metric([], stats["hits"] / total if total else 0)
+        return [hits, misses, ratio]
+
+
+def get_route_labels(request):
+    """Имя маршрута и его шаблон для меток метрик. Количество разных значений ограничено числом маршрутов."""
+    match = request.resolver_match
+    if match is None:
+        return "unmatched", "unmatched"
+    if match.namespace not in METRICS_NAMESPACES:
+        return "other", "other"
+    return match.view_name, match.route
+
+
+def render_metrics(multiprocess_dir=None):
+    """Метрики в текстовом формате Prometheus и их Content-Type.
+
+    С каталогом multiprocess_dir (по умолчанию PROMETHEUS_MULTIPROC_DIR) суммируются метрики всех процессов,
+    без него выводятся метрики текущего процесса.
+    """
+    multiprocess_dir = multiprocess_dir or os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    registry = CollectorRegistry()
+    if multiprocess_dir:
+        MultiProcessCollector(registry, path=multiprocess_dir)
+    else:
+        for metric in (REQUESTS, LATENCY, QUERIES):
+            registry.register(metric)
+    registry.register(ResponseCacheCollector())
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware(InstrumentationMiddleware):
+    """Считает запросы, время их обработки и количество SQL-запросов по маршрутам для /metrics.
+
+    Отключается настройкой METRICS_ENABLED = False.
+    """
+
+    enabled_setting = "METRICS_ENABLED"
+
+    def process_metrics(self, request, response, metrics, total):
+        view, route = get_route_labels(request)
+        REQUESTS.labels(view, route, request.method, response.status_code).inc()
+        LATENCY.labels(view, route).observe(total)
+        QUERIES.labels(view, route).observe(metrics.query_count)
+        return response
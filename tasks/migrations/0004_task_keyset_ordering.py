@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0003_alter_task_status"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="employee",
+            options={"ordering": ["fullname", "id"], "verbose_name": "Сотрудник", "verbose_name_plural": "Сотрудники"},
+        ),
+        migrations.AlterModelOptions(
+            name="task",
+            options={"ordering": ["name", "id"], "verbose_name": "Задача", "verbose_name_plural": "Задачи"},
+        ),
+        migrations.AddIndex(
+            model_name="employee",
+            index=models.Index(fields=["fullname", "id"], name="employee_fullname_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["name", "id"], name="task_name_id_idx"),
+        ),
+    ]
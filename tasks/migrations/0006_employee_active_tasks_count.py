@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:07
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_active_tasks_count(apps, schema_editor):
+    Employee = apps.get_model("tasks", "Employee")
+    Task = apps.get_model("tasks", "Task")
+
+    active_tasks = (
+        Task.objects.filter(executor=OuterRef("pk"))
+        .exclude(status="Closed")
+        .order_by()
+        .values("executor")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    Employee.objects.update(active_tasks_count=Coalesce(Subquery(active_tasks), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0005_task_status_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employee",
+            name="active_tasks_count",
+            field=models.IntegerField(
+                default=0,
+                editable=False,
+                help_text="Количество незакрытых задач сотрудника",
+                verbose_name="Количество активных задач",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="employee",
+            index=models.Index(fields=["-active_tasks_count", "id"], name="employee_active_tasks_idx"),
+        ),
+        migrations.RunPython(fill_active_tasks_count, migrations.RunPython.noop),
+    ]
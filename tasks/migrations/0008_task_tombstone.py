@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0007_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskTombstone",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("task_id", models.BigIntegerField(verbose_name="Идентификатор удаленной задачи")),
+                ("deleted_at", models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Дата удаления")),
+            ],
+            options={
+                "verbose_name": "Удаленная задача",
+                "verbose_name_plural": "Удаленные задачи",
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0008_task_tombstone"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("tasks", "tasks"), ("employees", "employees")],
+                        max_length=20,
+                        verbose_name="Выгружаемые объекты",
+                    ),
+                ),
+                (
+                    "format",
+                    models.CharField(
+                        choices=[("csv", "csv"), ("ndjson", "ndjson")], max_length=20, verbose_name="Формат файла"
+                    ),
+                ),
+                ("compress", models.BooleanField(default=False, verbose_name="Сжатие gzip")),
+                ("filter", models.JSONField(blank=True, default=dict, verbose_name="Фильтр объектов")),
+                ("fields", models.JSONField(blank=True, null=True, verbose_name="Выгружаемые поля")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "pending"),
+                            ("running", "running"),
+                            ("done", "done"),
+                            ("failed", "failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="Статус",
+                    ),
+                ),
+                ("total_rows", models.IntegerField(blank=True, null=True, verbose_name="Всего строк")),
+                ("processed_rows", models.IntegerField(default=0, verbose_name="Выгружено строк")),
+                ("file", models.FileField(blank=True, upload_to="exports/", verbose_name="Файл выгрузки")),
+                ("error", models.TextField(blank=True, verbose_name="Ошибка")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")),
+                ("finished_at", models.DateTimeField(blank=True, null=True, verbose_name="Дата завершения")),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Автор",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Выгрузка",
+                "verbose_name_plural": "Выгрузки",
+                "ordering": ["-created_at", "-id"],
+            },
+        ),
+    ]
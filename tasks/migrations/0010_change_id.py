@@ -0,0 +1,93 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+# Номер изменения назначает база, а не приложение: на Postgres это номер транзакции, записавшей строку,
+# на SQLite (одновременно пишет только одна транзакция) - следующее значение счетчика в отдельной таблице.
+# SQLite пересоздает таблицу при изменении ее полей, после таких миграций триггеры нужно создать заново
+POSTGRES_TRIGGERS = """
+CREATE FUNCTION tasks_set_change_id() RETURNS trigger AS $$
+BEGIN
+    NEW.change_id := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tasks_task_change_id BEFORE INSERT OR UPDATE ON tasks_task
+FOR EACH ROW EXECUTE FUNCTION tasks_set_change_id();
+
+CREATE TRIGGER tasks_tasktombstone_change_id BEFORE INSERT ON tasks_tasktombstone
+FOR EACH ROW EXECUTE FUNCTION tasks_set_change_id();
+"""
+
+POSTGRES_DROP_TRIGGERS = """
+DROP TRIGGER tasks_tasktombstone_change_id ON tasks_tasktombstone;
+DROP TRIGGER tasks_task_change_id ON tasks_task;
+DROP FUNCTION tasks_set_change_id();
+"""
+
+# Условие WHEN не дает триггеру изменения сработать на собственный UPDATE: новый номер больше прежнего
+SQLITE_TRIGGERS = [
+    "CREATE TABLE tasks_change_counter (value integer NOT NULL)",
+    "INSERT INTO tasks_change_counter (value) VALUES (0)",
+    *(
+        f"""
+        CREATE TRIGGER {name} AFTER {event} ON {table} {condition}
+        BEGIN
+            UPDATE tasks_change_counter SET value = value + 1;
+            UPDATE {table} SET change_id = (SELECT value FROM tasks_change_counter) WHERE id = NEW.id;
+        END
+        """
+        for name, event, table, condition in (
+            ("tasks_task_change_id_insert", "INSERT", "tasks_task", ""),
+            ("tasks_task_change_id_update", "UPDATE", "tasks_task", "WHEN NEW.change_id <= OLD.change_id"),
+            ("tasks_tasktombstone_change_id", "INSERT", "tasks_tasktombstone", ""),
+        )
+    ),
+]
+
+SQLITE_DROP_TRIGGERS = [
+    "DROP TRIGGER tasks_task_change_id_insert",
+    "DROP TRIGGER tasks_task_change_id_update",
+    "DROP TRIGGER tasks_tasktombstone_change_id",
+    "DROP TABLE tasks_change_counter",
+]
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(POSTGRES_TRIGGERS)
+    elif vendor == "sqlite":
+        for sql in SQLITE_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+def drop_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(POSTGRES_DROP_TRIGGERS)
+    elif vendor == "sqlite":
+        for sql in SQLITE_DROP_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0009_export_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="change_id",
+            field=models.BigIntegerField(db_default=0, db_index=True, default=0, editable=False, verbose_name="Номер изменения"),
+        ),
+        migrations.AddField(
+            model_name="tasktombstone",
+            name="change_id",
+            field=models.BigIntegerField(db_default=0, db_index=True, default=0, editable=False, verbose_name="Номер изменения"),
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
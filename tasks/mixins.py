@@ -0,0 +1,165 @@
+import hashlib
+from functools import partial
+
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .paginators import get_query_params
+from .renderers import stream_json_array
+from .serializers import ValuesSerializer
+
+
+def conditional_response(request, querysets, build_response, tombstones=None, last_modified=True):
+    """Ответ с ETag и Last-Modified, вычисленными по агрегатам max(updated_at) и count.
+
+    Если версия совпадает с If-None-Match или If-Modified-Since запроса, возвращается 304
+    без вызова build_response, то есть без выборки и сериализации данных.
+    Удаление строки не меняет max(updated_at): время последнего удаления берется из max(deleted_at)
+    отметок tombstones, а без них Last-Modified нужно отключить параметром last_modified.
+    """
+    versions = [
+        queryset.order_by().aggregate(updated_at=Max("updated_at"), count=Count("pk")) for queryset in querysets
+    ]
+    moments = [version["updated_at"] for version in versions]
+    if tombstones is not None:
+        moments.append(tombstones.order_by().aggregate(deleted_at=Max("deleted_at"))["deleted_at"])
+
+    modified = max((moment for moment in moments if moment), default=None)
+    modified = int(modified.timestamp()) if modified and last_modified else None
+
+    # Представление зависит от адреса с параметрами и от формата ответа
+    source = [request.get_full_path(), request.META.get("HTTP_ACCEPT", "")]
+    source += [f"{version['updated_at']}:{version['count']}" for version in versions]
+    if tombstones is not None:
+        source.append(str(moments[-1]))
+    etag = quote_etag(hashlib.md5("|".join(source).encode()).hexdigest())
+
+    response = get_conditional_response(request, etag=etag, last_modified=modified)
+    if response is None:
+        response = build_response()
+
+    response.headers["ETag"] = etag
+    if modified is not None:
+        response.headers["Last-Modified"] = http_date(modified)
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+class ConditionalGetMixin:
+    """Условные GET-запросы (ETag / Last-Modified) для действий list и retrieve."""
+
+    def get_version_querysets(self):
+        """Querysets, по агрегатам которых определяется версия ответа текущего действия."""
+        raise NotImplementedError
+
+    def get_version_tombstones(self):
+        """Отметки об удалении строк ответа текущего действия или None, если удаления не отмечаются."""
+        return None
+
+    def list(self, request, *args, **kwargs):
+        # Без отметок об удалении Last-Modified списка не менялся бы после удаления строки
+        tombstones = self.get_version_tombstones()
+        return conditional_response(
+            request,
+            self.get_version_querysets(),
+            partial(super().list, request, *args, **kwargs),
+            tombstones,
+            last_modified=tombstones is not None,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request,
+            self.get_version_querysets(),
+            partial(super().retrieve, request, *args, **kwargs),
+            self.get_version_tombstones(),
+        )
+
+
+def get_sparse_fields(request, serializer_class):
+    """Поля из параметров ?fields= и ?expand=.
+
+    Возвращает выводимые поля (None - все) и раскрываемые поля. Для неизвестных полей - ValidationError.
+    """
+    params = get_query_params(request)
+    fields, expand = ([name for name in params.get(param, "").split(",") if name] for param in ("fields", "expand"))
+
+    expandable = getattr(serializer_class.Meta, "expandable_fields", ())
+    available = set(serializer_class(expand=expandable).fields)
+
+    errors = {}
+    for param, names, allowed in (("fields", fields, available), ("expand", expand, expandable)):
+        unknown = set(names) - set(allowed)
+        if unknown:
+            errors[param] = [f"Неизвестные поля: {', '.join(sorted(unknown))}"]
+    if errors:
+        raise ValidationError(errors)
+
+    return fields or None, expand
+
+
+def narrow_queryset(queryset, serializer_class, fields, expand, required=()):
+    """Выбирает только столбцы выводимых полей и подгружает связанные объекты раскрытых полей.
+
+    required - поля, которые нужны помимо выводимых (например, поля сортировки для курсора пагинации).
+    """
+    serializer = serializer_class(fields=fields, expand=expand)
+    columns = {field.name for field in queryset.model._meta.concrete_fields}
+    sources = {field.source for field in serializer.fields.values()} & columns
+    return queryset.only(*sources, *required).prefetch_related(*expand)
+
+
+class SparseFieldsetsMixin:
+    """Параметры ?fields= и ?expand= для действий list и retrieve.
+
+    Выборка сужается до запрошенных полей, вложенные объекты загружаются только при раскрытии.
+    """
+
+    sparse_actions = ("list", "retrieve")
+
+    def get_sparse_fields(self):
+        if not hasattr(self, "_sparse_fields"):
+            self._sparse_fields = get_sparse_fields(self.request, self.get_serializer_class())
+        return self._sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.sparse_actions:
+            kwargs["fields"], kwargs["expand"] = self.get_sparse_fields()
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in self.sparse_actions:
+            return queryset
+
+        required = self.paginator.ordering if self.action == "list" and self.paginator else ()
+        return narrow_queryset(queryset, self.get_serializer_class(), *self.get_sparse_fields(), required=required)
+
+
+class ValuesListMixin:
+    """Действие list через ValuesSerializer: строки читаются .values() и сериализуются без ModelSerializer.
+
+    С параметром ?stream=1 весь список без пагинации отдается потоком JSON-массива: строки читаются
+    итератором частями по stream_chunk_size, поэтому память не растет с размером таблицы.
+    """
+
+    stream_query_param = "stream"
+    stream_chunk_size = 1_000
+
+    def list(self, request, *args, **kwargs):
+        serializer = ValuesSerializer(self.get_serializer())
+        required = self.paginator.ordering if self.paginator else ()
+        rows = serializer.get_queryset(self.filter_queryset(self.get_queryset()), required)
+
+        if request.query_params.get(self.stream_query_param) in ("1", "true"):
+            chunks = serializer.serialize_chunks(rows, self.stream_chunk_size)
+            return StreamingHttpResponse(stream_json_array(chunks), content_type="application/json")
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(rows))
@@ -1,4 +1,106 @@
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, router, transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import cache
+
+
+def active_executor_id(executor_id, status):
+    """Сотрудник, у которого задача учитывается в счетчике активных задач."""
+    if status == "Closed":
+        return None
+    return executor_id
+
+
+class EmployeeQuerySet(models.QuerySet):
+    """QuerySet сотрудника."""
+
+    def recount_active_tasks(self):
+        """Пересчитывает счетчик незакрытых задач. Возвращает количество исправленных сотрудников.
+
+        Исправленным сотрудникам обновляется updated_at, чтобы сменились их ETag и Last-Modified.
+        UPDATE не отправляет сигналы, поэтому после исправления кэш ответов сбрасывается здесь.
+        """
+        active_tasks = (
+            Task.objects.filter(executor=OuterRef("pk"))
+            .exclude(status="Closed")
+            .order_by()
+            .values("executor")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        actual_count = Coalesce(Subquery(active_tasks), 0)
+        with transaction.atomic(using=self.db):
+            repaired = self.exclude(active_tasks_count=actual_count).update(
+                active_tasks_count=actual_count, updated_at=timezone.now()
+            )
+            if repaired:
+                cache.invalidate()
+        return repaired
+
+
+class TaskManager(models.Manager):
+    """Менеджер задачи с запросами по иерархии parent_task."""
+
+    # Ограничение глубины защищает рекурсивный запрос от циклов в parent_task
+    MAX_TREE_DEPTH = 1000
+
+    DESCENDANTS = "t.parent_task_id = tree.id"
+    ANCESTORS = "t.id = tree.parent_task_id"
+
+    def subtree(self, pk, max_depth=None, limit=None):
+        """Задача pk и все ее потомки одним рекурсивным запросом.
+
+        Задачи упорядочены по уровню вложенности и содержат атрибут depth (0 - сама задача).
+        """
+        return self._tree_query(pk, self.DESCENDANTS, max_depth, limit)
+
+    def ancestors(self, pk, max_depth=None):
+        """Задача pk и цепочка ее родительских задач одним рекурсивным запросом.
+
+        Задачи упорядочены от pk к корню и содержат атрибут depth (0 - сама задача).
+        """
+        return self._tree_query(pk, self.ANCESTORS, max_depth)
+
+    def tree_cte(self, seed_condition, join_condition=DESCENDANTS, max_depth=None):
+        """SQL рекурсивного CTE tree (id, parent_task_id, depth) и его параметры.
+
+        Дерево начинается с задач, подходящих под seed_condition, и идет к потомкам или к родителям.
+        Параметры seed_condition передаются перед возвращенными параметрами.
+        """
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        max_depth = self.MAX_TREE_DEPTH if max_depth is None else min(max_depth, self.MAX_TREE_DEPTH)
+
+        sql = f"""
+            WITH RECURSIVE tree (id, parent_task_id, depth) AS (
+                SELECT id, parent_task_id, 0 FROM {table} WHERE {seed_condition}
+                UNION ALL
+                SELECT t.id, t.parent_task_id, tree.depth + 1
+                FROM {table} t JOIN tree ON {join_condition}
+                WHERE tree.depth < %s
+            )
+        """
+        return sql, [max_depth]
+
+    def _tree_query(self, pk, join_condition, max_depth=None, limit=None):
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        cte, cte_params = self.tree_cte("id = %s", join_condition, max_depth)
+        params = [pk, *cte_params]
+
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT %s"
+            params.append(limit)
+
+        sql = f"""
+            {cte}
+            SELECT {table}.*, tree.depth FROM {table} JOIN tree ON {table}.id = tree.id
+            ORDER BY tree.depth, {table}.id
+            {limit_clause}
+        """
+        return self.raw(sql, params)
 
 
 class Employee(models.Model):
@@ -10,13 +112,39 @@ class Employee(models.Model):
         max_length=255, help_text="Укажите должность сотрудника", verbose_name="Должность сотрудника"
     )
 
+    # Поддерживается F-выражениями при каждом изменении задач, см. tasks.signals
+    active_tasks_count = models.IntegerField(
+        default=0,
+        editable=False,
+        help_text="Количество незакрытых задач сотрудника",
+        verbose_name="Количество активных задач",
+    )
+
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Дата изменения")
+
+    objects = EmployeeQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.fullname} ({self.position})"
 
+    def save(self, *args, **kwargs):
+        # Обычное сохранение не перезаписывает счетчик значением, прочитанным до изменения задач
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "active_tasks_count"
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Сотрудник"
         verbose_name_plural = "Сотрудники"
-        ordering = ["fullname"]
+        ordering = ["fullname", "id"]
+        indexes = [
+            models.Index(fields=["fullname", "id"], name="employee_fullname_id_idx"),
+            models.Index(fields=["-active_tasks_count", "id"], name="employee_active_tasks_idx"),
+        ]
 
 
 class Task(models.Model):
@@ -63,10 +191,90 @@ class Task(models.Model):
         choices=STATUS_CHOICES, default="Open", help_text="Выберите статус задачи", verbose_name="Статус задачи"
     )
 
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Дата изменения")
+
+    # Назначается триггером базы при каждой записи строки, см. tasks.services.get_task_changes
+    change_id = models.BigIntegerField(
+        default=0, db_default=0, db_index=True, editable=False, verbose_name="Номер изменения"
+    )
+
+    objects = TaskManager()
+
     def __str__(self):
         return f"{self.name} ({self.status}) [{self.executor}]"
 
+    def save(self, *args, **kwargs):
+        # Сигналы pre_save и post_save выполняются в этой транзакции: строка задачи блокируется до пересчета
+        # счетчика активных задач, см. tasks.signals
+        with transaction.atomic(
+            using=kwargs.get("using") or router.db_for_write(Task, instance=self), savepoint=False
+        ):
+            super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Задача"
         verbose_name_plural = "Задачи"
-        ordering = ["name", "executor", "status"]
+        ordering = ["name", "id"]
+        indexes = [
+            models.Index(fields=["name", "id"], name="task_name_id_idx"),
+            models.Index(fields=["executor", "status"], name="task_executor_status_idx"),
+            models.Index(fields=["parent_task", "status"], name="task_parent_status_idx"),
+            # Частичный индекс создается только на базах с их поддержкой (Postgres, SQLite)
+            models.Index(fields=["executor"], condition=~Q(status="Closed"), name="task_active_executor_idx"),
+        ]
+
+
+class TaskTombstone(models.Model):
+    """Отметка об удалении задачи для инкрементальной синхронизации клиентов."""
+
+    task_id = models.BigIntegerField(verbose_name="Идентификатор удаленной задачи")
+
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Дата удаления")
+
+    # Назначается триггером базы, как у задачи
+    change_id = models.BigIntegerField(
+        default=0, db_default=0, db_index=True, editable=False, verbose_name="Номер изменения"
+    )
+
+    def __str__(self):
+        return f"{self.task_id} ({self.deleted_at})"
+
+    class Meta:
+        verbose_name = "Удаленная задача"
+        verbose_name_plural = "Удаленные задачи"
+
+
+class ExportJob(models.Model):
+    """Фоновая выгрузка задач или сотрудников в файл, см. tasks.exports."""
+
+    KIND_CHOICES = [("tasks", "tasks"), ("employees", "employees")]
+    FORMAT_CHOICES = [("csv", "csv"), ("ndjson", "ndjson")]
+    STATUS_CHOICES = [("pending", "pending"), ("running", "running"), ("done", "done"), ("failed", "failed")]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Выгружаемые объекты")
+    format = models.CharField(max_length=20, choices=FORMAT_CHOICES, verbose_name="Формат файла")
+    compress = models.BooleanField(default=False, verbose_name="Сжатие gzip")
+    filter = models.JSONField(default=dict, blank=True, verbose_name="Фильтр объектов")
+    fields = models.JSONField(null=True, blank=True, verbose_name="Выгружаемые поля")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending", verbose_name="Статус")
+    total_rows = models.IntegerField(null=True, blank=True, verbose_name="Всего строк")
+    processed_rows = models.IntegerField(default=0, verbose_name="Выгружено строк")
+    file = models.FileField(upload_to="exports/", blank=True, verbose_name="Файл выгрузки")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="export_jobs", verbose_name="Автор"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Дата завершения")
+    # Обновляется с каждым изменением прогресса, по нему находятся выгрузки, пропавшие вместе с процессом
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+
+    def __str__(self):
+        return f"{self.kind}.{self.format} ({self.status})"
+
+    class Meta:
+        verbose_name = "Выгрузка"
+        verbose_name_plural = "Выгрузки"
+        ordering = ["-created_at", "-id"]
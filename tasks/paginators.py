@@ -0,0 +1,168 @@
+import base64
+import binascii
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset, cap):
+    """Приблизительное количество строк queryset без полного COUNT(*).
+
+    На Postgres берется оценка планировщика из EXPLAIN, на остальных базах - COUNT с ограничением cap.
+    """
+    queryset = queryset.order_by()
+
+    if connections[queryset.db].vendor == "postgresql":
+        plan = json.loads(queryset.explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    return queryset[:cap].count()
+
+
+def get_query_params(request):
+    """Параметры запроса DRF или обычного HttpRequest Django."""
+    return getattr(request, "query_params", request.GET)
+
+
+class KeysetPagination(BasePagination):
+    """Курсорная пагинация по индексированной уникальной сортировке.
+
+    Следующая страница выбирается условием WHERE по значениям последней строки, а не через OFFSET,
+    поэтому стоимость страницы не зависит от ее номера.
+    """
+
+    ordering = ("id",)
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    count_cap = 10_000
+    invalid_cursor_message = "Некорректный курсор"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """Асинхронный вариант paginate_queryset для обычного HttpRequest Django."""
+        queryset = await sync_to_async(self.get_page_queryset)(queryset, request)
+        return self.set_page([obj async for obj in queryset])
+
+    def get_page_queryset(self, queryset, request):
+        """Запрос страницы с одной лишней строкой для определения следующей страницы."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.approximate_count = None
+
+        queryset = queryset.order_by(*self.ordering)
+
+        if get_query_params(request).get(self.count_query_param) in ("1", "true"):
+            self.approximate_count = estimate_count(queryset, self.count_cap)
+
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        response = {"next": self.get_next_link()}
+        if self.approximate_count is not None:
+            response["approximate_count"] = self.approximate_count
+        response["results"] = data
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "approximate_count": {"type": "integer"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(get_query_params(request)[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_position_filter(self, position):
+        """Условие (f1, f2, ...) > (v1, v2, ...) для полей сортировки."""
+        *leading, last = zip(self.ordering, position)
+        condition = Q(**{f"{last[0]}__gt": last[1]})
+
+        for field, value in reversed(leading):
+            condition = Q(**{f"{field}__gt": value}) | (Q(**{field: value}) & condition)
+
+        # Нестрогое условие по первому полю позволяет базе начать сканирование индекса с нужной позиции
+        field, value = self.ordering[0], position[0]
+        return Q(**{f"{field}__gte": value}) & condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        # Страница может состоять из объектов моделей или из строк .values()
+        last = self.page[-1]
+        position = [last[field] if isinstance(last, dict) else getattr(last, field) for field in self.ordering]
+        cursor = self.encode_cursor(position)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request, model):
+        """Значения полей сортировки из курсора, приведенные к типам полей model."""
+        encoded = get_query_params(request).get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Поля сортировки не допускают NULL, а составные значения to_python строковых полей не отклоняет
+        if any(value is None or isinstance(value, (dict, list)) for value in position):
+            raise NotFound(self.invalid_cursor_message)
+
+        try:
+            return [model._meta.get_field(field).to_python(value) for field, value in zip(self.ordering, position)]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+
+class TaskPagination(KeysetPagination):
+    """Пагинация задач."""
+
+    ordering = ("name", "id")
+
+
+class EmployeePagination(KeysetPagination):
+    """Пагинация сотрудников."""
+
+    ordering = ("fullname", "id")
@@ -0,0 +1,215 @@
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+
+from users.authentication import AsyncJWTAuthentication, CachedJWTAuthentication
+
+# Режимы профилирования: значение заголовка X-Profile или параметра ?profile=
+PROFILE_MODES = {"cprofile": ("cprofile",), "sample": ("sample",), "1": ("cprofile", "sample")}
+
+# Количество строк отчета cProfile
+REPORT_LIMIT = 50
+
+# cProfile профилирует один запрос процесса за раз: начиная с Python 3.12 профилировщик регистрируется
+# в sys.monitoring на весь процесс, и второй одновременный enable() завершается ValueError. В асинхронном
+# воркере одновременные запросы идут в одном потоке, поэтому блокировка не ожидается, а cProfile пропускается
+CPROFILE_LOCK = threading.Lock()
+
+
+class StackSampler:
+    """Сэмплирующий профилировщик: раз в interval секунд снимает стек потока thread_id.
+
+    Стеки копятся в формате collapsed stacks ("функция;функция;... количество"), который принимают
+    flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """Профилирует блок кода в текущем потоке выбранными профилировщиками ("cprofile", "sample").
+
+    Если cProfile уже профилирует другой запрос, он пропускается и попадает в skipped.
+    """
+
+    def __init__(self, modes, sample_interval):
+        self.profile = cProfile.Profile() if "cprofile" in modes else None
+        self.sampler = StackSampler(threading.get_ident(), sample_interval) if "sample" in modes else None
+        self.skipped = []
+
+    def __enter__(self):
+        if self.sampler:
+            self.sampler.start()
+        if self.profile:
+            self.enable_profile()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profile:
+            self.profile.disable()
+            CPROFILE_LOCK.release()
+        if self.sampler:
+            self.sampler.stop()
+
+    def enable_profile(self):
+        if CPROFILE_LOCK.acquire(blocking=False):
+            try:
+                self.profile.enable()
+                return
+            except ValueError:
+                # Профилировщик sys.monitoring занят другим инструментом, например отладчиком
+                CPROFILE_LOCK.release()
+        self.profile = None
+        self.skipped.append("cprofile")
+
+    def get_files(self):
+        """Файлы профиля: .prof для pstats и snakeviz, .txt с отчетом и деревом вызовов, .collapsed со стеками."""
+        files = {}
+        if self.profile:
+            report = io.StringIO()
+            stats = pstats.Stats(self.profile, stream=report)
+            # Формат dump_stats, который читают pstats.Stats(path) и snakeviz
+            files[".prof"] = marshal.dumps(stats.stats)
+            stats.sort_stats("cumulative").print_stats(REPORT_LIMIT)
+            stats.print_callees(REPORT_LIMIT)
+            files[".txt"] = report.getvalue().encode()
+        if self.sampler:
+            files[".collapsed"] = self.sampler.collapsed().encode()
+        return files
+
+
+def store_profile(directory, name, files, max_profiles):
+    """Сохраняет файлы профиля name в кольцевой буфер: хранятся только max_profiles последних профилей."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for suffix, content in files.items():
+        (directory / f"{name}{suffix}").write_bytes(content)
+
+    # Имена начинаются со времени создания, поэтому сортировка по имени - по времени
+    names = sorted({path.name.split(".", 1)[0] for path in directory.iterdir()})
+    for old in names[:-max_profiles]:
+        for path in directory.glob(f"{old}.*"):
+            path.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Профилирование запроса по заголовку X-Profile или параметру ?profile= от сотрудника (is_staff).
+
+    Значения: cprofile, sample или 1 (оба профилировщика). Профиль сохраняется в PROFILING_DIR,
+    его имя возвращается в заголовке X-Profile-Id. Профилировщики, пропущенные из-за одновременного
+    профилирования другого запроса, перечисляются в заголовке X-Profile-Skipped. Без заголовка и параметра
+    запрос не профилируется и middleware только проверяет их наличие.
+    Профилируется поток, обрабатывающий запрос. Для асинхронных представлений это поток цикла событий:
+    в профиль попадают и другие запросы этого воркера, а SQL-запросы из sync_to_async - нет.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", True):
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.directory = getattr(settings, "PROFILING_DIR", Path(settings.BASE_DIR) / "profiles")
+        self.max_profiles = getattr(settings, "PROFILING_MAX_PROFILES", 50)
+        self.sample_interval = getattr(settings, "PROFILING_SAMPLE_INTERVAL", 0.005)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def get_modes(self, request):
+        """Профилировщики, запрошенные заголовком или параметром, или None."""
+        value = request.headers.get("X-Profile")
+        if value is None and "profile=" in request.META.get("QUERY_STRING", ""):
+            value = request.GET.get("profile")
+        return PROFILE_MODES.get(value) if value else None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        modes = self.get_modes(request)
+        if modes is None or not self.is_staff(request):
+            return self.get_response(request)
+
+        with RequestProfiler(modes, self.sample_interval) as profiler:
+            response = self.get_response(request)
+        return self.save(request, response, profiler)
+
+    async def __acall__(self, request):
+        modes = self.get_modes(request)
+        if modes is None or not await self.ais_staff(request):
+            return await self.get_response(request)
+
+        with RequestProfiler(modes, self.sample_interval) as profiler:
+            response = await self.get_response(request)
+        return self.save(request, response, profiler)
+
+    def is_staff(self, request):
+        user = getattr(request, "user", None)
+        if user is None or not user.is_authenticated:
+            try:
+                credentials = CachedJWTAuthentication().authenticate(request)
+            except APIException:
+                return False
+            user = credentials[0] if credentials else None
+        return user is not None and user.is_staff
+
+    async def ais_staff(self, request):
+        user = await request.auser() if hasattr(request, "auser") else None
+        if user is None or not user.is_authenticated:
+            try:
+                credentials = await AsyncJWTAuthentication().aauthenticate(request)
+            except APIException:
+                return False
+            user = credentials[0] if credentials else None
+        return user is not None and user.is_staff
+
+    def save(self, request, response, profiler):
+        if profiler.skipped:
+            response.headers["X-Profile-Skipped"] = ",".join(profiler.skipped)
+
+        files = profiler.get_files()
+        if files:
+            name = f"{timezone.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+            store_profile(self.directory, name, files, self.max_profiles)
+            response.headers["X-Profile-Id"] = name
+        return response
@@ -0,0 +1,71 @@
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentation import timing
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Типы, которые не поддерживаются orjson и msgpack напрямую (ленивые строки, Decimal, datetime),
+# преобразуются так же, как в JSONRenderer
+encode_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSON-рендерер на orjson. Вывод совпадает с JSONRenderer с точностью до пробелов."""
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    @timing("render")
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        options = self.options
+        if self.get_indent(accepted_media_type or "", renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=encode_default, option=options)
+
+
+def stream_json_array(chunks):
+    """JSON-массив по частям: chunks - последовательность списков элементов массива."""
+    renderer = ORJSONRenderer()
+    separator = b"["
+    for chunk in chunks:
+        if chunk:
+            # Каждая часть рендерится как массив, скобки заменяются разделителем
+            yield separator + renderer.render(chunk)[1:-1]
+            separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack-рендерер, выбирается заголовком Accept: application/msgpack. Требует пакет msgpack."""
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    @timing("render")
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encode_default)
+
+
+class MessagePackParser(BaseParser):
+    """Парсер тела запроса с Content-Type: application/msgpack. Требует пакет msgpack."""
+
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), strict_map_key=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
@@ -1,14 +1,39 @@
-from rest_framework import serializers
+from itertools import islice
 
-from .models import Employee, Task
+from django.urls import reverse
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 
+from .instrumentation import timing
+from .models import Employee, ExportJob, Task
 
-class TaskSerializer(serializers.ModelSerializer):
+
+class DynamicFieldsMixin:
+    """Выбор полей сериализатора.
+
+    fields - выводимые поля (None - все), expand - раскрываемые вложенные поля.
+    Поля из Meta.expandable_fields выводятся только при раскрытии.
+    """
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, "expandable_fields", ())
+
+        for name in list(self.fields):
+            if name in expandable:
+                keep = name in expand
+            else:
+                keep = fields is None or name in fields
+            if not keep:
+                self.fields.pop(name)
+
+
+class TaskSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор задачи"""
 
     class Meta:
         model = Task
-        fields = "__all__"
+        exclude = ["change_id"]
 
 
 class ImportantTaskSerializer(serializers.ModelSerializer):
@@ -33,15 +58,269 @@ class CreateTaskSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "description", "parent_task", "executor", "period"]
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class BulkCreateTaskListSerializer(serializers.ListSerializer):
+    """Сериализатор списка задач, который проверяет каждый элемент отдельно.
+
+    Невалидные элементы заменяются на None, а их ошибки сохраняются в item_errors по индексу элемента.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            message = self.error_messages["not_a_list"].format(input_type=type(data).__name__)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]})
+
+        if self.max_length is not None and len(data) > self.max_length:
+            message = self.error_messages["max_length"].format(max_length=self.max_length)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]})
+
+        items = []
+        self.item_errors = {}
+        for index, item in enumerate(data):
+            try:
+                items.append(self.child.run_validation(item))
+            except serializers.ValidationError as exc:
+                items.append(None)
+                self.item_errors[index] = exc.detail
+
+        return items
+
+
+class BulkCreateTaskSerializer(serializers.ModelSerializer):
+    """Сериализатор задачи для массового создания.
+
+    Связанные объекты принимаются как id и проверяются для всего списка сразу, см. bulk_create_tasks.
+    """
+
+    parent_task = serializers.IntegerField(required=False, allow_null=True)
+    executor = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Task
+        list_serializer_class = BulkCreateTaskListSerializer
+        fields = ["name", "description", "parent_task", "executor", "period"]
+
+
+class BulkUpdateTaskFilterSerializer(serializers.ModelSerializer):
+    """Сериализатор фильтра задач для массового изменения."""
+
+    class Meta:
+        model = Task
+        fields = ["status", "executor", "parent_task"]
+        extra_kwargs = {field: {"required": False} for field in fields}
+
+
+class BulkUpdateTaskPatchSerializer(serializers.ModelSerializer):
+    """Сериализатор изменений для массового изменения задач."""
+
+    class Meta:
+        model = Task
+        fields = ["status", "executor", "period"]
+        extra_kwargs = {field: {"required": False} for field in fields}
+
+
+class BulkUpdateTaskSerializer(serializers.Serializer):
+    """Сериализатор массового изменения задач: список id или фильтр и изменения."""
+
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    filter = BulkUpdateTaskFilterSerializer(required=False)
+    patch = BulkUpdateTaskPatchSerializer()
+
+    def validate(self, attrs):
+        if ("ids" in attrs) == ("filter" in attrs):
+            raise serializers.ValidationError("Укажите либо ids, либо filter")
+        if "filter" in attrs and not attrs["filter"]:
+            raise serializers.ValidationError({"filter": "Фильтр не может быть пустым"})
+        if not attrs["patch"]:
+            raise serializers.ValidationError({"patch": "Укажите изменяемые поля"})
+        return attrs
+
+
+class EmployeeFilterSerializer(serializers.ModelSerializer):
+    """Сериализатор фильтра сотрудников для выгрузки."""
+
+    class Meta:
+        model = Employee
+        fields = ["position"]
+        extra_kwargs = {field: {"required": False} for field in fields}
+
+
+class TaskTreeQuerySerializer(serializers.Serializer):
+    """Сериализатор параметров запроса дерева задач."""
+
+    ancestors = serializers.BooleanField(default=False)
+    max_depth = serializers.IntegerField(min_value=0, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=10_000, default=10_000)
+
+
+class EmployeeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Сериализатор сотрудника"""
 
     tasks = TaskSerializer(read_only=True, many=True)
-    active_tasks_count = serializers.SerializerMethodField()
-
-    def get_active_tasks_count(self, obj):
-        return obj.tasks.exclude(status="Closed").count()
 
     class Meta:
         model = Employee
         fields = ["id", "fullname", "position", "active_tasks_count", "tasks"]
+        expandable_fields = ["tasks"]
+
+
+def compile_datetime_converter(field):
+    """Преобразование datetime как в DateTimeField.to_representation, с часовым поясом, определенным один раз.
+
+    Для формата, отличного от ISO 8601, и для наивных значений используется само поле.
+    """
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return convert
+
+
+class ValuesSerializer:
+    """Быстрая сериализация только для чтения по строкам .values() без создания объектов моделей.
+
+    Поля и преобразования значений берутся из ModelSerializer один раз, вывод совпадает с его data.
+    Поддерживаются поля модели, внешние ключи в виде id и вложенные списки по обратным внешним ключам.
+    """
+
+    # Поля, для которых значение из базы совпадает с выводом DRF
+    identity_fields = (
+        serializers.CharField,
+        serializers.ChoiceField,
+        serializers.IntegerField,
+        serializers.BooleanField,
+        serializers.PrimaryKeyRelatedField,
+    )
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.pk = self.model._meta.pk.attname
+        # (имя поля, столбец, преобразование) или (имя поля, None, вложенный сериализатор)
+        self.fields = []
+        self.nested = {}
+
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.ListSerializer):
+                relation = self.model._meta.get_field(field.source)
+                self.nested[name] = (ValuesSerializer(field.child), relation.related_model, relation.field.attname)
+                self.fields.append((name, None, None))
+                continue
+
+            column = self.model._meta.get_field(field.source).attname
+            self.fields.append((name, column, self.get_converter(field)))
+
+    def get_converter(self, field):
+        """Преобразование значения из базы в вывод поля или None, если значение выводится как есть."""
+        if isinstance(field, self.identity_fields):
+            return None
+        if isinstance(field, serializers.DateTimeField):
+            return compile_datetime_converter(field)
+        return field.to_representation
+
+    def get_queryset(self, queryset, required=()):
+        """Запрос строк со столбцами выводимых полей и полями required."""
+        columns = {self.pk, *required, *(column for _, column, _ in self.fields if column is not None)}
+        return queryset.prefetch_related(None).values(*columns)
+
+    @timing("serialize")
+    def serialize(self, rows):
+        rows = list(rows)
+        children = {
+            name: self.serialize_children(rows, serializer, model, column)
+            for name, (serializer, model, column) in self.nested.items()
+        }
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, converter in self.fields:
+                if column is None:
+                    item[name] = children[name].get(row[self.pk], [])
+                    continue
+
+                value = row[column]
+                item[name] = value if converter is None or value is None else converter(value)
+            data.append(item)
+        return data
+
+    def serialize_chunks(self, queryset, chunk_size):
+        """Сериализует строки queryset частями по chunk_size, не загружая весь результат в память."""
+        rows = queryset.iterator(chunk_size=chunk_size)
+        while chunk := list(islice(rows, chunk_size)):
+            yield self.serialize(chunk)
+
+    def serialize_children(self, rows, serializer, model, column):
+        """Вложенные объекты одним запросом, сгруппированные по id родителя."""
+        parents = [row[self.pk] for row in rows]
+        if not parents:
+            return {}
+
+        children = list(serializer.get_queryset(model._default_manager.filter(**{f"{column}__in": parents}), [column]))
+        grouped = {}
+        for row, item in zip(children, serializer.serialize(children)):
+            grouped.setdefault(row[column], []).append(item)
+        return grouped
+
+
+# Сериализаторы объектов выгрузки и их фильтров
+EXPORT_SERIALIZERS = {"tasks": TaskSerializer, "employees": EmployeeSerializer}
+EXPORT_FILTER_SERIALIZERS = {"tasks": BulkUpdateTaskFilterSerializer, "employees": EmployeeFilterSerializer}
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    """Сериализатор фоновой выгрузки."""
+
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            "id",
+            "kind",
+            "format",
+            "compress",
+            "filter",
+            "fields",
+            "status",
+            "total_rows",
+            "processed_rows",
+            "error",
+            "created_at",
+            "finished_at",
+            "download_url",
+        ]
+        read_only_fields = ["status", "total_rows", "processed_rows", "error", "created_at", "finished_at"]
+
+    def get_download_url(self, obj):
+        if obj.status != "done":
+            return None
+        url = reverse("tasks:export-download", kwargs={"pk": obj.pk})
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
+    def validate(self, attrs):
+        kind = attrs["kind"]
+
+        filter_serializer = EXPORT_FILTER_SERIALIZERS[kind](data=attrs.get("filter", {}))
+        if not filter_serializer.is_valid():
+            raise serializers.ValidationError({"filter": filter_serializer.errors})
+        # Связанные объекты сохраняются в фильтре как id
+        attrs["filter"] = {key: getattr(value, "pk", value) for key, value in filter_serializer.validated_data.items()}
+
+        fields = attrs.get("fields")
+        if fields is not None:
+            available = set(EXPORT_SERIALIZERS[kind]().fields)
+            if not isinstance(fields, list) or not fields or not set(fields) <= available:
+                raise serializers.ValidationError(
+                    {"fields": [f"Укажите список полей из: {', '.join(sorted(available))}"]}
+                )
+        return attrs
@@ -1,35 +1,357 @@
-def search_employee(important_tasks, employees_stats, min_tasks_count):
-    """Функция для поиска рекомендованного на задачу сотрудника."""
-    recommended_employees = {}
+import base64
+import binascii
+import heapq
+import json
+from collections import Counter, defaultdict
 
-    for task in important_tasks:
-        suitable_employees = []
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework.relations import PrimaryKeyRelatedField
 
-        for employee in employees_stats:
-            is_least_loaded = employee.active_tasks_count == min_tasks_count
+from . import cache
+from .models import Employee, Task, TaskTombstone, active_executor_id
 
-            is_parent_with_tolerance = False
-            if task.parent_task and task.parent_task.executor:
-                is_parent_with_tolerance = (
-                    employee == task.parent_task.executor and employee.active_tasks_count <= min_tasks_count + 2
-                )
+NOT_ASSIGNED = "Не назначен"
 
-            if is_least_loaded or is_parent_with_tolerance:
+# Позиция синхронизации: все изменения с номером change_id меньше позиции уже зафиксированы и видны.
+# На Postgres change_id - номер транзакции, а позиция - наименьший номер транзакции, не завершенной
+# в момент снимка. На SQLite незафиксированной может быть только одна транзакция, и ее номера больше
+# всех выданных ранее, поэтому позиция - следующее значение счетчика номеров (см. миграцию 0010).
+SYNC_POSITION_SQL = {
+    "postgresql": "pg_snapshot_xmin(pg_current_snapshot())::text::bigint",
+    "sqlite": "(SELECT value + 1 FROM tasks_change_counter)",
+}
 
-                if is_least_loaded:
-                    priority = 1
-                else:
-                    priority = 2
 
-                suitable_employees.append(
-                    {"employee": employee, "priority": priority, "tasks_count": employee.active_tasks_count}
-                )
+def search_employee(important_tasks, employees_stats):
+    """Функция для поиска рекомендованного на задачу сотрудника.
 
-        if suitable_employees:
-            suitable_employees.sort(key=lambda x: (x["priority"], x["tasks_count"]))
-            best_employee = suitable_employees[0]["employee"]
-            recommended_employees[task.id] = best_employee.fullname
-        else:
-            recommended_employees[task.id] = "Не назначен"
+    Рекомендуется наименее загруженный сотрудник, при равной загрузке - первый в employees_stats.
+    Загрузка сотрудников читается одним запросом, после чего сотрудники выбираются из кучи
+    с ключом (количество активных задач, порядок). После каждой рекомендации загрузка выбранного
+    сотрудника увеличивается, поэтому задачи из одной выборки распределяются между сотрудниками.
+    """
+    names = {}
+    heap = []
+
+    for position, (employee_id, fullname, active_tasks_count) in enumerate(
+        employees_stats.values_list("id", "fullname", "active_tasks_count")
+    ):
+        names[employee_id] = fullname
+        heap.append((active_tasks_count, position, employee_id))
+
+    heapq.heapify(heap)
+    recommended_employees = {}
+
+    for task_id in important_tasks.values_list("id", flat=True):
+        if not heap:
+            recommended_employees[task_id] = NOT_ASSIGNED
+            continue
+
+        # Выбранный сотрудник остается в куче с увеличенной загрузкой
+        active_tasks_count, position, employee_id = heap[0]
+        recommended_employees[task_id] = names[employee_id]
+        heapq.heapreplace(heap, (active_tasks_count + 1, position, employee_id))
 
     return recommended_employees
+
+
+def get_initial_status(executor):
+    """Статус задачи после создания или изменения: с исполнителем - "To Do", без него - "Open"."""
+    if executor:
+        return "To Do"
+    return "Open"
+
+
+def shift_active_tasks_count(deltas):
+    """Изменяет счетчики активных задач сотрудников на величины из словаря {id сотрудника: изменение}.
+
+    Сотрудники с одинаковым изменением обновляются одним запросом UPDATE.
+    """
+    employees_by_delta = defaultdict(list)
+    for employee_id, delta in deltas.items():
+        if employee_id is not None and delta:
+            employees_by_delta[delta].append(employee_id)
+
+    for delta, employee_ids in employees_by_delta.items():
+        Employee.objects.filter(pk__in=employee_ids).update(
+            active_tasks_count=F("active_tasks_count") + delta, updated_at=timezone.now()
+        )
+
+
+def bulk_create_tasks(items, partial=False):
+    """Массовое создание задач одним INSERT.
+
+    items - данные, провалидированные BulkCreateTaskSerializer, или None для невалидных элементов.
+    Родительские задачи и исполнители проверяются одним запросом на каждую модель.
+    Возвращает созданные задачи и словарь ошибок {индекс элемента: ошибки}.
+    Если partial=False, при любой ошибке задачи не создаются.
+    """
+    related = {"parent_task": Task, "executor": Employee}
+    existing = {}
+    for field, model in related.items():
+        ids = {item[field] for item in items if item and item.get(field) is not None}
+        existing[field] = set(model.objects.filter(pk__in=ids).values_list("id", flat=True)) if ids else set()
+
+    does_not_exist = PrimaryKeyRelatedField.default_error_messages["does_not_exist"]
+    errors = {}
+    for index, item in enumerate(items):
+        if item is None:
+            continue
+        for field in related:
+            pk = item.get(field)
+            if pk is not None and pk not in existing[field]:
+                errors.setdefault(index, {})[field] = [does_not_exist.format(pk_value=pk)]
+
+    if errors and not partial:
+        return [], errors
+
+    tasks = [
+        Task(
+            name=item["name"],
+            description=item.get("description"),
+            parent_task_id=item.get("parent_task"),
+            executor_id=item.get("executor"),
+            period=item["period"],
+            status=get_initial_status(item.get("executor")),
+        )
+        for index, item in enumerate(items)
+        if item is not None and index not in errors
+    ]
+
+    with transaction.atomic():
+        # bulk_create не отправляет сигналы, поэтому счетчики и кэш обновляются здесь
+        tasks = Task.objects.bulk_create(tasks)
+        shift_active_tasks_count(Counter(task.executor_id for task in tasks))
+        cache.invalidate()
+
+    return tasks, errors
+
+
+def bulk_update_tasks(queryset, patch):
+    """Применяет изменения ко всем задачам queryset одним UPDATE. Возвращает количество измененных задач.
+
+    Как и при изменении одной задачи, назначение исполнителя без явного статуса ставит статус "To Do"
+    (или "Open" без исполнителя).
+    """
+    values = dict(patch, updated_at=timezone.now())
+    if "executor" in values and "status" not in values:
+        values["status"] = get_initial_status(values["executor"])
+
+    with transaction.atomic():
+        # Блокировка строк сохраняет набор задач неизменным до UPDATE, по нему же пересчитываются счетчики
+        rows = list(queryset.select_for_update().values_list("executor_id", "status"))
+        updated = queryset.update(**values)
+
+        deltas = Counter()
+        for executor_id, status in rows:
+            if "executor" in values:
+                new_executor_id = values["executor"].pk if values["executor"] else None
+            else:
+                new_executor_id = executor_id
+            deltas[active_executor_id(executor_id, status)] -= 1
+            deltas[active_executor_id(new_executor_id, values.get("status", status))] += 1
+
+        # bulk update не отправляет сигналы, поэтому счетчики и кэш обновляются здесь
+        shift_active_tasks_count(deltas)
+        cache.invalidate()
+
+    return updated
+
+
+def build_task_tree(tasks_data):
+    """Собирает вложенное дерево из сериализованных задач, упорядоченных от корня к листьям.
+
+    Каждая задача получает список children. Возвращает корневую задачу.
+    """
+    nodes = {}
+    root = None
+    for task_data in tasks_data:
+        node = {**task_data, "children": []}
+        nodes[node["id"]] = node
+
+        parent = nodes.get(node["parent_task"])
+        if parent is not None:
+            parent["children"].append(node)
+        elif root is None:
+            root = node
+
+    return root
+
+
+def delete_task_trees(seed_condition, params):
+    """Удаляет задачи, подходящие под условие seed_condition, вместе со всеми потомками.
+
+    Каскад выполняется в базе одним запросом DELETE с рекурсивным CTE, без загрузки потомков в Python.
+    Сигналы не отправляются, поэтому счетчики активных задач, отметки об удалении и кэш обновляются здесь.
+    Возвращает количество удаленных задач.
+    """
+    table = connection.ops.quote_name(Task._meta.db_table)
+    cte, cte_params = Task.objects.tree_cte(seed_condition)
+    params = [*params, *cte_params]
+    # CTE внутри подзапроса: запрос начинается с DELETE, и драйвер SQLite возвращает rowcount.
+    # Поддеревья разных корней могут пересекаться, IN убирает повторы.
+    subtree_condition = f"id IN ({cte} SELECT id FROM tree)"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT executor_id, COUNT(*) FROM {table}
+            WHERE {subtree_condition} AND executor_id IS NOT NULL AND status <> %s
+            GROUP BY executor_id
+            """,
+            [*params, "Closed"],
+        )
+        deltas = {executor_id: -count for executor_id, count in cursor.fetchall()}
+
+        tombstones = connection.ops.quote_name(TaskTombstone._meta.db_table)
+        cursor.execute(
+            f"INSERT INTO {tombstones} (task_id, deleted_at) SELECT id, %s FROM {table} WHERE {subtree_condition}",
+            [timezone.now(), *params],
+        )
+
+        cursor.execute(f"DELETE FROM {table} WHERE {subtree_condition}", params)
+        deleted = cursor.rowcount
+
+        shift_active_tasks_count(deltas)
+        cache.invalidate()
+
+    return deleted
+
+
+def delete_task_subtree(pk):
+    """Удаляет задачу pk со всеми подзадачами. Возвращает количество удаленных задач."""
+    return delete_task_trees("id = %s", [pk])
+
+
+def delete_employee(pk):
+    """Удаляет сотрудника pk вместе с его задачами и их подзадачами.
+
+    Возвращает количество удаленных сотрудников и задач.
+    """
+    with transaction.atomic():
+        deleted_tasks = delete_task_trees("executor_id = %s", [pk])
+        deleted_employees, _ = Employee.objects.filter(pk=pk).delete()
+
+    return deleted_employees, deleted_tasks
+
+
+def encode_sync_token(position, issued_at, tasks_after=None, deleted_after=None):
+    """Токен синхронизации.
+
+    Токен содержит позицию, с которой начнется следующий проход, и время ее чтения в секундах Unix. Токен
+    следующей страницы прохода содержит еще позиции (change_id, id) последних отданных задач и отметок об удалении.
+    """
+    state = [position, issued_at]
+    if tasks_after is not None:
+        state += [*tasks_after, *deleted_after]
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+
+def decode_sync_token(token):
+    """Позиция, время ее чтения и позиции страницы (или None) из токена синхронизации.
+
+    Для некорректного токена - ValueError.
+    """
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Некорректный токен синхронизации") from exc
+
+    if (
+        not isinstance(state, list)
+        or len(state) not in (2, 6)
+        or any(type(value) is not int or value < 0 for value in state)
+    ):
+        raise ValueError("Некорректный токен синхронизации")
+
+    position, issued_at, *page = state
+    if not page:
+        return position, issued_at, None, None
+    return position, issued_at, tuple(page[:2]), tuple(page[2:])
+
+
+def is_sync_token_expired(issued_at):
+    """Токен выдан раньше, чем начинается срок хранения отметок об удалении.
+
+    Отметки, нужные такому токену, могли быть удалены командой prune_tombstones, поэтому клиенту
+    нужна полная синхронизация.
+    """
+    return issued_at < (timezone.now() - settings.TASK_TOMBSTONE_RETENTION).timestamp()
+
+
+def prune_tombstones():
+    """Удаляет отметки об удалении старше TASK_TOMBSTONE_RETENTION. Возвращает количество удаленных отметок."""
+    deleted, _ = TaskTombstone.objects.filter(
+        deleted_at__lt=timezone.now() - settings.TASK_TOMBSTONE_RETENTION
+    ).delete()
+    return deleted
+
+
+def after_change(change_id, pk):
+    """Условие (change_id, id) > (change_id, pk)."""
+    # Нестрогое условие по change_id позволяет базе начать сканирование индекса с нужной позиции
+    return Q(change_id__gte=change_id) & (Q(change_id__gt=change_id) | Q(change_id=change_id, id__gt=pk))
+
+
+def get_task_changes(since, tasks_after=None, deleted_after=None, limit=1000):
+    """Страница изменений задач для токена синхронизации.
+
+    Изменения отдаются проходами. Первый запрос прохода читает позицию - все изменения с номером меньше нее
+    зафиксированы и видны - и наличие изменений начиная с since одним запросом по индексам change_id, то есть
+    из одного снимка базы. Страницы прохода идут по (change_id, id) задач и отметок об удалении, не больше
+    limit каждых, и несут позицию из первого запроса. Следующий проход начинается с этой позиции: изменения
+    транзакций, не зафиксированных к ее чтению, попадут в него, как бы долго транзакции ни шли. Изменения
+    начиная с позиции могут прийти повторно, клиент должен применять их идемпотентно.
+
+    Без since проход начинается с начала и возвращает все задачи. Возвращает позицию, позиции следующей
+    страницы (None после последней страницы прохода), задачи и id удаленных задач.
+    """
+    if tasks_after is None:
+        position, has_changes = read_sync_position(since)
+        if not has_changes:
+            return position, None, None, [], []
+        # Клиенту без токена отметки об удалении нужны только для задач, удаленных после чтения позиции
+        tasks_after, deleted_after = (since or 0, 0), (since if since is not None else position, 0)
+    else:
+        position = since
+
+    changed = list(Task.objects.filter(after_change(*tasks_after)).order_by("change_id", "id")[: limit + 1])
+    deleted = list(
+        TaskTombstone.objects.filter(after_change(*deleted_after))
+        .order_by("change_id", "id")
+        .values_list("change_id", "id", "task_id")[: limit + 1]
+    )
+
+    if len(changed) <= limit and len(deleted) <= limit:
+        return position, None, None, changed, [task_id for _, _, task_id in deleted]
+
+    changed, deleted = changed[:limit], deleted[:limit]
+    if changed:
+        tasks_after = (changed[-1].change_id, changed[-1].id)
+    if deleted:
+        deleted_after = deleted[-1][:2]
+    return position, tasks_after, deleted_after, changed, [task_id for _, _, task_id in deleted]
+
+
+def read_sync_position(since):
+    """Позиция синхронизации и наличие изменений начиная с since (без since - наличие задач)."""
+    tasks = connection.ops.quote_name(Task._meta.db_table)
+    tombstones = connection.ops.quote_name(TaskTombstone._meta.db_table)
+    position_sql = SYNC_POSITION_SQL[connection.vendor]
+
+    with connection.cursor() as cursor:
+        if since is None:
+            cursor.execute(f"SELECT {position_sql}, EXISTS (SELECT 1 FROM {tasks})")
+        else:
+            cursor.execute(
+                f"""
+                SELECT {position_sql},
+                    EXISTS (SELECT 1 FROM {tasks} WHERE change_id >= %s)
+                    OR EXISTS (SELECT 1 FROM {tombstones} WHERE change_id >= %s)
+                """,
+                [since, since],
+            )
+        return cursor.fetchone()
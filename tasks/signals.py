@@ -0,0 +1,79 @@
+from collections import Counter
+
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache
+from .instrumentation import record_query
+from .models import Employee, Task, TaskTombstone, active_executor_id
+from .services import shift_active_tasks_count
+
+
+@receiver(pre_save, sender=Task)
+def remember_active_executor(sender, instance, using, update_fields, **kwargs):
+    """Запоминает сотрудника, у которого задача учитывалась до сохранения.
+
+    Значения читаются из базы с блокировкой строки, а не из загруженного экземпляра: экземпляр мог устареть,
+    а параллельное сохранение той же задачи дождется конца транзакции Task.save и прочитает новые значения.
+    """
+    if update_fields is not None and not {"executor", "status"} & set(update_fields):
+        return
+
+    previous = None
+    if instance.pk is not None:
+        loaded_values = (
+            Task.objects.using(using)
+            .select_for_update()
+            .filter(pk=instance.pk)
+            .values_list("executor_id", "status")
+            .first()
+        )
+        if loaded_values is not None:
+            previous = active_executor_id(*loaded_values)
+
+    instance._loaded_active_executor = previous
+
+
+@receiver(post_save, sender=Task)
+def update_active_tasks_on_save(sender, instance, update_fields, **kwargs):
+    """Переносит задачу в счетчиках при создании, переназначении и закрытии."""
+    if update_fields is not None and not {"executor", "status"} & set(update_fields):
+        return
+
+    previous = instance._loaded_active_executor
+    current = active_executor_id(instance.executor_id, instance.status)
+
+    if previous != current:
+        deltas = Counter()
+        deltas[previous] -= 1
+        deltas[current] += 1
+        shift_active_tasks_count(deltas)
+
+
+@receiver(post_delete, sender=Task)
+def update_active_tasks_on_delete(sender, instance, **kwargs):
+    """Уменьшает счетчик исполнителя удаленной задачи."""
+    shift_active_tasks_count({active_executor_id(instance.executor_id, instance.status): -1})
+
+
+@receiver(post_delete, sender=Task)
+def record_tombstone(sender, instance, **kwargs):
+    """Сохраняет отметку об удалении задачи для синхронизации клиентов."""
+    TaskTombstone.objects.create(task_id=instance.pk)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_cache(sender, **kwargs):
+    """Сбрасывает кэш ответов при любом изменении задач и сотрудников."""
+    cache.invalidate()
+
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    """Подключает замер SQL-запросов для заголовка Server-Timing к новому соединению."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,107 @@
+import math
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from . import cache
+from .models import Employee, Task, active_executor_id
+
+# Распределение статусов по умолчанию: доли задач в процентах
+STATUS_WEIGHTS = {"Open": 30, "To Do": 20, "In Progress": 25, "Done": 10, "Reopened": 5, "Closed": 10}
+
+# Доля корневых задач, остальные задачи получают родителя
+ROOT_SHARE = 0.3
+
+# Сроки задач отсчитываются от фиксированной даты, чтобы данные не зависели от дня запуска
+BASE_PERIOD = datetime(2025, 1, 1, 9, 0, tzinfo=timezone.utc)
+
+FIRST_NAMES = ["Иван", "Петр", "Анна", "Мария", "Олег", "Елена", "Сергей", "Ольга", "Дмитрий", "Наталья"]
+LAST_NAMES = ["Иванов", "Петров", "Смирнов", "Кузнецов", "Попов", "Соколов", "Лебедев", "Козлов", "Новиков"]
+POSITIONS = ["Разработчик", "Тестировщик", "Аналитик", "Дизайнер", "Менеджер проекта", "DevOps-инженер"]
+TASK_VERBS = ["Реализовать", "Исправить", "Проверить", "Описать", "Оптимизировать", "Согласовать"]
+TASK_OBJECTS = ["API задач", "отчет", "миграцию", "форму входа", "поиск", "экспорт", "уведомления", "кэш"]
+
+
+def parse_status_weights(value):
+    """Распределение статусов из строки вида "Open=30,Closed=10"."""
+    choices = dict(Task.STATUS_CHOICES)
+    weights = {}
+    for item in value.split(","):
+        status, _, weight = item.partition("=")
+        status = status.strip()
+        if status not in choices:
+            raise ValueError(f"Неизвестный статус {status!r}")
+        weights[status] = float(weight)
+        if not math.isfinite(weights[status]) or weights[status] < 0:
+            raise ValueError(f"Вес статуса {status!r} должен быть неотрицательным числом")
+    if not any(weights.values()):
+        raise ValueError("Сумма весов статусов должна быть больше нуля")
+    return weights
+
+
+def seed_synthetic(employees=1_000, tasks=10_000, depth=3, status_weights=None, seed=0, batch_size=5_000):
+    """Создает employees сотрудников и tasks задач, детерминированно по seed.
+
+    Задачи образуют деревья глубиной не больше depth уровней, статусы выбираются по status_weights.
+    У задач со статусом "Open" нет исполнителя, как у созданных через API.
+    Возвращает количество созданных задач по уровням дерева.
+    """
+    rng = random.Random(seed)
+    status_weights = status_weights or STATUS_WEIGHTS
+
+    # Структура деревьев строится в памяти: (уровень, индекс родителя) для каждой задачи
+    levels = []
+    parents = []
+    candidates = []
+    for index in range(tasks):
+        if not candidates or rng.random() < ROOT_SHARE:
+            level, parent = 0, None
+        else:
+            parent = rng.choice(candidates)
+            level = levels[parent] + 1
+        levels.append(level)
+        parents.append(parent)
+        if level < depth - 1:
+            candidates.append(index)
+
+    statuses = rng.choices(list(status_weights), weights=list(status_weights.values()), k=tasks)
+    executors = [None if status == "Open" or not employees else rng.randrange(employees) for status in statuses]
+
+    # Счетчики активных задач заполняются сразу, bulk_create не отправляет сигналы
+    active_tasks = Counter(active_executor_id(executor, status) for executor, status in zip(executors, statuses))
+    staff = Employee.objects.bulk_create(
+        (
+            Employee(
+                fullname=f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)} {index}",
+                position=rng.choice(POSITIONS),
+                active_tasks_count=active_tasks[index],
+            )
+            for index in range(employees)
+        ),
+        batch_size=batch_size,
+    )
+
+    # Задачи создаются по уровням, чтобы id родителей были известны при вставке
+    task_ids = [None] * tasks
+    by_level = Counter(levels)
+    for level in range(max(by_level, default=-1) + 1):
+        indexes = [index for index in range(tasks) if levels[index] == level]
+        created = Task.objects.bulk_create(
+            (
+                Task(
+                    name=f"{rng.choice(TASK_VERBS)} {rng.choice(TASK_OBJECTS)} #{index}",
+                    description=rng.choice([None, f"Подробности задачи #{index}"]),
+                    parent_task_id=task_ids[parents[index]] if parents[index] is not None else None,
+                    executor_id=staff[executors[index]].pk if executors[index] is not None else None,
+                    period=BASE_PERIOD + timedelta(hours=rng.randrange(-30 * 24, 90 * 24)),
+                    status=statuses[index],
+                )
+                for index in indexes
+            ),
+            batch_size=batch_size,
+        )
+        for index, task in zip(indexes, created):
+            task_ids[index] = task.pk
+
+    cache.invalidate()
+    return dict(sorted(by_level.items()))
@@ -1,11 +1,50 @@
-from django.db.models import Count, Min, Q
+import asyncio
+import base64
+import gzip
+import json
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+from functools import partial
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from prometheus_client.parser import text_string_to_metric_families
 from rest_framework import status
-from rest_framework.test import APITestCase
-
-from tasks.models import Employee, Task
-from tasks.services import search_employee
-from tasks.views import ImportantTasksViewSet
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from tasks import urls as tasks_urls
+from tasks.benchmarks import SCENARIOS, bench_endpoints, compare_reports, rollback_atomic
+from tasks.cache import cached_response, get_cache_stats, get_response_key
+from tasks.exports import STALE_EXPORT_ERROR, run_export, run_export_thread
+from tasks.metrics import render_metrics
+from tasks.models import Employee, ExportJob, Task, TaskTombstone
+from tasks.profiling import RequestProfiler
+from tasks.renderers import msgpack
+from tasks.serializers import EmployeeSerializer, TaskSerializer, ValuesSerializer
+from tasks.services import encode_sync_token, search_employee
+from tasks.synthetic import seed_synthetic
+from tasks.views import ImportantTasksViewSet, TaskViewSet
+from users import urls as users_urls
+from users.authentication import local_user_cache
 from users.models import User
 
 
@@ -67,8 +106,8 @@ class TaskTestCase(APITestCase):
         response = self.client.get("/tasks/")
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["name"], "test list")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["name"], "test list")
 
     def test_list_task_no_auth(self):
         """Тестирование вывода всех объектов Задача без авторизации."""
@@ -172,8 +211,8 @@ class EmployeeTestCase(APITestCase):
         response = self.client.get("/employees/")
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["fullname"], "test list")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["fullname"], "test list")
 
     def test_list_employee_no_auth(self):
         """Тестирование вывода всех объектов Сотрудник без авторизации."""
@@ -312,6 +351,830 @@ class BusyEmployeesAPIViewTestCase(APITestCase):
         self.assertEqual(task_counts.count(0), 1)
 
 
+class KeysetPaginationTestCase(APITestCase):
+    """Тестирование курсорной пагинации списков."""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email="test@test.com",
+            password="test",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        # Одинаковые наименования проверяют сортировку по id внутри группы
+        for i in range(7):
+            Task.objects.create(name=f"Task {i // 2}", period="2025-09-01T09:00:00Z", status="Open")
+
+    def test_pages_cover_all_tasks_once(self):
+        """Тестирование обхода всех страниц без пропусков и повторов."""
+        ids = []
+        url = "/tasks/?page_size=3"
+
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["results"]), 3)
+            ids.extend(task["id"] for task in response.data["results"])
+            url = response.data["next"]
+
+        expected = list(Task.objects.order_by("name", "id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_approximate_count(self):
+        """Тестирование приблизительного количества задач."""
+        response = self.client.get("/tasks/?page_size=2&count=1")
+
+        self.assertEqual(response.data["approximate_count"], 7)
+        self.assertNotIn("approximate_count", self.client.get("/tasks/").data)
+
+    def test_invalid_cursor(self):
+        """Тестирование некорректного курсора."""
+        response = self.client.get("/tasks/?cursor=invalid")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        for position in (["A"], ["A", "abc"], ["A", {"x": 1}], [None, None], [["A"], 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            for path in ("/tasks/", "/employees/"):
+                with self.subTest(position=position, path=path):
+                    response = self.client.get(path, {"cursor": cursor})
+                    self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class EmployeeQueryCountTestCase(APITestCase):
+    """Тестирование количества запросов при выводе сотрудников."""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email="test@test.com",
+            password="test",
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_employees(self, count):
+        for i in range(count):
+            employee = Employee.objects.create(fullname=f"Employee {i}", position="Dev")
+            Task.objects.create(name=f"Task {i}", period="2025-09-01T09:00:00Z", status="To Do", executor=employee)
+            Task.objects.create(name=f"Closed {i}", period="2025-09-01T09:00:00Z", status="Closed", executor=employee)
+
+    def test_query_count_does_not_depend_on_employees(self):
+        """Тестирование постоянного количества запросов для списков сотрудников."""
+        # Для /employees/ добавляются агрегаты версии ответа (ETag), с ?expand=tasks - и по задачам
+        for url, queries in (
+            ("/employees/?expand=tasks", 4),
+            ("/busy_employees/?expand=tasks", 2),
+            ("/employees/", 2),
+            ("/busy_employees/", 1),
+        ):
+            with self.subTest(url=url):
+                Employee.objects.all().delete()
+                self.create_employees(2)
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                data = response.data["results"] if url.startswith("/employees/") else response.data
+                self.assertEqual(len(data), 2)
+
+                self.create_employees(20)
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                data = response.data["results"] if url.startswith("/employees/") else response.data
+                self.assertEqual(len(data), 22)
+                self.assertEqual(data[0]["active_tasks_count"], 1)
+                if "expand" in url:
+                    self.assertEqual(len(data[0]["tasks"]), 2)
+                else:
+                    self.assertNotIn("tasks", data[0])
+
+
+class ActiveTasksCounterTestCase(APITestCase):
+    """Тестирование счетчика активных задач сотрудника."""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email="test@test.com",
+            password="test",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.employee1 = Employee.objects.create(fullname="Employee 1", position="Dev")
+        self.employee2 = Employee.objects.create(fullname="Employee 2", position="Tester")
+
+    def assertCounts(self, first, second):
+        self.employee1.refresh_from_db()
+        self.employee2.refresh_from_db()
+        self.assertEqual((self.employee1.active_tasks_count, self.employee2.active_tasks_count), (first, second))
+
+    def test_counter_follows_task_changes(self):
+        """Тестирование изменения счетчика при создании, переназначении, закрытии и удалении задачи."""
+        data = {"name": "Task", "period": "2025-09-01T09:00:00Z", "executor": self.employee1.id}
+        task_id = self.client.post("/tasks/create/", data=data).data["id"]
+        self.assertCounts(1, 0)
+
+        self.client.patch(
+            reverse("tasks:task-update", kwargs={"pk": task_id}), data={"executor": self.employee2.id}, format="json"
+        )
+        self.assertCounts(0, 1)
+
+        task = Task.objects.get(pk=task_id)
+        task.status = "Closed"
+        task.save()
+        self.assertCounts(0, 0)
+
+        task.status = "Reopened"
+        task.save()
+        self.assertCounts(0, 1)
+
+        self.client.delete(reverse("tasks:task-delete", kwargs={"pk": task_id}))
+        self.assertCounts(0, 0)
+
+    def test_counter_on_cascade_delete(self):
+        """Тестирование счетчика при каскадном удалении подзадач."""
+        parent = Task.objects.create(name="Parent", period="2025-09-01T09:00:00Z", executor=self.employee1)
+        Task.objects.create(name="Child", period="2025-09-01T09:00:00Z", executor=self.employee2, parent_task=parent)
+        self.assertCounts(1, 1)
+
+        parent.delete()
+        self.assertCounts(0, 0)
+
+    def test_employee_save_keeps_counter(self):
+        """Тестирование сохранения сотрудника с устаревшим значением счетчика."""
+        Task.objects.create(name="Task", period="2025-09-01T09:00:00Z", executor=self.employee1)
+
+        self.employee1.fullname = "Renamed"
+        self.employee1.save()
+        self.assertCounts(1, 0)
+
+    def test_counter_with_stale_instance(self):
+        """Тестирование закрытия задачи, переназначенной после загрузки экземпляра."""
+        Task.objects.create(name="Task", period="2025-09-01T09:00:00Z", executor=self.employee1)
+        task = Task.objects.get()
+
+        other = Task.objects.get()
+        other.executor = self.employee2
+        other.save()
+        self.assertCounts(0, 1)
+
+        task.refresh_from_db()
+        task.status = "Closed"
+        task.save()
+        self.assertCounts(0, 0)
+
+    def test_counter_with_concurrent_updates(self):
+        """Тестирование двух изменений одной задачи из экземпляров, загруженных до изменений."""
+        Task.objects.create(name="Task", period="2025-09-01T09:00:00Z", executor=self.employee1)
+        first, second = Task.objects.get(), Task.objects.get()
+
+        first.executor = self.employee2
+        first.save()
+        second.status = "Closed"
+        second.save()
+
+        self.assertCounts(0, 0)
+        self.assertEqual(Employee.objects.recount_active_tasks(), 0)
+
+    def test_recount_active_tasks(self):
+        """Тестирование исправления рассинхронизированного счетчика командой."""
+        Task.objects.create(name="Task", period="2025-09-01T09:00:00Z", executor=self.employee1)
+        Employee.objects.update(active_tasks_count=5)
+        out = StringIO()
+
+        call_command("recount_active_tasks", stdout=out)
+
+        self.assertIn("2", out.getvalue())
+        self.assertCounts(1, 0)
+
+
+class ResponseCacheTestCase(APITestCase):
+    """Тестирование кэша ответов busy_employees и important_tasks."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(
+            email="test@test.com",
+            password="test",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.employee = Employee.objects.create(fullname="Employee 1", position="Dev")
+
+    def test_repeated_request_is_served_from_cache(self):
+        """Тестирование повторного запроса без обращения к базе."""
+        self.client.get("/busy_employees/")
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/busy_employees/")
+
+        self.assertEqual(response.data[0]["fullname"], "Employee 1")
+        self.assertEqual(get_cache_stats(), {"hits": 1, "misses": 1})
+
+    def test_api_write_invalidates_cache(self):
+        """Тестирование сброса кэша при создании задачи через API."""
+        self.client.get("/busy_employees/")
+
+        data = {"name": "Task", "period": "2025-09-01T09:00:00Z", "executor": self.employee.id}
+        self.client.post("/tasks/create/", data=data)
+
+        response = self.client.get("/busy_employees/")
+        self.assertEqual(response.data[0]["active_tasks_count"], 1)
+
+    def test_orm_write_invalidates_cache(self):
+        """Тестирование сброса кэша при изменении через ORM."""
+        self.client.get("/important_tasks/")
+
+        parent = Task.objects.create(name="Parent", period="2025-09-01T09:00:00Z", status="In Progress")
+        Task.objects.create(name="Child", period="2025-09-01T09:00:00Z", status="Open", parent_task=parent)
+
+        response = self.client.get("/important_tasks/")
+        self.assertEqual(response.data[0]["name"], "Child")
+
+    def test_recount_invalidates_cache(self):
+        """Тестирование сброса кэша при исправлении счетчиков пересчетом."""
+        Task.objects.create(name="Task", period="2025-09-01T09:00:00Z", executor=self.employee)
+        Employee.objects.update(active_tasks_count=5)
+        self.client.get("/busy_employees/")
+
+        self.assertEqual(Employee.objects.recount_active_tasks(), 1)
+
+        response = self.client.get("/busy_employees/")
+        self.assertEqual(response.data[0]["active_tasks_count"], 1)
+
+    def test_concurrent_miss_waits_for_builder(self):
+        """Тестирование ожидания результата, который строит другой запрос."""
+        request = APIRequestFactory().get("/busy_employees/")
+        key = get_response_key("busy_employees", request)
+        cache.add(f"{key}:lock", 1)
+        build = mock.Mock(return_value=["built"])
+
+        with mock.patch("tasks.cache.time.sleep", side_effect=lambda _: cache.set(key, ["cached"])):
+            data = cached_response("busy_employees", request, build)
+
+        self.assertEqual(data, ["cached"])
+        build.assert_not_called()
+
+    def test_cache_stats_for_admin(self):
+        """Тестирование вывода статистики кэша администратору."""
+        self.assertEqual(self.client.get("/cache_stats/").status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get("/cache_stats/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"hits": 0, "misses": 0})
+
+
+class BulkCreateTaskTestCase(APITestCase):
+    """Тестирование массового создания задач."""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email="test@test.com",
+            password="test",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.employee = Employee.objects.create(fullname="Employee 1", position="Dev")
+        self.parent = Task.objects.create(name="Parent", period="2025-09-01T09:00:00Z")
+
+    def make_items(self, count):
+        return [
+            {
+                "name": f"Task {i}",
+                "period": "2025-09-01T09:00:00Z",
+                "executor": self.employee.id if i % 2 else None,
+                "parent_task": self.parent.id,
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        """Тестирование создания всех задач с вычисленным статусом."""
+        response = self.client.post("/tasks/bulk_create/", data=self.make_items(4), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["created"]), 4)
+        self.assertEqual(response.data["errors"], [])
+        self.assertEqual(Task.objects.filter(status="To Do", executor=self.employee).count(), 2)
+        self.assertEqual(Task.objects.filter(status="Open", parent_task=self.parent).count(), 2)
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.active_tasks_count, 2)
+
+    def test_bulk_create_query_count(self):
+        """Тестирование постоянного количества запросов независимо от числа задач."""
+        with CaptureQueriesContext(connection) as small:
+            self.client.post("/tasks/bulk_create/", data=self.make_items(2), format="json")
+        with CaptureQueriesContext(connection) as large:
+            self.client.post("/tasks/bulk_create/", data=self.make_items(50), format="json")
+
+        self.assertEqual(len(small), len(large))
+
+    def test_bulk_create_aborts_on_error(self):
+        """Тестирование отказа от создания всех задач при ошибке в одной из них."""
+        items = self.make_items(3)
+        items[1]["period"] = "not a date"
+        items[2]["executor"] = 999
+
+        response = self.client.post("/tasks/bulk_create/", data=items, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["errors"][0]["index"], 1)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_bulk_create_partial(self):
+        """Тестирование создания валидных задач с отчетом об ошибках."""
+        items = self.make_items(3)
+        items[1]["period"] = "not a date"
+        items[2]["executor"] = 999
+
+        response = self.client.post("/tasks/bulk_create/?partial=1", data=items, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["created"]), 1)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2])
+        self.assertIn("executor", response.data["errors"][1]["errors"])
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_bulk_create_requires_list(self):
+        """Тестирование запроса без списка задач."""
+        response = self.client.post("/tasks/bulk_create/", data={"name": "Task"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkUpdateTaskTestCase(APITestCase):
+    """Тестирование массового изменения задач."""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email="test@test.com",
+            password="test",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.employee1 = Employee.objects.create(fullname="Employee 1", position="Dev")
+        self.employee2 = Employee.objects.create(fullname="Employee 2", position="Tester")
+        self.tasks = [
+            Task.objects.create(name=f"Task {i}", period="2025-09-01T09:00:00Z", executor=self.employee1)
+            for i in range(3)
+        ]
+
+    def assertCounts(self, first, second):
+        self.employee1.refresh_from_db()
+        self.employee2.refresh_from_db()
+        self.assertEqual((self.employee1.active_tasks_count, self.employee2.active_tasks_count), (first, second))
+
+    def test_close_by_ids(self):
+        """Тестирование закрытия задач по списку id."""
+        data = {"ids": [self.tasks[0].id, self.tasks[1].id], "patch": {"status": "Closed"}}
+
+        response = self.client.patch("/tasks/bulk_update/", data=data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(Task.objects.filter(status="Closed").count(), 2)
+        self.assertCounts(1, 0)
+
+    def test_reassign_by_filter(self):
+        """Тестирование переназначения задач сотрудника со сбросом статуса в "To Do"."""
+        Task.objects.filter(pk=self.tasks[0].pk).update(status="In Progress")
+        data = {"filter": {"executor": self.employee1.id}, "patch": {"executor": self.employee2.id}}
+
+        response = self.client.patch("/tasks/bulk_update/", data=data, format="json")
+
+        self.assertEqual(response.data["updated"], 3)
+        self.assertEqual(Task.objects.filter(executor=self.employee2, status="To Do").count(), 3)
+        self.assertCounts(0, 3)
+
+    def test_single_update_query(self):
+        """Тестирование изменения задач одним запросом UPDATE."""
+        data = {"filter": {"status": "Open"}, "patch": {"period": "2025-10-01T09:00:00Z"}}
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.patch("/tasks/bulk_update/", data=data, format="json")
+
+        updates = [query for query in queries if query["sql"].startswith('UPDATE "tasks_task"')]
+        self.assertEqual(len(updates), 1)
+
+    def test_ids_or_filter_required(self):
+        """Тестирование запроса без ids и filter или с пустым фильтром."""
+        for data in ({"patch": {"status": "Closed"}}, {"filter": {}, "patch": {"status": "Closed"}}):
+            with self.subTest(data=data):
+                response = self.client.patch("/tasks/bulk_update/", data=data, format="json")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TaskTreeTestCase(APITestCase):
+    """Тестирование запросов по иерархии задач."""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email="test@test.com",
+            password="test",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        period = "2025-09-01T09:00:00Z"
+        self.root = Task.objects.create(name="Root", period=period)
+        self.child1 = Task.objects.create(name="Child 1", period=period, parent_task=self.root)
+        self.child2 = Task.objects.create(name="Child 2", period=period, parent_task=self.root)
+        self.grandchild = Task.objects.create(name="Grandchild", period=period, parent_task=self.child1)
+        Task.objects.create(name="Other root", period=period)
+
+    def test_subtree_manager(self):
+        """Тестирование выборки поддерева одним запросом."""
+        with self.assertNumQueries(1):
+            tasks = list(Task.objects.subtree(self.root.pk))
+
+        expected = [self.root.pk, self.child1.pk, self.child2.pk, self.grandchild.pk]
+        self.assertEqual([task.pk for task in tasks], expected)
+        self.assertEqual([task.depth for task in tasks], [0, 1, 1, 2])
+
+    def test_ancestors_manager(self):
+        """Тестирование выборки цепочки родительских задач одним запросом."""
+        with self.assertNumQueries(1):
+            tasks = list(Task.objects.ancestors(self.grandchild.pk))
+
+        self.assertEqual([task.pk for task in tasks], [self.grandchild.pk, self.child1.pk, self.root.pk])
+
+    def test_tree_endpoint(self):
+        """Тестирование вложенного дерева задачи."""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("tasks:task-tree", kwargs={"pk": self.root.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["truncated"])
+        tree = response.data["tree"]
+        self.assertEqual(tree["name"], "Root")
+        self.assertEqual([child["name"] for child in tree["children"]], ["Child 1", "Child 2"])
+        self.assertEqual(tree["children"][0]["children"][0]["name"], "Grandchild")
+
+    def test_tree_depth_and_limit(self):
+        """Тестирование ограничения глубины и количества задач дерева."""
+        url = reverse("tasks:task-tree", kwargs={"pk": self.root.pk})
+
+        tree = self.client.get(url, {"max_depth": 1}).data["tree"]
+        self.assertEqual(tree["children"][0]["children"], [])
+
+        response = self.client.get(url, {"limit": 2})
+        self.assertTrue(response.data["truncated"])
+        self.assertEqual(len(response.data["tree"]["children"]), 1)
+
+    def test_ancestors_endpoint(self):
+        """Тестирование вложенной цепочки родительских задач."""
+        response = self.client.get(reverse("tasks:task-tree", kwargs={"pk": self.grandchild.pk}), {"ancestors": 1})
+
+        tree = response.data["tree"]
+        self.assertEqual(tree["name"], "Root")
+        self.assertEqual(tree["children"][0]["children"][0]["name"], "Grandchild")
+
+    def test_tree_not_found(self):
+        """Тестирование дерева несуществующей задачи."""
+        response = self.client.get(reverse("tasks:task-tree", kwargs={"pk": 999}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CascadeDeleteTestCase(APITestCase):
+    """Тестирование каскадного удаления задач на стороне базы."""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email="test@test.com",
+            password="test",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        period = "2025-09-01T09:00:00Z"
+        self.employee1 = Employee.objects.create(fullname="Employee 1", position="Dev")
+        self.employee2 = Employee.objects.create(fullname="Employee 2", position="Tester")
+        self.root = Task.objects.create(name="Root", period=period, executor=self.employee1)
+        self.child = Task.objects.create(name="Child", period=period, parent_task=self.root, executor=self.employee2)
+        Task.objects.create(name="Grandchild", period=period, parent_task=self.child, executor=self.employee2)
+        Task.objects.create(
+            name="Closed", period=period, parent_task=self.child, executor=self.employee2, status="Closed"
+        )
+        Task.objects.create(name="Other", period=period, executor=self.employee2)
+
+    def test_delete_task_subtree(self):
+        """Тестирование удаления задачи со всеми подзадачами."""
+        with self.assertNumQueries(7):
+            response = self.client.delete(reverse("tasks:task-delete", kwargs={"pk": self.root.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response["X-Deleted-Count"], "4")
+        self.assertEqual(list(Task.objects.values_list("name", flat=True)), ["Other"])
+        self.employee1.refresh_from_db()
+        self.employee2.refresh_from_db()
+        self.assertEqual((self.employee1.active_tasks_count, self.employee2.active_tasks_count), (0, 1))
+
+    def test_delete_employee_with_tasks(self):
+        """Тестирование удаления сотрудника с его задачами и их подзадачами."""
+        response = self.client.delete(reverse("tasks:employee-delete", kwargs={"pk": self.employee1.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response["X-Deleted-Count"], "5")
+        self.assertFalse(Employee.objects.filter(pk=self.employee1.pk).exists())
+        self.employee2.refresh_from_db()
+        self.assertEqual(self.employee2.active_tasks_count, 1)
+
+    def test_delete_missing(self):
+        """Тестирование удаления несуществующих объектов."""
+        for name in ("tasks:task-delete", "tasks:employee-delete"):
+            with self.subTest(name=name):
+                response = self.client.delete(reverse(name, kwargs={"pk": 999}))
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ConditionalGetTestCase(APITestCase):
+    """Тестирование условных GET-запросов задач и сотрудников."""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email="test@test.com",
+            password="test",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.employee = Employee.objects.create(fullname="Employee 1", position="Dev")
+        self.task = Task.objects.create(name="Task", period="2025-09-01T09:00:00Z", executor=self.employee)
+
+    def test_not_modified_without_serialization(self):
+        """Тестирование ответа 304 без выборки и сериализации задач."""
+        # Для списка дополнительно читается время последнего удаления задачи
+        for url, queries in (("/tasks/", 2), (f"/tasks/{self.task.id}/", 1)):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertIn("Last-Modified", response)
+
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_after_update(self):
+        """Тестирование смены ETag после изменения задачи."""
+        etag = self.client.get("/tasks/")["ETag"]
+
+        self.task.name = "Renamed"
+        self.task.save()
+
+        response = self.client.get("/tasks/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_modified_after_delete(self):
+        """Тестирование смены Last-Modified списка задач после удаления задачи."""
+        Task.objects.create(name="Another", period="2025-09-01T09:00:00Z")
+        response = self.client.get("/tasks/")
+        last_modified = response["Last-Modified"]
+
+        # Удаление в ту же секунду, что и последнее изменение, не сдвинуло бы Last-Modified с точностью до секунды
+        with mock.patch("django.utils.timezone.now", return_value=timezone.now() + timedelta(seconds=1)):
+            self.client.delete(reverse("tasks:task-delete", kwargs={"pk": self.task.id}))
+
+        response = self.client.get("/tasks/", HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertNotEqual(response["Last-Modified"], last_modified)
+
+    def test_employee_list_without_last_modified(self):
+        """Тестирование списка сотрудников без Last-Modified: удаление сотрудников не отмечается."""
+        response = self.client.get("/employees/")
+
+        self.assertIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+
+        self.assertIn("Last-Modified", self.client.get(f"/employees/{self.employee.id}/"))
+
+    def test_employee_etag_changes_after_recount(self):
+        """Тестирование смены ETag сотрудника после исправления счетчика пересчетом."""
+        for url in ("/employees/", f"/employees/{self.employee.id}/"):
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+
+                Employee.objects.update(active_tasks_count=5)
+                Employee.objects.recount_active_tasks()
+
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertNotEqual(response["ETag"], etag)
+
+    def test_employee_etag_follows_tasks(self):
+        """Тестирование смены ETag сотрудника после изменения его задачи."""
+        url = f"/employees/{self.employee.id}/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Task.objects.create(name="Another", period="2025-09-01T09:00:00Z", executor=self.employee)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+
+class TaskChangesTestCase(APITransactionTestCase):
+    """Тестирование инкрементальной синхронизации задач.
+
+    Изменения фиксируются сразу, без общей транзакции теста: на Postgres токен не продвигается дальше
+    незавершенной транзакции, и внутри нее все изменения приходили бы повторно.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email="test@test.com",
+            password="test",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        period = "2025-09-01T09:00:00Z"
+        self.parent = Task.objects.create(name="Parent", period=period)
+        self.child = Task.objects.create(name="Child", period=period, parent_task=self.parent)
+        self.other = Task.objects.create(name="Other", period=period)
+
+    def test_initial_sync(self):
+        """Тестирование первой синхронизации без токена."""
+        response = self.client.get("/tasks/changes/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["changed"]), 3)
+        self.assertEqual(response.data["deleted"], [])
+        self.assertTrue(response.data["token"])
+
+    def test_sync_without_changes(self):
+        """Тестирование синхронизации без изменений одним запросом."""
+        token = self.client.get("/tasks/changes/").data["token"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/tasks/changes/", {"since": token})
+
+        self.assertEqual(response.data["changed"], [])
+        self.assertEqual(response.data["deleted"], [])
+
+    def test_sync_with_updates_and_deletes(self):
+        """Тестирование синхронизации измененных и каскадно удаленных задач."""
+        token = self.client.get("/tasks/changes/").data["token"]
+
+        self.other.name = "Other renamed"
+        self.other.save()
+        self.client.delete(reverse("tasks:task-delete", kwargs={"pk": self.parent.id}))
+
+        response = self.client.get("/tasks/changes/", {"since": token})
+
+        self.assertEqual([task["name"] for task in response.data["changed"]], ["Other renamed"])
+        self.assertCountEqual(response.data["deleted"], [self.parent.id, self.child.id])
+
+        response = self.client.get("/tasks/changes/", {"since": response.data["token"]})
+        self.assertEqual(response.data["changed"], [])
+        self.assertEqual(response.data["deleted"], [])
+
+    def test_paged_sync(self):
+        """Тестирование синхронизации страницами с токеном позиции последней отданной задачи."""
+        with mock.patch.object(TaskViewSet, "changes_page_size", 2):
+            response = self.client.get("/tasks/changes/")
+            self.assertTrue(response.data["has_more"])
+            names = [task["name"] for task in response.data["changed"]]
+
+            # Задача, измененная во время прохода, приходит повторно, а не теряется
+            self.parent.name = "Parent renamed"
+            self.parent.save()
+            self.client.delete(reverse("tasks:task-delete", kwargs={"pk": self.other.id}))
+
+            pages = 1
+            while response.data["has_more"]:
+                response = self.client.get("/tasks/changes/", {"since": response.data["token"]})
+                names += [task["name"] for task in response.data["changed"]]
+                pages += 1
+
+            self.assertGreaterEqual(pages, 2)
+            self.assertEqual(names[:2], ["Parent", "Child"])
+            response = self.client.get("/tasks/changes/", {"since": response.data["token"]})
+            names += [task["name"] for task in response.data["changed"]]
+            deleted = response.data["deleted"]
+
+        self.assertEqual(names[-1], "Parent renamed")
+        self.assertNotIn("Other", names)
+        self.assertEqual(deleted, [self.other.id])
+
+    def test_paged_deletes(self):
+        """Тестирование синхронизации удалений страницами."""
+        token = self.client.get("/tasks/changes/").data["token"]
+        Task.objects.all().delete()
+
+        deleted = []
+        with mock.patch.object(TaskViewSet, "changes_page_size", 2):
+            response = self.client.get("/tasks/changes/", {"since": token})
+            deleted += response.data["deleted"]
+            self.assertEqual(len(deleted), 2)
+            self.assertTrue(response.data["has_more"])
+
+            response = self.client.get("/tasks/changes/", {"since": response.data["token"]})
+            deleted += response.data["deleted"]
+
+        self.assertFalse(response.data["has_more"])
+        self.assertCountEqual(deleted, [self.parent.id, self.child.id, self.other.id])
+
+    def test_sync_after_long_transaction(self):
+        """Тестирование изменения, записанного до выдачи токена и зафиксированного после нее."""
+        initial = self.client.get("/tasks/changes/").data["token"]
+        self.other.name = "Other renamed"
+        self.other.save()
+
+        # Позиция токена удерживается на номере изменения задачи, как при незавершенной транзакции,
+        # записавшей задачу до выдачи токена
+        with mock.patch("tasks.services.SYNC_POSITION_SQL", {connection.vendor: str(self.get_change_id(self.other))}):
+            token = self.client.get("/tasks/changes/", {"since": initial}).data["token"]
+
+        response = self.client.get("/tasks/changes/", {"since": token})
+        self.assertEqual([task["name"] for task in response.data["changed"]], ["Other renamed"])
+
+    def test_change_ids_follow_writes(self):
+        """Тестирование номеров изменений, назначаемых базой при записи задач и отметок об удалении."""
+        change_ids = [self.get_change_id(self.other)]
+
+        self.other.name = "Other renamed"
+        self.other.save()
+        change_ids.append(self.get_change_id(self.other))
+
+        Task.objects.filter(pk=self.other.pk).update(name="Other renamed again")
+        change_ids.append(self.get_change_id(self.other))
+
+        self.parent.delete()
+        change_ids.append(TaskTombstone.objects.order_by("change_id").values_list("change_id", flat=True).first())
+
+        self.assertGreater(change_ids[0], 0)
+        self.assertEqual(change_ids, sorted(set(change_ids)))
+
+    @skipUnless(connection.vendor == "postgresql", "Параллельные транзакции проверяются на Postgres")
+    def test_change_committed_after_token(self):
+        """Тестирование изменения, записанного до выдачи токена и зафиксированного после нее."""
+        written, release = threading.Event(), threading.Event()
+        thread = threading.Thread(target=self.update_in_transaction, args=(written, release))
+        thread.start()
+        written.wait(10)
+
+        token = self.client.get("/tasks/changes/").data["token"]
+        release.set()
+        thread.join()
+
+        response = self.client.get("/tasks/changes/", {"since": token})
+        self.assertEqual([task["name"] for task in response.data["changed"]], ["Other renamed"])
+
+    def update_in_transaction(self, written, release):
+        try:
+            with transaction.atomic():
+                Task.objects.filter(pk=self.other.pk).update(name="Other renamed")
+                written.set()
+                release.wait(10)
+        finally:
+            connection.close()
+
+    def get_change_id(self, task):
+        return Task.objects.values_list("change_id", flat=True).get(pk=task.pk)
+
+    def test_orm_delete_records_tombstone(self):
+        """Тестирование отметки об удалении задачи через ORM."""
+        token = self.client.get("/tasks/changes/").data["token"]
+        other_id = self.other.id
+
+        self.other.delete()
+
+        response = self.client.get("/tasks/changes/", {"since": token})
+        self.assertEqual(response.data["deleted"], [other_id])
+
+    def test_expired_token(self):
+        """Тестирование отказа для токена старше срока хранения отметок об удалении."""
+        token = self.client.get("/tasks/changes/").data["token"]
+
+        now = timezone.now() + settings.TASK_TOMBSTONE_RETENTION + timedelta(seconds=1)
+        with mock.patch("django.utils.timezone.now", return_value=now):
+            response = self.client.get("/tasks/changes/", {"since": token})
+
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_prune_tombstones(self):
+        """Тестирование удаления отметок об удалении старше срока хранения."""
+        parent_id = self.parent.id
+        self.parent.delete()
+        TaskTombstone.objects.filter(task_id=self.child.id).update(
+            deleted_at=timezone.now() - settings.TASK_TOMBSTONE_RETENTION - timedelta(seconds=1)
+        )
+        out = StringIO()
+
+        call_command("prune_tombstones", stdout=out)
+
+        self.assertIn("Удалено отметок: 1", out.getvalue())
+        self.assertEqual(list(TaskTombstone.objects.values_list("task_id", flat=True)), [parent_id])
+
+    def test_invalid_token(self):
+        """Тестирование некорректного токена."""
+        tokens = [
+            base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+            for state in (5, [], [1], [1, -2], [True, 1], [1, 2, 3, 4, 5], [1, 2, 3, 4, 5, "6"])
+        ]
+        for token in ("invalid", *tokens):
+            with self.subTest(token=token):
+                response = self.client.get("/tasks/changes/", {"since": token})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class ImportantTasksViewSetTestCase(APITestCase):
     """Тестирование ImportantTasksViewSet"""
 
@@ -409,34 +1272,1166 @@ class SearchEmployeeTestCase(APITestCase):
 
     def test_search_worker_with_least_loaded_employee(self):
         """Тестирование выбора наименее загруженного сотрудника."""
-        employees_stats = Employee.objects.annotate(
-            active_tasks_count=Count("tasks", filter=~Q(tasks__status__in=["Closed"]))
-        )
-
-        min_tasks_count = employees_stats.aggregate(min_tasks=Min("active_tasks_count"))["min_tasks"] or 0
+        employees_stats = Employee.objects.all()
 
         important_tasks = Task.objects.filter(pk=self.important_task1.pk)
 
-        result = search_employee(important_tasks, employees_stats, min_tasks_count)
+        result = search_employee(important_tasks, employees_stats)
 
         self.assertEqual(len(result), 1)
         # Должен выбрать employee3 (наименее загруженный), а не employee1 (исполнитель родительской)
         self.assertEqual(result[self.important_task1.id], "Employee 3")
 
     def test_search_worker_with_parent_executor_within_tolerance(self):
-        """Тестирование выбора исполнителя родительской задачи в пределах допуска."""
+        """Тестирование того, что исполнитель родительской задачи не выбирается вместо наименее загруженного."""
         Task.objects.create(name="Add task 1", period="2025-09-03T11:00:00Z", status="To Do", executor=self.employee1)
         Task.objects.create(name="Add task 2", period="2025-09-04T12:00:00Z", status="To Do", executor=self.employee2)
 
-        employees_stats = Employee.objects.annotate(
-            active_tasks_count=Count("tasks", filter=~Q(tasks__status__in=["Closed"]))
-        )
-
-        min_tasks_count = employees_stats.aggregate(min_tasks=Min("active_tasks_count"))["min_tasks"] or 0
+        employees_stats = Employee.objects.all()
 
         important_tasks = Task.objects.filter(pk=self.important_task1.pk)
 
-        result = search_employee(important_tasks, employees_stats, min_tasks_count)
+        result = search_employee(important_tasks, employees_stats)
 
         self.assertEqual(len(result), 1)
         self.assertEqual(result[self.important_task1.id], "Employee 3")
+
+    def test_search_worker_spreads_load_between_tasks(self):
+        """Тестирование распределения нескольких задач с учетом растущей загрузки."""
+        employees_stats = Employee.objects.all()
+
+        important_tasks = Task.objects.filter(pk__in=[self.important_task1.pk, self.important_task2.pk]).order_by("pk")
+
+        result = search_employee(important_tasks, employees_stats)
+
+        self.assertEqual(result[self.important_task1.id], "Employee 3")
+        # После первой рекомендации у всех сотрудников по одной задаче, выбирается первый по порядку
+        self.assertEqual(result[self.important_task2.id], "Employee 1")
+
+    def test_search_worker_query_count(self):
+        """Тестирование фиксированного количества запросов при поиске сотрудника."""
+        employees_stats = Employee.objects.all()
+
+        important_tasks = Task.objects.filter(status="Open", parent_task__isnull=False)
+
+        with self.assertNumQueries(2):
+            result = search_employee(important_tasks, employees_stats)
+
+        self.assertEqual(len(result), 2)
+
+
+class ExplainEndpointsCommandTestCase(APITestCase):
+    """Тестирование команды вывода планов запросов."""
+
+    def test_explain_endpoints(self):
+        """Тестирование вывода планов для всех эндпоинтов."""
+        Employee.objects.create(fullname="Employee 1", position="Dev")
+        out = StringIO()
+
+        call_command("explain_endpoints", stdout=out)
+
+        for endpoint in ("tasks/", "employees/", "busy_employees/", "important_tasks/"):
+            self.assertIn(endpoint, out.getvalue())
+
+
+class AsyncReadEndpointsTestCase(APITestCase):
+    """Тестирование асинхронных эндпоинтов чтения."""
+
+    def setUp(self):
+        self.user = User.objects.create(username="async", email="test@test.com", password="test")
+        self.client.force_authenticate(user=self.user)
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+        self.employee = Employee.objects.create(fullname="Employee 1", position="Dev")
+        self.parent = Task.objects.create(
+            name="Parent", period="2025-08-30T11:49:00Z", status="In Progress", executor=self.employee
+        )
+        self.task = Task.objects.create(name="Task", period="2025-08-30T11:49:00Z", parent_task=self.parent)
+
+    async def test_async_endpoints_match_sync(self):
+        """Тестирование совпадения ответов асинхронных и синхронных эндпоинтов."""
+        for path in (
+            "tasks/",
+            f"tasks/{self.task.pk}/?fields=id,name",
+            "employees/?expand=tasks",
+            "busy_employees/?fields=id",
+            "important_tasks/",
+        ):
+            with self.subTest(path=path):
+                response = await self.async_client.get(f"/async/{path}", headers=self.headers)
+                expected = await sync_to_async(self.client.get)(f"/{path}")
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.json(), expected.json())
+
+    async def test_async_next_page(self):
+        """Тестирование курсора следующей страницы асинхронного списка задач."""
+        response = await self.async_client.get("/async/tasks/?page_size=1", headers=self.headers)
+        response = await self.async_client.get(response.json()["next"], headers=self.headers)
+
+        self.assertEqual([task["id"] for task in response.json()["results"]], [self.task.pk])
+        self.assertIsNone(response.json()["next"])
+
+    async def test_async_not_found(self):
+        """Тестирование 404 для несуществующей задачи и некорректного курсора."""
+        response = await self.async_client.get("/async/tasks/0/", headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = await self.async_client.get("/async/tasks/?cursor=bad", headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json(), {"detail": "Некорректный курсор"})
+
+    async def test_async_authentication(self):
+        """Тестирование 401 без токена, с некорректным токеном и для неактивного пользователя."""
+        response = await self.async_client.get("/async/tasks/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.headers["WWW-Authenticate"], 'Bearer realm="api"')
+
+        response = await self.async_client.get("/async/tasks/", headers={"Authorization": "Bearer invalid"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.user.is_active = False
+        await self.user.asave()
+        response = await self.async_client.get("/async/tasks/", headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_async_read_only(self):
+        """Тестирование запрета изменяющих запросов."""
+        response = await self.async_client.post("/async/tasks/", headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class SparseFieldsetsTestCase(APITestCase):
+    """Тестирование параметров ?fields= и ?expand=."""
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com", password="test")
+        self.client.force_authenticate(user=self.user)
+
+        self.employee = Employee.objects.create(fullname="Employee 1", position="Dev")
+        self.task = Task.objects.create(
+            name="Task", description="Long description", period="2025-08-30T11:49:00Z", executor=self.employee
+        )
+
+    def get_first(self, url):
+        """Первый объект ответа списка, страницы списка или одного объекта."""
+        data = self.client.get(url).data
+        if isinstance(data, dict) and "results" in data:
+            data = data["results"]
+        return data[0] if isinstance(data, list) else data
+
+    def test_task_fields(self):
+        """Тестирование вывода и выборки только запрошенных полей задачи."""
+        for url in ("/tasks/?fields=id,name,status", f"/tasks/{self.task.pk}/?fields=id,name,status"):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    task = self.get_first(url)
+
+                self.assertEqual(set(task), {"id", "name", "status"})
+                select = queries.captured_queries[-1]["sql"]
+                self.assertIn('"status"', select)
+                self.assertNotIn('"description"', select)
+
+    def test_employee_expand_tasks(self):
+        """Тестирование вывода задач сотрудника только с ?expand=tasks."""
+        for url in ("/employees/", f"/employees/{self.employee.pk}/", "/busy_employees/"):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    employee = self.get_first(url)
+
+                self.assertNotIn("tasks", employee)
+                self.assertFalse(any('FROM "tasks_task"' in query["sql"] for query in queries.captured_queries))
+
+                employee = self.get_first(f"{url}?fields=id&expand=tasks")
+                self.assertEqual(set(employee), {"id", "tasks"})
+                self.assertEqual(employee["tasks"][0]["description"], "Long description")
+
+    def test_unknown_fields(self):
+        """Тестирование ошибки для неизвестных полей."""
+        response = self.client.get("/employees/?fields=id,salary&expand=projects")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {"fields", "expand"})
+
+
+class ValuesSerializerTestCase(APITestCase):
+    """Тестирование быстрой сериализации по строкам .values()."""
+
+    def setUp(self):
+        self.employee1 = Employee.objects.create(fullname="Employee 1", position="Dev")
+        self.employee2 = Employee.objects.create(fullname="Employee 2", position="Tester")
+        parent = Task.objects.create(
+            name="Parent", description="Описание", period="2025-08-30T11:49:00.123456Z", executor=self.employee1
+        )
+        Task.objects.create(name="Child", period="2025-08-31T12:00:00Z", parent_task=parent, status="Closed")
+        Task.objects.create(name="Second", period="2025-09-01T09:00:00+03:00", executor=self.employee1)
+
+    def test_parity_with_model_serializer(self):
+        """Тестирование совпадения вывода с ModelSerializer."""
+        cases = [
+            (TaskSerializer, Task.objects.all(), {}),
+            (TaskSerializer, Task.objects.all(), {"fields": ["id", "period", "executor"]}),
+            (EmployeeSerializer, Employee.objects.all(), {}),
+            (EmployeeSerializer, Employee.objects.prefetch_related("tasks"), {"expand": ["tasks"]}),
+            (EmployeeSerializer, Employee.objects.prefetch_related("tasks"), {"fields": ["id"], "expand": ["tasks"]}),
+        ]
+        for serializer_class, queryset, kwargs in cases:
+            with self.subTest(serializer=serializer_class.__name__, **kwargs):
+                expected = serializer_class(queryset, many=True, **kwargs).data
+
+                serializer = ValuesSerializer(serializer_class(**kwargs))
+                data = serializer.serialize(serializer.get_queryset(queryset))
+
+                self.assertEqual(json.dumps(data), json.dumps(expected))
+
+    def test_nested_query_count(self):
+        """Тестирование загрузки вложенных задач одним запросом."""
+        serializer = ValuesSerializer(EmployeeSerializer(expand=["tasks"]))
+
+        with self.assertNumQueries(2):
+            data = serializer.serialize(serializer.get_queryset(Employee.objects.all()))
+
+        self.assertEqual([len(employee["tasks"]) for employee in data], [2, 0])
+
+
+class RenderersTestCase(APITestCase):
+    """Тестирование рендереров orjson и MessagePack."""
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com", password="test")
+        self.client.force_authenticate(user=self.user)
+
+        employee = Employee.objects.create(fullname="Сотрудник", position="Dev")
+        Task.objects.create(name="Задача", period="2025-08-30T11:49:00.123456Z", executor=employee)
+
+    def test_orjson_matches_json_renderer(self):
+        """Тестирование совпадения вывода orjson с JSONRenderer, в том числе для ошибок."""
+        for response in (
+            self.client.get("/tasks/"),
+            self.client.get("/employees/?expand=tasks"),
+            self.client.post("/tasks/create/", {"executor": "x"}, format="json"),
+            self.client.post("/tasks/bulk_create/", [{"name": "Задача"}], format="json"),
+        ):
+            with self.subTest(url=response.request["PATH_INFO"]):
+                self.assertEqual(response["Content-Type"], "application/json")
+                self.assertEqual(json.loads(response.content), json.loads(JSONRenderer().render(response.data)))
+
+    @skipUnless(msgpack, "msgpack не установлен")
+    def test_msgpack(self):
+        """Тестирование выбора MessagePack по заголовкам Accept и Content-Type."""
+        response = self.client.get("/tasks/", HTTP_ACCEPT="application/msgpack")
+
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), json.loads(self.client.get("/tasks/").content))
+
+        data = {"name": "Из msgpack", "period": "2025-09-01T09:00:00Z"}
+        response = self.client.post(
+            "/tasks/create/",
+            msgpack.packb(data),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(msgpack.unpackb(response.content)["name"], "Из msgpack")
+
+    @skipUnless(msgpack, "msgpack не установлен")
+    def test_msgpack_parse_error(self):
+        """Тестирование ошибки разбора некорректного тела MessagePack."""
+        response = self.client.post("/tasks/create/", b"\xc1", content_type="application/msgpack")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StreamingListTestCase(APITestCase):
+    """Тестирование потоковой выдачи списков с ?stream=1."""
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com", password="test")
+        self.client.force_authenticate(user=self.user)
+
+    def create_tasks(self, count, executor=None):
+        Task.objects.bulk_create(
+            Task(name=f"Task {i:05}", description="x" * 200, period="2025-08-30T11:49:00Z", executor=executor)
+            for i in range(count)
+        )
+
+    def get_stream(self, url):
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_stream_matches_pages(self):
+        """Тестирование совпадения потока со списком, собранным по страницам."""
+        self.assertEqual(self.get_stream("/tasks/?stream=1"), [])
+
+        employee = Employee.objects.create(fullname="Employee", position="Dev")
+        self.create_tasks(25, executor=employee)
+
+        with mock.patch.object(TaskViewSet, "stream_chunk_size", 10):
+            tasks = self.get_stream("/tasks/?stream=1&fields=id,name")
+        self.assertEqual(tasks, self.client.get("/tasks/?fields=id,name").data["results"])
+
+        employees = self.get_stream("/employees/?stream=1&expand=tasks")
+        self.assertEqual(len(employees[0]["tasks"]), 25)
+
+    def test_stream_memory_does_not_depend_on_table_size(self):
+        """Тестирование постоянного пика памяти при потоковой выдаче (tracemalloc)."""
+
+        def measure():
+            tracemalloc.start()
+            try:
+                response = self.client.get("/tasks/?stream=1")
+                size = sum(len(part) for part in response.streaming_content)
+                return size, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        with mock.patch.object(TaskViewSet, "stream_chunk_size", 100):
+            self.create_tasks(100)
+            measure()
+
+            self.create_tasks(1_900)
+            small_size, small_peak = measure()
+
+            self.create_tasks(6_000)
+            large_size, large_peak = measure()
+
+        self.assertGreater(large_size, small_size * 3.5)
+        # Пик памяти не растет вместе с объемом ответа и много меньше его
+        self.assertLess(large_peak, small_peak * 1.5)
+        self.assertLess(large_peak, large_size / 4)
+
+
+class ExportJobTestCase(APITestCase):
+    """Тестирование фоновых выгрузок."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = self.settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create(username="user", password="test")
+        self.client.force_authenticate(user=self.user)
+
+        self.employee = Employee.objects.create(fullname="Employee", position="Dev")
+        Task.objects.create(name="Task 1", description="Первая, с запятой", period="2025-08-30T11:49:00Z")
+        Task.objects.create(name="Task 2", period="2025-08-31T12:00:00Z", executor=self.employee)
+        Task.objects.create(name="Task 3", period="2025-09-01T09:00:00Z", executor=self.employee, status="Done")
+
+    def create_export(self, data):
+        with mock.patch("tasks.exports.threading.Thread") as thread, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/exports/", data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "pending")
+        thread.assert_called_once_with(
+            target=run_export_thread, args=(response.data["id"],), name=f"export-{response.data['id']}", daemon=True
+        )
+
+        run_export(response.data["id"])
+        return self.client.get(f"/exports/{response.data['id']}/").data
+
+    def download(self, job):
+        response = self.client.get(job["download_url"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content)
+
+    def test_csv_export(self):
+        """Тестирование выгрузки отфильтрованных задач в CSV."""
+        job = self.create_export(
+            {"kind": "tasks", "format": "csv", "filter": {"executor": self.employee.pk}, "fields": ["name", "status"]}
+        )
+
+        self.assertEqual(job["status"], "done")
+        self.assertEqual((job["total_rows"], job["processed_rows"]), (2, 2))
+        self.assertEqual(self.download(job).decode().splitlines(), ["name,status", "Task 2,Open", "Task 3,Done"])
+
+    def test_ndjson_gzip_export(self):
+        """Тестирование выгрузки задач в сжатый NDJSON."""
+        job = self.create_export({"kind": "tasks", "format": "ndjson", "compress": True})
+
+        rows = [json.loads(line) for line in gzip.decompress(self.download(job)).splitlines()]
+        self.assertEqual(rows, json.loads(self.client.get("/tasks/?stream=1").getvalue()))
+
+    def test_employee_export(self):
+        """Тестирование выгрузки сотрудников с фильтром по должности."""
+        Employee.objects.create(fullname="Manager", position="Manager")
+
+        job = self.create_export({"kind": "employees", "format": "csv", "filter": {"position": "Dev"}})
+
+        lines = self.download(job).decode().splitlines()
+        self.assertEqual(lines[0], "id,fullname,position,active_tasks_count")
+        self.assertEqual(lines[1:], [f"{self.employee.pk},Employee,Dev,2"])
+
+    def test_export_failure(self):
+        """Тестирование сохранения ошибки выгрузки."""
+        with (
+            mock.patch("tasks.exports.write_export", side_effect=OSError("Диск заполнен")),
+            self.assertLogs("tasks.exports", "ERROR"),
+        ):
+            job = self.create_export({"kind": "tasks", "format": "csv"})
+
+        self.assertEqual((job["status"], job["error"], job["download_url"]), ("failed", "Диск заполнен", None))
+        response = self.client.get(f"/exports/{job['id']}/download/")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_fail_stale_exports(self):
+        """Тестирование отметки ошибкой выгрузок, пропавших вместе с процессом."""
+        stale = timezone.now() - timedelta(seconds=settings.EXPORT_STALE_TIMEOUT + 1)
+        jobs = {
+            (job_status, updated_at): ExportJob.objects.create(
+                kind="tasks", format="csv", status=job_status, created_by=self.user
+            )
+            for job_status in ("pending", "running", "done")
+            for updated_at in (stale, timezone.now())
+        }
+        for (_, updated_at), job in jobs.items():
+            ExportJob.objects.filter(pk=job.pk).update(updated_at=updated_at)
+        out = StringIO()
+
+        call_command("fail_stale_exports", stdout=out)
+
+        self.assertIn("Прерванных выгрузок: 2", out.getvalue())
+        for (job_status, updated_at), job in jobs.items():
+            job.refresh_from_db()
+            expected = "failed" if job_status != "done" and updated_at == stale else job_status
+            self.assertEqual(job.status, expected)
+        job = self.client.get(f"/exports/{jobs['running', stale].pk}/").data
+        self.assertEqual((job["status"], job["error"]), ("failed", STALE_EXPORT_ERROR))
+
+        call_command("fail_stale_exports", "--timeout", "0", stdout=out)
+        self.assertEqual(ExportJob.objects.filter(status__in=["pending", "running"]).count(), 0)
+
+    def test_progress_updates_time(self):
+        """Тестирование обновления времени изменения выгрузки с ее прогрессом."""
+        job = ExportJob.objects.create(kind="tasks", format="csv", created_by=self.user)
+        ExportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(days=1))
+
+        with mock.patch("tasks.exports.EXPORT_CHUNK_SIZE", 1):
+            run_export(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed_rows), ("done", 3))
+        self.assertGreater(job.updated_at, timezone.now() - timedelta(minutes=1))
+
+    def test_invalid_export(self):
+        """Тестирование проверки фильтра и полей выгрузки."""
+        for data in (
+            {"kind": "tasks", "format": "csv", "filter": {"executor": 0}},
+            {"kind": "tasks", "format": "csv", "fields": ["salary"]},
+            {"kind": "employees", "format": "xlsx"},
+        ):
+            with self.subTest(data=data):
+                response = self.client.post("/exports/", data, format="json")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_user_export(self):
+        """Тестирование недоступности чужих выгрузок."""
+        job = self.create_export({"kind": "tasks", "format": "csv"})
+
+        self.client.force_authenticate(user=User.objects.create(username="other", password="test"))
+
+        self.assertEqual(self.client.get(f"/exports/{job['id']}/").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(f"/exports/{job['id']}/download/").status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ImportTasksCommandTestCase(APITestCase):
+    """Тестирование импорта сотрудников и задач командой import_tasks."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = f"{self.directory}/{name}"
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def import_tasks(self, *args):
+        out = StringIO()
+        call_command("import_tasks", *args, "--batch-size", "2", stdout=out)
+        return out.getvalue()
+
+    def test_csv_import(self):
+        """Тестирование импорта из CSV со ссылкой на родителя, расположенного дальше в файле."""
+        employees = self.write("employees.csv", "id,fullname,position\ne1,Employee 1,Dev\ne2,Employee 2,QA\n")
+        tasks = self.write(
+            "tasks.csv",
+            "id,name,description,parent,executor,period,status\n"
+            "t1,Child,,t3,e1,2025-08-30 11:49:00,\n"
+            "t2,Closed,Описание,,e1,2025-08-31T12:00:00Z,Closed\n"
+            "t3,Parent,,,e2,2025-09-01T09:00:00Z,In Progress\n",
+        )
+
+        output = self.import_tasks("--employees", employees, "--tasks", tasks)
+
+        self.assertIn("Импортировано: сотрудников 2, задач 3", output)
+        self.assertIn("строк/с", output)
+        child = Task.objects.get(name="Child")
+        self.assertEqual(child.parent_task, Task.objects.get(name="Parent"))
+        self.assertEqual(child.status, "To Do")
+        self.assertIsNone(child.description)
+        self.assertEqual(child.period.isoformat(), "2025-08-30T11:49:00+00:00")
+        self.assertEqual(Task.objects.get(name="Closed").description, "Описание")
+        self.assertEqual(
+            dict(Employee.objects.values_list("fullname", "active_tasks_count")),
+            {"Employee 1": 1, "Employee 2": 1},
+        )
+
+    def test_ndjson_import(self):
+        """Тестирование импорта из NDJSON с числовыми id и задачами без исполнителя."""
+        employees = self.write("employees.ndjson", '{"id": 1, "fullname": "Employee", "position": "Dev"}\n\n')
+        tasks = self.write(
+            "tasks.ndjson",
+            '{"id": 1, "name": "Task", "executor": 1, "period": "2025-08-30T11:49:00Z"}\n'
+            '{"id": 2, "name": "Subtask", "parent": 1, "period": "2025-08-31T12:00:00Z"}\n',
+        )
+
+        self.import_tasks("--employees", employees, "--tasks", tasks)
+
+        subtask = Task.objects.get(name="Subtask")
+        self.assertEqual(subtask.parent_task.executor.fullname, "Employee")
+        self.assertEqual(subtask.status, "Open")
+        self.assertEqual(Employee.objects.get().active_tasks_count, 1)
+
+    def test_references_resolved_by_file_ids(self):
+        """Тестирование того, что ссылки разрешаются только по id из файлов импорта."""
+        Employee.objects.create(fullname="Existing", position="Dev")
+        tasks = self.write(
+            "tasks.ndjson", '{"id": 1, "name": "Task", "executor": 1, "period": "2025-08-30T11:49:00Z"}\n'
+        )
+
+        with self.assertRaisesMessage(CommandError, "tasks, запись 1: executor: неизвестный сотрудник 1"):
+            self.import_tasks("--tasks", tasks)
+
+    def test_errors_roll_back_import(self):
+        """Тестирование того, что при ошибках в файле не сохраняется ни одна строка."""
+        employees = self.write("employees.csv", "id,fullname,position\n1,Employee,Dev\n2,Employee 2,Dev\n3,E3,Dev\n")
+        tasks = self.write(
+            "tasks.csv",
+            "id,name,parent,executor,period,status\n"
+            "1,Task,,1,2025-08-30T11:49:00Z,\n"
+            "1,Duplicate,,,2025-08-30T11:49:00Z,\n"
+            "2,Task 2,9,,2025-08-30T11:49:00Z,\n"
+            "3,Task 3,,,not a date,Unknown\n",
+        )
+
+        with self.assertRaises(CommandError) as raised:
+            self.import_tasks("--employees", employees, "--tasks", tasks)
+
+        message = str(raised.exception)
+        self.assertIn("tasks, запись 2: Повторный id 1", message)
+        self.assertIn("tasks, запись 3: parent: неизвестная задача 9", message)
+        self.assertIn("tasks, запись 4: period:", message)
+        self.assertIn("tasks, запись 4: status:", message)
+        self.assertFalse(Employee.objects.exists())
+        self.assertFalse(Task.objects.exists())
+
+    def test_ndjson_non_object_records(self):
+        """Тестирование ошибки для записей NDJSON, которые не являются объектами."""
+        tasks = self.write(
+            "tasks.ndjson", '[1, 2]\n{"id": 1, "name": "Task", "period": "2025-08-30T11:49:00Z"}\n"task"\n'
+        )
+
+        with self.assertRaises(CommandError) as raised:
+            self.import_tasks("--tasks", tasks)
+
+        message = str(raised.exception)
+        self.assertIn("tasks, запись 1: Запись должна быть объектом", message)
+        self.assertIn("tasks, запись 3: Запись должна быть объектом", message)
+        self.assertFalse(Task.objects.exists())
+
+    def test_parent_cycles(self):
+        """Тестирование отказа в импорте задач, ссылающихся на себя или образующих цикл."""
+        for dry_run in ((), ("--dry-run",)):
+            tasks = self.write(
+                "tasks.csv",
+                "id,name,parent,period\n"
+                "t1,Task 1,t2,2025-08-30T11:49:00Z\n"
+                "t2,Task 2,t3,2025-08-30T11:49:00Z\n"
+                "t3,Task 3,t1,2025-08-30T11:49:00Z\n"
+                "t4,Task 4,t4,2025-08-30T11:49:00Z\n"
+                "t5,Task 5,t1,2025-08-30T11:49:00Z\n",
+            )
+            with self.subTest(dry_run=dry_run), self.assertRaises(CommandError) as raised:
+                self.import_tasks("--tasks", tasks, *dry_run)
+
+            message = str(raised.exception)
+            self.assertIn("tasks, запись 1: parent: цикл из задач", message)
+            self.assertIn("tasks, запись 4: parent: задача не может быть родителем самой себя", message)
+            self.assertNotIn("запись 5", message)
+            self.assertFalse(Task.objects.exists())
+
+    def test_dry_run(self):
+        """Тестирование проверки файлов без сохранения."""
+        employees = self.write("employees.csv", "id,fullname,position\n1,Employee,Dev\n")
+        tasks = self.write(
+            "tasks.csv", "id,name,parent,executor,period\n1,Task,2,1,2025-08-30T11:49:00Z\n2,P,,,2025-08-30\n"
+        )
+
+        output = self.import_tasks("--employees", employees, "--tasks", tasks, "--dry-run")
+
+        self.assertIn("Проверено: сотрудников 1, задач 2", output)
+        self.assertFalse(Employee.objects.exists())
+        self.assertFalse(Task.objects.exists())
+
+
+class SeedSyntheticCommandTestCase(APITestCase):
+    """Тестирование генерации синтетических данных командой seed_synthetic."""
+
+    def seed(self, *args):
+        out = StringIO()
+        call_command("seed_synthetic", "--employees", "20", "--tasks", "300", *args, stdout=out)
+        return out.getvalue()
+
+    def snapshot(self):
+        return list(
+            Task.objects.order_by("id").values_list(
+                "name", "description", "parent_task__name", "executor__fullname", "period", "status"
+            )
+        )
+
+    def test_seed_is_deterministic(self):
+        """Тестирование того, что одинаковый seed дает одинаковые данные, а другой seed - другие."""
+        self.seed("--seed", "7")
+        first = self.snapshot()
+
+        self.seed("--seed", "7", "--clear")
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(Employee.objects.count(), 20)
+
+        self.seed("--seed", "8", "--clear")
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_tree_depth_statuses_and_counters(self):
+        """Тестирование глубины деревьев, распределения статусов и счетчиков активных задач."""
+        output = self.seed("--depth", "2", "--statuses", "Open=1,Closed=1")
+
+        self.assertIn("Создано сотрудников: 20, задач: 300", output)
+        self.assertFalse(Task.objects.filter(parent_task__parent_task__isnull=False).exists())
+        self.assertTrue(Task.objects.filter(parent_task__isnull=False).exists())
+        self.assertEqual(set(Task.objects.values_list("status", flat=True)), {"Open", "Closed"})
+        self.assertFalse(Task.objects.filter(status="Open", executor__isnull=False).exists())
+        self.assertEqual(Employee.objects.recount_active_tasks(), 0)
+
+    def test_invalid_statuses(self):
+        """Тестирование ошибки при неизвестном статусе."""
+        with self.assertRaisesMessage(CommandError, "Неизвестный статус 'Unknown'"):
+            self.seed("--statuses", "Unknown=1")
+
+    def test_invalid_status_weights(self):
+        """Тестирование ошибки при отрицательном весе и нулевой сумме весов."""
+        for statuses, message in (
+            ("Open=1,Closed=-1", "Вес статуса 'Closed' должен быть неотрицательным числом"),
+            ("Open=nan", "Вес статуса 'Open' должен быть неотрицательным числом"),
+            ("Open=0,Closed=0", "Сумма весов статусов должна быть больше нуля"),
+        ):
+            with self.subTest(statuses=statuses), self.assertRaisesMessage(CommandError, message) as raised:
+                self.seed("--statuses", statuses)
+            self.assertIn("--statuses", str(raised.exception))
+        self.assertFalse(Task.objects.exists())
+
+
+class BenchReportTestCase(APITestCase):
+    """Тестирование отчетов и сравнения замеров команды bench."""
+
+    def test_compare_reports(self):
+        """Тестирование направлений метрик и порога регрессии."""
+        baseline = {
+            "endpoints": {"tasks_p95_ms": 10, "tasks_queries": 2, "size": 100, "rows_per_second": 1000},
+            "renderers": {"json_bytes": 100},
+        }
+        current = {
+            "endpoints": {"tasks_p95_ms": 11.5, "tasks_queries": 3, "size": 1000, "rows_per_second": 700},
+            "renderers": {"json_bytes": 130},
+            "cascade_delete": {"collector_seconds": 5},
+        }
+
+        self.assertEqual(
+            compare_reports(baseline, current),
+            [
+                ("endpoints", "tasks_queries", 2, 3),
+                ("endpoints", "rows_per_second", 1000, 700),
+                ("renderers", "json_bytes", 100, 130),
+            ],
+        )
+        self.assertEqual(compare_reports(baseline, current, threshold=0.1)[0], ("endpoints", "tasks_p95_ms", 10, 11.5))
+
+    def test_bench_endpoints_report(self):
+        """Тестирование замера эндпоинтов с сохранением отчета и сравнением с ним же."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = f"{directory}/report.json"
+
+        with mock.patch.dict(SCENARIOS, endpoints=partial(bench_endpoints, sizes=(50,), repeat=2)):
+            call_command("bench", "endpoints", "--output", path, stdout=StringIO())
+
+        with open(path, encoding="utf-8") as file:
+            results = json.load(file)["scenarios"]["endpoints"]
+        for name in ("tasks", "employees", "busy_employees", "important_tasks", "search_employee"):
+            self.assertGreater(results[f"{name}_50_queries"], 0)
+            self.assertIn(f"{name}_50_p95_ms", results)
+            self.assertIn(f"{name}_50_peak_kb", results)
+        self.assertFalse(Task.objects.exists())
+
+        out = StringIO()
+        call_command("bench", "--compare", path, path, stdout=out)
+        self.assertIn("Регрессий не найдено", out.getvalue())
+
+
+class QueryBudgetTestCase(APITestCase):
+    """Тестирование количества SQL-запросов каждого эндпоинта tasks/urls.py и users/urls.py.
+
+    Каждый эндпоинт вызывается на синтетических данных двух размеров с пустым кэшем ответов.
+    Количество запросов не должно зависеть от размера данных и превышать бюджет эндпоинта.
+    """
+
+    sizes = (10, 500)
+
+    # Бюджет запросов каждого маршрута с учетом загрузки пользователя и SAVEPOINT транзакций
+    budgets = {
+        "tasks/create/": 6,
+        "tasks/bulk_create/": 6,
+        "tasks/bulk_update/": 5,
+        "tasks/": 4,
+        "tasks/changes/": 4,
+        "tasks/<int:pk>/": 3,
+        "tasks/<int:pk>/tree/": 2,
+        "tasks/<int:pk>/update/": 8,
+        "tasks/<int:pk>/delete/": 7,
+        "important_tasks/": 5,
+        "employees/create/": 2,
+        "employees/": 3,
+        "employees/<int:pk>/": 3,
+        "employees/<int:pk>/update/": 3,
+        "employees/<int:pk>/delete/": 12,
+        "busy_employees/": 2,
+        "async/tasks/": 2,
+        "async/tasks/<int:pk>/": 2,
+        "async/employees/": 2,
+        "async/busy_employees/": 2,
+        "async/important_tasks/": 5,
+        "exports/": 4,
+        "exports/<int:pk>/": 2,
+        "exports/<int:pk>/download/": 2,
+        "cache_stats/": 1,
+        "register/": 4,
+        "login/": 1,
+        "token/refresh/": 1,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create(username="user", email="user@test.com", is_staff=True)
+        self.user.set_password("test")
+        self.user.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def get_requests(self):
+        """Метод, путь и данные запроса к каждому маршруту на текущих данных."""
+        # Изменяемые объекты одинаковы на данных любого размера: число запросов на запись
+        # зависит от количества затронутых исполнителей
+        period = "2025-09-01T09:00:00Z"
+        employee = Employee.objects.create(fullname="Employee", position="Dev")
+        task = Task.objects.create(name="Task", period=period, executor=employee, status="In Progress")
+        subtask = Task.objects.create(name="Subtask", period=period, parent_task=task)
+        export = ExportJob.objects.create(kind="tasks", format="csv", created_by=self.user)
+
+        return {
+            "tasks/create/": ("post", "/tasks/create/", {"name": "New", "period": period, "executor": employee.pk}),
+            "tasks/bulk_create/": (
+                "post",
+                "/tasks/bulk_create/",
+                [{"name": f"New {i}", "period": period, "executor": employee.pk} for i in range(3)],
+            ),
+            "tasks/bulk_update/": (
+                "patch",
+                "/tasks/bulk_update/",
+                {"ids": [task.pk, subtask.pk], "patch": {"status": "Done"}},
+            ),
+            "tasks/": ("get", "/tasks/", None),
+            "tasks/changes/": (
+                "get",
+                "/tasks/changes/",
+                {"since": encode_sync_token(0, int(timezone.now().timestamp()))},
+            ),
+            "tasks/<int:pk>/": ("get", f"/tasks/{task.pk}/", None),
+            "tasks/<int:pk>/tree/": ("get", f"/tasks/{task.pk}/tree/", None),
+            "tasks/<int:pk>/update/": ("patch", f"/tasks/{task.pk}/update/", {"executor": employee.pk}),
+            "tasks/<int:pk>/delete/": ("delete", f"/tasks/{task.pk}/delete/", None),
+            "important_tasks/": ("get", "/important_tasks/", None),
+            "employees/create/": ("post", "/employees/create/", {"fullname": "New", "position": "Dev"}),
+            "employees/": ("get", "/employees/", None),
+            "employees/<int:pk>/": ("get", f"/employees/{employee.pk}/", None),
+            "employees/<int:pk>/update/": ("patch", f"/employees/{employee.pk}/update/", {"position": "QA"}),
+            "employees/<int:pk>/delete/": ("delete", f"/employees/{employee.pk}/delete/", None),
+            "busy_employees/": ("get", "/busy_employees/", None),
+            "async/tasks/": ("get", "/async/tasks/", None),
+            "async/tasks/<int:pk>/": ("get", f"/async/tasks/{task.pk}/", None),
+            "async/employees/": ("get", "/async/employees/", None),
+            "async/busy_employees/": ("get", "/async/busy_employees/", None),
+            "async/important_tasks/": ("get", "/async/important_tasks/", None),
+            "exports/": ("post", "/exports/", {"kind": "tasks", "format": "csv"}),
+            "exports/<int:pk>/": ("get", f"/exports/{export.pk}/", None),
+            "exports/<int:pk>/download/": ("get", f"/exports/{export.pk}/download/", None),
+            "cache_stats/": ("get", "/cache_stats/", None),
+            "register/": ("post", "/register/", {"email": "new@test.com", "username": "new", "password": "test"}),
+            "login/": ("post", "/login/", {"username": "user", "password": "test"}),
+            "token/refresh/": ("post", "/token/refresh/", {"refresh": str(RefreshToken.for_user(self.user))}),
+        }
+
+    def measure(self, size):
+        """Запросы каждого маршрута на данных из size сотрудников и size задач."""
+        captured = {}
+        with rollback_atomic():
+            seed_synthetic(employees=size, tasks=size, seed=0)
+
+            for route, (method, path, data) in self.get_requests().items():
+                # Замеряется худший случай: без закэшированных ответов и пользователя
+                cache.clear()
+                local_user_cache.clear()
+                with rollback_atomic(), CaptureQueriesContext(connection) as queries:
+                    response = getattr(self.client, method)(path, data, format="json")
+
+                # Выгрузка еще не готова, поэтому скачивание возвращает 409
+                if route == "exports/<int:pk>/download/":
+                    self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+                else:
+                    self.assertTrue(status.is_success(response.status_code), f"{route}: {response.status_code}")
+                captured[route] = [query["sql"] for query in queries.captured_queries]
+        return captured
+
+    def format_queries(self, queries):
+        return "\n".join(f"  {index}. {sql}" for index, sql in enumerate(queries, start=1))
+
+    def test_query_budgets(self):
+        """Тестирование бюджетов запросов и их независимости от размера данных."""
+        routes = {str(pattern.pattern) for pattern in [*tasks_urls.urlpatterns, *users_urls.urlpatterns]}
+        self.assertEqual(set(self.budgets), routes)
+
+        small, large = (self.measure(size) for size in self.sizes)
+
+        for route, budget in self.budgets.items():
+            with self.subTest(route=route):
+                if len(large[route]) > budget:
+                    self.fail(
+                        f"{route}: {len(large[route])} запросов при бюджете {budget}:\n"
+                        + self.format_queries(large[route])
+                    )
+                if len(small[route]) != len(large[route]):
+                    self.fail(
+                        f"{route}: {len(small[route])} запросов на {self.sizes[0]} строк "
+                        f"и {len(large[route])} на {self.sizes[1]}:\n"
+                        + self.format_queries(small[route])
+                        + "\n\n"
+                        + self.format_queries(large[route])
+                    )
+
+
+class ServerTimingTestCase(APITestCase):
+    """Тестирование заголовка Server-Timing и журнала медленных запросов."""
+
+    def setUp(self):
+        self.user = User.objects.create(username="user", password="test")
+        self.client.force_authenticate(user=self.user)
+
+        employee = Employee.objects.create(fullname="Employee", position="Dev")
+        parent = Task.objects.create(name="Parent", period="2025-08-30T11:49:00Z", executor=employee)
+        Task.objects.filter(pk=parent.pk).update(status="In Progress")
+        Task.objects.create(name="Child", period="2025-08-30T11:49:00Z", parent_task=parent)
+
+    def get_server_timing(self, response):
+        timings = {}
+        for metric in response.headers["Server-Timing"].split(", "):
+            name, *params = metric.split(";")
+            timings[name] = dict(param.split("=", 1) for param in params)
+        return timings
+
+    def test_server_timing_header(self):
+        """Тестирование этапов важных задач: SQL, поиск сотрудников, сериализация и рендеринг."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/important_tasks/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timings = self.get_server_timing(response)
+        self.assertEqual(list(timings), ["db", "search", "serialize", "render", "total"])
+        self.assertEqual(timings["db"]["desc"], f'"{len(queries)} queries"')
+        for metric in timings.values():
+            self.assertGreaterEqual(float(metric["dur"]), 0)
+        self.assertLessEqual(float(timings["search"]["dur"]), float(timings["total"]["dur"]))
+
+    def test_server_timing_values_serializer(self):
+        """Тестирование того, что вложенная сериализация не учитывается повторно."""
+        response = self.client.get("/employees/?expand=tasks")
+
+        timings = self.get_server_timing(response)
+        self.assertLessEqual(float(timings["serialize"]["dur"]), float(timings["total"]["dur"]))
+        self.assertEqual(timings["db"]["desc"], '"4 queries"')
+
+    async def test_server_timing_async(self):
+        """Тестирование заголовка на асинхронных эндпоинтах."""
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        response = await self.async_client.get("/async/tasks/", headers={"Authorization": f"Bearer {token}"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timings = self.get_server_timing(response)
+        self.assertEqual(timings["db"]["desc"], '"2 queries"')
+        self.assertIn("render", timings)
+
+    def test_slow_request_log(self):
+        """Тестирование журнала медленных запросов с самыми медленными SQL-запросами."""
+        with (
+            self.settings(SLOW_REQUEST_THRESHOLD=0, SLOW_REQUEST_SQL_COUNT=2),
+            self.assertLogs("tasks.instrumentation", "WARNING") as logs,
+        ):
+            self.client.get("/important_tasks/")
+
+        data = logs.records[0].request_metrics
+        self.assertEqual(data["method"], "GET")
+        self.assertEqual(data["path"], "/important_tasks/")
+        self.assertEqual(data["status"], 200)
+        self.assertGreater(data["queries"], 2)
+        self.assertEqual(len(data["slowest_sql"]), 2)
+        self.assertGreaterEqual(data["slowest_sql"][0]["ms"], data["slowest_sql"][1]["ms"])
+        self.assertIn("SELECT", data["slowest_sql"][0]["sql"])
+        self.assertEqual(json.loads(logs.records[0].getMessage().split(" ", 2)[2]), data)
+
+    def test_fast_requests_not_logged(self):
+        """Тестирование того, что быстрые запросы не пишутся в журнал."""
+        with self.assertNoLogs("tasks.instrumentation"):
+            self.client.get("/tasks/")
+
+    def test_disabled(self):
+        """Тестирование отключения заголовка настройкой."""
+        with self.settings(SERVER_TIMING_ENABLED=False):
+            response = self.client.get("/tasks/")
+
+        self.assertNotIn("Server-Timing", response.headers)
+
+
+class MetricsTestCase(APITestCase):
+    """Тестирование метрик Prometheus на /metrics."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="user", password="test")
+        self.client.force_authenticate(user=self.user)
+        self.task = Task.objects.create(name="Task", period="2025-08-30T11:49:00Z")
+        settings_override = self.settings(METRICS_TOKEN="secret", METRICS_PUBLIC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def get_samples(self, content=None):
+        if content is None:
+            response = self.client.get("/metrics", headers={"Authorization": "Bearer secret"})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response["Content-Type"].startswith("text/plain"))
+            content = response.content
+        return {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(content.decode())
+            for sample in family.samples
+        }
+
+    def get_value(self, samples, name, **labels):
+        return samples.get((name, tuple(sorted(labels.items()))), 0)
+
+    def test_route_metrics(self):
+        """Тестирование счетчиков запросов, гистограмм времени и SQL-запросов по маршрутам."""
+        route = {"view": "tasks:task-list", "route": "tasks/<int:pk>/"}
+        before = self.get_samples()
+
+        self.client.get(f"/tasks/{self.task.pk}/")
+        self.client.get(f"/tasks/{self.task.pk}/")
+        self.client.get("/tasks/0/")
+        self.client.get("/unknown/")
+        after = self.get_samples()
+
+        def delta(name, **labels):
+            return self.get_value(after, name, **labels) - self.get_value(before, name, **labels)
+
+        requests = "tasks_http_requests_total"
+        self.assertEqual(delta(requests, **route, method="GET", status="200"), 2)
+        self.assertEqual(delta(requests, **route, method="GET", status="404"), 1)
+        self.assertEqual(delta(requests, view="unmatched", route="unmatched", method="GET", status="404"), 1)
+        self.assertEqual(delta("tasks_http_request_duration_seconds_count", **route), 3)
+        self.assertEqual(delta("tasks_http_request_duration_seconds_bucket", **route, le="+Inf"), 3)
+        # Версия ответа и выборка задачи: по два SQL-запроса на каждый запрос
+        self.assertEqual(delta("tasks_http_request_db_queries_sum", **route), 6)
+        self.assertEqual(delta("tasks_http_request_db_queries_bucket", **route, le="2.0"), 3)
+        self.assertEqual(delta("tasks_http_request_db_queries_bucket", **route, le="1.0"), 0)
+
+    def test_response_cache_metrics(self):
+        """Тестирование счетчиков и доли попаданий в кэш ответов."""
+        self.client.get("/busy_employees/")
+        self.client.get("/busy_employees/")
+        self.client.get("/busy_employees/")
+
+        samples = self.get_samples()
+        self.assertEqual(self.get_value(samples, "tasks_response_cache_hits_total"), 2)
+        self.assertEqual(self.get_value(samples, "tasks_response_cache_misses_total"), 1)
+        self.assertAlmostEqual(self.get_value(samples, "tasks_response_cache_hit_ratio"), 2 / 3)
+
+    def test_metrics_token(self):
+        """Тестирование доступа к метрикам по токену."""
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get("/metrics").status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get("/metrics", headers={"Authorization": "Bearer secret"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_metrics_closed_by_default(self):
+        """Тестирование закрытых метрик без токена и их явного открытия."""
+        with self.settings(METRICS_TOKEN=None):
+            self.assertEqual(self.client.get("/metrics").status_code, status.HTTP_401_UNAUTHORIZED)
+            response = self.client.get("/metrics", headers={"Authorization": "Bearer None"})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+            with self.settings(METRICS_PUBLIC=True):
+                self.assertEqual(self.client.get("/metrics").status_code, status.HTTP_200_OK)
+
+    def test_multiprocess_aggregation(self):
+        """Тестирование суммирования метрик нескольких процессов через каталог PROMETHEUS_MULTIPROC_DIR."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": directory, "DJANGO_SETTINGS_MODULE": "task_tracker.settings"}
+        script = (
+            "from tasks.metrics import LATENCY, REQUESTS\n"
+            "REQUESTS.labels('tasks:task-list', 'tasks/', 'GET', 200).inc()\n"
+            "LATENCY.labels('tasks:task-list', 'tasks/').observe(0.2)\n"
+        )
+        for _ in range(3):
+            subprocess.run([sys.executable, "-c", script], env=env, check=True)
+
+        content, _ = render_metrics(directory)
+        samples = self.get_samples(content)
+        labels = {"view": "tasks:task-list", "route": "tasks/"}
+        self.assertEqual(self.get_value(samples, "tasks_http_requests_total", **labels, method="GET", status="200"), 3)
+        self.assertEqual(self.get_value(samples, "tasks_http_request_duration_seconds_bucket", **labels, le="0.25"), 3)
+        self.assertEqual(self.get_value(samples, "tasks_http_request_duration_seconds_bucket", **labels, le="0.1"), 0)
+
+
+class ProfilingTestCase(APITestCase):
+    """Тестирование профилирования запросов по заголовку X-Profile и параметру ?profile=."""
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = self.settings(PROFILING_DIR=self.directory, PROFILING_MAX_PROFILES=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.staff = User.objects.create(username="staff", password="test", is_staff=True)
+        self.user = User.objects.create(username="user", password="test")
+        self.authorize(self.staff)
+
+        parent = Task.objects.create(name="Parent", period="2025-08-30T11:49:00Z")
+        Task.objects.filter(pk=parent.pk).update(status="In Progress")
+        Task.objects.create(name="Child", period="2025-08-30T11:49:00Z", parent_task=parent)
+        Employee.objects.create(fullname="Employee", position="Dev")
+
+    def authorize(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+    def get_profiles(self):
+        return sorted(path.name for path in self.directory.iterdir())
+
+    def test_profile_header(self):
+        """Тестирование профиля cProfile и сэмплов по заголовку."""
+        response = self.client.get("/important_tasks/", headers={"X-Profile": "1"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        name = response.headers["X-Profile-Id"]
+        self.assertEqual(self.get_profiles(), [f"{name}.collapsed", f"{name}.prof", f"{name}.txt"])
+
+        stats = pstats.Stats(str(self.directory / f"{name}.prof"))
+        self.assertTrue(any(function == "search_employee" for _, _, function in stats.stats))
+        self.assertIn("search_employee", (self.directory / f"{name}.txt").read_text())
+        for line in (self.directory / f"{name}.collapsed").read_text().splitlines():
+            self.assertRegex(line, r"^\S.* \d+$")
+
+    def test_profile_query_param(self):
+        """Тестирование выбора профилировщика параметром запроса."""
+        response = self.client.get("/tasks/?profile=cprofile")
+
+        name = response.headers["X-Profile-Id"]
+        self.assertEqual(self.get_profiles(), [f"{name}.prof", f"{name}.txt"])
+
+    async def test_profile_async(self):
+        """Тестирование профилирования асинхронных эндпоинтов."""
+        token = await sync_to_async(AccessToken.for_user)(self.staff)
+        response = await self.async_client.get(
+            "/async/tasks/", headers={"Authorization": f"Bearer {token}", "X-Profile": "sample"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_profiles(), [f"{response.headers['X-Profile-Id']}.collapsed"])
+
+    def test_overlapping_cprofile(self):
+        """Тестирование запроса, профилируемого во время профилирования другого запроса."""
+        with RequestProfiler(["cprofile"], sample_interval=0.001):
+            response = self.client.get("/tasks/", headers={"X-Profile": "1"})
+            only_cprofile = self.client.get("/tasks/?profile=cprofile")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Profile-Skipped"], "cprofile")
+        self.assertEqual(self.get_profiles(), [f"{response['X-Profile-Id']}.collapsed"])
+        self.assertEqual(only_cprofile.status_code, status.HTTP_200_OK)
+        self.assertEqual(only_cprofile["X-Profile-Skipped"], "cprofile")
+        self.assertNotIn("X-Profile-Id", only_cprofile.headers)
+
+        response = self.client.get("/tasks/?profile=cprofile")
+        self.assertNotIn("X-Profile-Skipped", response.headers)
+        self.assertIn(f"{response['X-Profile-Id']}.prof", self.get_profiles())
+
+    async def test_concurrent_async_profiles(self):
+        """Тестирование одновременных профилируемых запросов в одном потоке цикла событий."""
+        token = await sync_to_async(AccessToken.for_user)(self.staff)
+        headers = {"Authorization": f"Bearer {token}", "X-Profile": "cprofile"}
+
+        responses = await asyncio.gather(*(self.async_client.get("/async/tasks/", headers=headers) for _ in range(2)))
+
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_200_OK] * 2)
+        self.assertEqual(sorted("X-Profile-Skipped" in response.headers for response in responses), [False, True])
+
+    def test_not_profiled(self):
+        """Тестирование того, что без флага и для обычных пользователей профиль не создается."""
+        self.assertNotIn("X-Profile-Id", self.client.get("/tasks/").headers)
+        self.assertNotIn("X-Profile-Id", self.client.get("/tasks/", headers={"X-Profile": "unknown"}).headers)
+
+        self.authorize(self.user)
+        response = self.client.get("/tasks/?profile=1", headers={"X-Profile": "1"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-Profile-Id", response.headers)
+
+        self.client.credentials()
+        self.assertNotIn("X-Profile-Id", self.client.get("/tasks/", headers={"X-Profile": "1"}).headers)
+        self.assertEqual(self.get_profiles(), [])
+
+    def test_ring_buffer(self):
+        """Тестирование того, что хранятся только последние PROFILING_MAX_PROFILES профилей."""
+        names = [self.client.get("/tasks/", headers={"X-Profile": "cprofile"})["X-Profile-Id"] for _ in range(3)]
+
+        self.assertEqual(
+            self.get_profiles(), [f"{name}{suffix}" for name in names[1:] for suffix in (".prof", ".txt")]
+        )
+
+    def test_stack_sampler(self):
+        """Тестирование сэмплов стека потока в формате collapsed stacks."""
+
+        def busy_loop():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        with RequestProfiler(["sample"], sample_interval=0.001) as profiler:
+            busy_loop()
+
+        stacks = profiler.sampler.stacks
+        self.assertGreater(sum(stacks.values()), 5)
+        self.assertTrue(any(stack.split(";")[-1].startswith("busy_loop (") for stack in stacks))
@@ -2,15 +2,27 @@ from django.urls import path
 
 from tasks.apps import TasksConfig
 
-from .views import BusyEmployeesAPIView, EmployeeViewSet, ImportantTasksViewSet, TaskViewSet
+from . import async_views
+from .views import (
+    BusyEmployeesAPIView,
+    CacheStatsAPIView,
+    EmployeeViewSet,
+    ExportJobViewSet,
+    ImportantTasksViewSet,
+    TaskViewSet,
+)
 
 app_name = TasksConfig.name
 
 urlpatterns = [
     # Задачи
     path("tasks/create/", TaskViewSet.as_view({"post": "create"}), name="task-create"),
+    path("tasks/bulk_create/", TaskViewSet.as_view({"post": "bulk_create"}), name="task-bulk-create"),
+    path("tasks/bulk_update/", TaskViewSet.as_view({"patch": "bulk_update"}), name="task-bulk-update"),
     path("tasks/", TaskViewSet.as_view({"get": "list"}), name="task-list"),
+    path("tasks/changes/", TaskViewSet.as_view({"get": "changes"}), name="task-changes"),
     path("tasks/<int:pk>/", TaskViewSet.as_view({"get": "retrieve"}), name="task-list"),
+    path("tasks/<int:pk>/tree/", TaskViewSet.as_view({"get": "tree"}), name="task-tree"),
     path("tasks/<int:pk>/update/", TaskViewSet.as_view({"put": "update", "patch": "update"}), name="task-update"),
     path("tasks/<int:pk>/delete/", TaskViewSet.as_view({"delete": "destroy"}), name="task-delete"),
     path("important_tasks/", ImportantTasksViewSet.as_view({"get": "list"}), name="important-task"),
@@ -25,4 +37,16 @@ urlpatterns = [
     ),
     path("employees/<int:pk>/delete/", EmployeeViewSet.as_view({"delete": "destroy"}), name="employee-delete"),
     path("busy_employees/", BusyEmployeesAPIView.as_view(), name="busy-employee-list"),
+    # Асинхронные эндпоинты чтения для ASGI-воркеров
+    path("async/tasks/", async_views.task_list, name="async-task-list"),
+    path("async/tasks/<int:pk>/", async_views.task_detail, name="async-task-detail"),
+    path("async/employees/", async_views.employee_list, name="async-employee-list"),
+    path("async/busy_employees/", async_views.busy_employees, name="async-busy-employee-list"),
+    path("async/important_tasks/", async_views.important_tasks, name="async-important-task"),
+    # Выгрузки
+    path("exports/", ExportJobViewSet.as_view({"get": "list", "post": "create"}), name="export-list"),
+    path("exports/<int:pk>/", ExportJobViewSet.as_view({"get": "retrieve"}), name="export-detail"),
+    path("exports/<int:pk>/download/", ExportJobViewSet.as_view({"get": "download"}), name="export-download"),
+    # Кэш
+    path("cache_stats/", CacheStatsAPIView.as_view(), name="cache-stats"),
 ]
@@ -1,26 +1,171 @@
-from django.db.models import Count, Min, Q
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, HttpResponse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from rest_framework import status, viewsets
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Employee, Task
-from .serializers import CreateTaskSerializer, EmployeeSerializer, ImportantTaskSerializer, TaskSerializer
-from .services import search_employee
+from .cache import cached_response, get_cache_stats
+from .exports import start_export
+from .instrumentation import timing
+from .metrics import render_metrics
+from .mixins import ConditionalGetMixin, SparseFieldsetsMixin, ValuesListMixin, get_sparse_fields
+from .models import Employee, ExportJob, Task, TaskTombstone
+from .paginators import EmployeePagination, TaskPagination
+from .serializers import (
+    BulkCreateTaskSerializer,
+    BulkUpdateTaskSerializer,
+    CreateTaskSerializer,
+    EmployeeSerializer,
+    ExportJobSerializer,
+    ImportantTaskSerializer,
+    TaskSerializer,
+    TaskTreeQuerySerializer,
+    ValuesSerializer,
+)
+from .services import (
+    build_task_tree,
+    bulk_create_tasks,
+    bulk_update_tasks,
+    decode_sync_token,
+    delete_employee,
+    delete_task_subtree,
+    encode_sync_token,
+    get_initial_status,
+    get_task_changes,
+    is_sync_token_expired,
+    search_employee,
+)
+
+
+class SyncTokenExpired(APIException):
+    """Токен синхронизации старше срока хранения отметок об удалении."""
+
+    status_code = status.HTTP_410_GONE
+    default_detail = "Токен синхронизации устарел, выполните полную синхронизацию без since."
+    default_code = "sync_token_expired"
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ConditionalGetMixin, SparseFieldsetsMixin, ValuesListMixin, viewsets.ModelViewSet):
     """ViewSet для задачи."""
 
     permission_classes = [IsAuthenticated]
     queryset = Task.objects.all()
+    pagination_class = TaskPagination
+    bulk_max_length = 10_000
+    changes_page_size = 1000
 
     def get_serializer_class(self):
         if self.action == "create":
             return CreateTaskSerializer
+        elif self.action == "bulk_create":
+            return BulkCreateTaskSerializer
+        elif self.action == "bulk_update":
+            return BulkUpdateTaskSerializer
         else:
             return TaskSerializer
 
+    def get_version_querysets(self):
+        if self.action == "retrieve":
+            return [Task.objects.filter(pk=self.kwargs["pk"])]
+        return [Task.objects.all()]
+
+    def get_version_tombstones(self):
+        if self.action == "retrieve":
+            return None
+        return TaskTombstone.objects.all()
+
+    def bulk_create(self, request, *args, **kwargs):
+        """Массовое создание задач. С параметром ?partial=1 валидные задачи создаются, несмотря на ошибки."""
+        serializer = self.get_serializer(data=request.data, many=True, max_length=self.bulk_max_length)
+        serializer.is_valid(raise_exception=True)
+        partial = request.query_params.get("partial") in ("1", "true")
+
+        errors = serializer.item_errors
+        tasks = []
+        if partial or not errors:
+            tasks, related_errors = bulk_create_tasks(serializer.validated_data, partial=partial)
+            errors = {**errors, **related_errors}
+
+        errors = [{"index": index, "errors": errors[index]} for index in sorted(errors)]
+        if errors and not partial:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        created = TaskSerializer(tasks, many=True).data
+        return Response({"created": created, "errors": errors}, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request, *args, **kwargs):
+        """Массовое изменение статуса, исполнителя или срока задач, выбранных по ids или filter."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if "ids" in serializer.validated_data:
+            tasks = Task.objects.filter(pk__in=serializer.validated_data["ids"])
+        else:
+            tasks = Task.objects.filter(**serializer.validated_data["filter"])
+
+        updated = bulk_update_tasks(tasks, serializer.validated_data["patch"])
+        return Response({"updated": updated})
+
+    def changes(self, request, *args, **kwargs):
+        """Задачи, измененные после токена ?since=, и id удаленных задач вместе с новым токеном.
+
+        Изменения отдаются страницами не больше changes_page_size задач и удалений. Пока has_more истинно,
+        следующая страница запрашивается с новым токеном. На токен старше TASK_TOMBSTONE_RETENTION
+        возвращается 410: отметки об удалении после него могли быть удалены.
+        """
+        since = request.query_params.get("since")
+        try:
+            since, issued_at, tasks_after, deleted_after = (
+                decode_sync_token(since) if since else (None, None, None, None)
+            )
+        except ValueError as exc:
+            raise ValidationError({"since": [str(exc)]})
+
+        if issued_at is not None and is_sync_token_expired(issued_at):
+            raise SyncTokenExpired()
+        # Новый проход: время берется до чтения позиции, поэтому токен не окажется моложе своей позиции
+        if tasks_after is None:
+            issued_at = int(timezone.now().timestamp())
+
+        position, tasks_after, deleted_after, changed, deleted = get_task_changes(
+            since, tasks_after, deleted_after, limit=self.changes_page_size
+        )
+        return Response(
+            {
+                "token": encode_sync_token(position, issued_at, tasks_after, deleted_after),
+                "changed": TaskSerializer(changed, many=True).data,
+                "deleted": deleted,
+                "has_more": tasks_after is not None,
+            }
+        )
+
+    def tree(self, request, pk, *args, **kwargs):
+        """Поддерево задачи одним запросом, с параметром ?ancestors=1 - цепочка ее родительских задач."""
+        params = TaskTreeQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        max_depth = params.validated_data.get("max_depth")
+        limit = params.validated_data["limit"]
+
+        if params.validated_data["ancestors"]:
+            tasks = list(Task.objects.ancestors(pk, max_depth=max_depth))[::-1]
+        else:
+            tasks = list(Task.objects.subtree(pk, max_depth=max_depth, limit=limit + 1))
+
+        if not tasks:
+            raise NotFound()
+
+        truncated = len(tasks) > limit
+        tree = build_task_tree(TaskSerializer(tasks[:limit], many=True).data)
+        return Response({"truncated": truncated, "tree": tree})
+
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=True)
@@ -28,31 +173,48 @@ class TaskViewSet(viewsets.ModelViewSet):
         self.perform_update(serializer)
         return Response(serializer.data)
 
+    @transaction.atomic
     def perform_update(self, serializer):
-        task = serializer.save()
-        if task.executor:
-            task.status = "To Do"
-        else:
-            task.status = "Open"
-
-        task.save()
+        executor = serializer.validated_data.get("executor", serializer.instance.executor)
+        serializer.save(status=get_initial_status(executor))
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        task = serializer.save()
-        if task.executor:
-            task.status = "To Do"
-        else:
-            task.status = "Open"
+        serializer.save(status=get_initial_status(serializer.validated_data.get("executor")))
 
-        task.save()
+    def destroy(self, request, pk, *args, **kwargs):
+        """Удаление задачи со всеми подзадачами каскадом на стороне базы."""
+        deleted = delete_task_subtree(pk)
+        if not deleted:
+            raise NotFound()
 
+        return Response(status=status.HTTP_204_NO_CONTENT, headers={"X-Deleted-Count": deleted})
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+
+class EmployeeViewSet(ConditionalGetMixin, SparseFieldsetsMixin, ValuesListMixin, viewsets.ModelViewSet):
     """ViewSet для сотрудника."""
 
     serializer_class = EmployeeSerializer
     permission_classes = [IsAuthenticated]
     queryset = Employee.objects.all()
+    pagination_class = EmployeePagination
+
+    def get_version_querysets(self):
+        # С параметром ?expand=tasks сотрудник выводится вместе с задачами, и версия учитывает их
+        _, expand = self.get_sparse_fields()
+        if self.action == "retrieve":
+            pk = self.kwargs["pk"]
+            querysets = [Employee.objects.filter(pk=pk), Task.objects.filter(executor=pk)]
+        else:
+            querysets = [Employee.objects.all(), Task.objects.filter(executor__isnull=False)]
+        return querysets if "tasks" in expand else querysets[:1]
+
+    def get_version_tombstones(self):
+        # Удаление сотрудников не отмечается, поэтому для списка сотрудников отправляется только ETag
+        _, expand = self.get_sparse_fields()
+        if self.action == "retrieve" and "tasks" in expand:
+            return TaskTombstone.objects.all()
+        return None
 
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -61,17 +223,31 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         self.perform_update(serializer)
         return Response(serializer.data)
 
+    def destroy(self, request, pk, *args, **kwargs):
+        """Удаление сотрудника с его задачами каскадом на стороне базы."""
+        deleted_employees, deleted_tasks = delete_employee(pk)
+        if not deleted_employees:
+            raise NotFound()
+
+        return Response(
+            status=status.HTTP_204_NO_CONTENT, headers={"X-Deleted-Count": deleted_employees + deleted_tasks}
+        )
+
 
 class BusyEmployeesAPIView(APIView):
     """Представление для занятых сотрудников"""
 
+    def get_queryset(self):
+        return Employee.objects.order_by("-active_tasks_count", "id")
+
     def get(self, request):
-        employees = Employee.objects.annotate(
-            active_tasks_count=Count("tasks", filter=~Q(tasks__status="Closed"))
-        ).order_by("-active_tasks_count")
+        fields, expand = get_sparse_fields(request, EmployeeSerializer)
 
-        serializer = EmployeeSerializer(employees, many=True)
-        return Response(serializer.data)
+        def build():
+            serializer = ValuesSerializer(EmployeeSerializer(fields=fields, expand=expand))
+            return serializer.serialize(serializer.get_queryset(self.get_queryset()))
+
+        return Response(cached_response("busy_employees", request, build))
 
 
 class ImportantTasksViewSet(viewsets.ModelViewSet):
@@ -83,25 +259,76 @@ class ImportantTasksViewSet(viewsets.ModelViewSet):
         return Task.objects.filter(status="Open", parent_task__isnull=False, parent_task__status="In Progress")
 
     def list(self, request, *args, **kwargs):
+        return Response(cached_response("important_tasks", request, self.build_important_tasks))
+
+    def build_important_tasks(self):
         important_tasks = self.get_queryset()
 
         if not important_tasks.exists():
-            return Response({"message": "Важные задачи не найдены", "important_tasks": []})
+            return {"message": "Важные задачи не найдены", "important_tasks": []}
 
         # Информация о сотруднике
-        employees_stats = Employee.objects.annotate(
-            active_tasks_count=Count("tasks", filter=~Q(tasks__status__in=["Closed"]))
-        )
-
-        # Вычисление минимального количества задач у сотрудника
-        min_tasks_count = employees_stats.aggregate(
-            min_tasks=Min("active_tasks_count", filter=~Q(tasks__status__in=["Closed"]))
-        )["min_tasks"]
+        employees_stats = Employee.objects.all()
 
-        recommended_employees = search_employee(important_tasks, employees_stats, min_tasks_count)
+        with timing("search"):
+            recommended_employees = search_employee(important_tasks, employees_stats)
 
         serializer = self.get_serializer(
             important_tasks, many=True, context={"recommended_employees": recommended_employees}
         )
 
-        return Response(serializer.data)
+        with timing("serialize"):
+            return serializer.data
+
+
+class CacheStatsAPIView(APIView):
+    """Представление для статистики кэша ответов."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_cache_stats())
+
+
+class ExportJobViewSet(viewsets.ModelViewSet):
+    """ViewSet для фоновых выгрузок задач и сотрудников в CSV или NDJSON."""
+
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(created_by=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        """Создает выгрузку и запускает ее в фоне. Прогресс доступен по адресу выгрузки."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            job = serializer.save(created_by=request.user)
+            start_export(job)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    def download(self, request, *args, **kwargs):
+        """Файл завершенной выгрузки."""
+        job = self.get_object()
+        if job.status != "done":
+            return Response({"detail": "Выгрузка еще не завершена"}, status=status.HTTP_409_CONFLICT)
+
+        return FileResponse(job.file.open("rb"), as_attachment=True, filename=Path(job.file.name).name)
+
+
+@require_GET
+def metrics(request):
+    """Метрики в текстовом формате Prometheus.
+
+    Нужен заголовок Authorization: Bearer <METRICS_TOKEN>. Без настройки METRICS_TOKEN метрики недоступны,
+    если они не открыты явно настройкой METRICS_PUBLIC.
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if not getattr(settings, "METRICS_PUBLIC", False) and not (
+        token and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}")
+    ):
+        return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+
+    content, content_type = render_metrics()
+    return HttpResponse(content, content_type=content_type)
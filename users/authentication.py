@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Время жизни пользователя в общем кэше (Redis) и в кэше процесса, в секундах.
+# Общий кэш сбрасывается при сохранении пользователя, кэш процесса - только в текущем процессе,
+# поэтому его время жизни короткое: изменения из других процессов видны не позже чем через него.
+USER_CACHE_TIMEOUT = getattr(settings, "USER_CACHE_TIMEOUT", 60)
+USER_LOCAL_CACHE_TIMEOUT = getattr(settings, "USER_LOCAL_CACHE_TIMEOUT", 5)
+USER_LOCAL_CACHE_SIZE = 1024
+
+
+class LocalUserCache:
+    """LRU-кэш пользователей в памяти процесса с ограничением по времени жизни записей."""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[user_id]
+                return None
+
+            self.entries.move_to_end(user_id)
+            return user
+
+    def set(self, user_id, user):
+        with self.lock:
+            self.entries[user_id] = (user, time.monotonic() + self.timeout)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_user_cache = LocalUserCache(USER_LOCAL_CACHE_SIZE, USER_LOCAL_CACHE_TIMEOUT)
+
+
+def get_user_cache_key(user_id):
+    return f"users:user:{user_id}"
+
+
+def invalidate_user(user_id):
+    """Удаляет пользователя из общего кэша и из кэша текущего процесса."""
+    local_user_cache.delete(str(user_id))
+    cache.delete(get_user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация, которая берет пользователя из кэша вместо запроса к базе на каждый запрос.
+
+    Пользователь ищется в кэше процесса, затем в общем кэше и только после этого в базе.
+    Проверки активности и отзыва токена выполняются над закэшированным пользователем.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+
+        user = self.get_cached_user(user_id)
+        if user is None:
+            user = self.load_user(user_id)
+            self.cache_user(user_id, user)
+
+        return self.check_user(user, validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def get_cached_user(self, user_id):
+        user = local_user_cache.get(str(user_id))
+        if user is None:
+            user = cache.get(get_user_cache_key(user_id))
+            if user is not None:
+                local_user_cache.set(str(user_id), user)
+        return user
+
+    def cache_user(self, user_id, user):
+        cache.set(get_user_cache_key(user_id), user, timeout=USER_CACHE_TIMEOUT)
+        local_user_cache.set(str(user_id), user)
+
+    def load_user(self, user_id):
+        try:
+            return self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """JWT-аутентификация с асинхронной загрузкой пользователя для асинхронных представлений.
+
+    Заголовок и токен проверяются так же, как в JWTAuthentication, пользователь берется из кэша
+    или читается через async ORM.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+
+        user = await self.aget_cached_user(user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+            await cache.aset(get_user_cache_key(user_id), user, timeout=USER_CACHE_TIMEOUT)
+            local_user_cache.set(str(user_id), user)
+
+        return self.check_user(user, validated_token)
+
+    async def aget_cached_user(self, user_id):
+        user = local_user_cache.get(str(user_id))
+        if user is None:
+            user = await cache.aget(get_user_cache_key(user_id))
+            if user is not None:
+                local_user_cache.set(str(user_id), user)
+        return user
@@ -0,0 +1,19 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Сбрасывает закэшированного пользователя при изменении, деактивации и удалении.
+
+    Повторный сброс после фиксации транзакции убирает из кэша данные, прочитанные до нее.
+    """
+    invalidate_user(instance.pk)
+    transaction.on_commit(partial(invalidate_user, instance.pk))
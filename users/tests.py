@@ -1,5 +1,15 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
+from tasks import urls as tasks_urls
+from tasks.models import Employee, Task
+from users.authentication import AsyncJWTAuthentication, CachedJWTAuthentication, local_user_cache
 from users.models import User
 
 
@@ -16,3 +26,93 @@ class UserTestCase(APITestCase):
 
         response = self.client.post("/register/", data=data)
         self.assertEqual(response.data.get("username"), "test_username")
+
+
+class CachedJWTAuthenticationTestCase(APITestCase):
+    """Тестирование JWT-аутентификации с кэшированием пользователя."""
+
+    # Запрос к каждому маршруту tasks/urls.py: метод, данные и pk ("task", "employee" или 0)
+    requests = {
+        "tasks/create/": ("post", {}, None),
+        "tasks/bulk_create/": ("post", {}, None),
+        "tasks/bulk_update/": ("patch", {}, None),
+        "tasks/": ("get", None, None),
+        "tasks/changes/": ("get", None, None),
+        "tasks/<int:pk>/": ("get", None, "task"),
+        "tasks/<int:pk>/tree/": ("get", None, "task"),
+        "tasks/<int:pk>/update/": ("patch", {"executor": 0}, "task"),
+        "tasks/<int:pk>/delete/": ("delete", None, 0),
+        "important_tasks/": ("get", None, None),
+        "employees/create/": ("post", {}, None),
+        "employees/": ("get", None, None),
+        "employees/<int:pk>/": ("get", None, "employee"),
+        "employees/<int:pk>/update/": ("patch", {"fullname": ""}, "employee"),
+        "employees/<int:pk>/delete/": ("delete", None, 0),
+        "busy_employees/": ("get", None, None),
+        "async/tasks/": ("get", None, None),
+        "async/tasks/<int:pk>/": ("get", None, "task"),
+        "async/employees/": ("get", None, None),
+        "async/busy_employees/": ("get", None, None),
+        "async/important_tasks/": ("get", None, None),
+        "exports/": ("get", None, None),
+        "exports/<int:pk>/": ("get", None, 0),
+        "exports/<int:pk>/download/": ("get", None, 0),
+        "cache_stats/": ("get", None, None),
+    }
+
+    def setUp(self):
+        cache.clear()
+        local_user_cache.clear()
+
+        self.user = User.objects.create(username="test", password="test", is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+        employee = Employee.objects.create(fullname="Employee", position="Dev")
+        task = Task.objects.create(name="Task", period="2025-08-30T11:49:00Z", executor=employee)
+        self.pks = {"task": task.pk, "employee": employee.pk, 0: 0}
+
+    def request(self, route):
+        method, data, pk = self.requests[route]
+        path = "/" + route.replace("<int:pk>", str(self.pks.get(pk)))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, data, format="json")
+
+        self.assertNotIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        return len(queries)
+
+    def test_every_endpoint_is_one_query_cheaper(self):
+        """Тестирование того, что с закэшированным пользователем каждый эндпоинт выполняет на один запрос меньше."""
+        self.assertEqual(set(self.requests), {str(pattern.pattern) for pattern in tasks_urls.urlpatterns})
+
+        for route in self.requests:
+            with self.subTest(route=route):
+                # Первый запрос заполняет кэш пользователя и кэш ответов
+                self.request(route)
+
+                with (
+                    mock.patch.object(CachedJWTAuthentication, "get_cached_user", return_value=None),
+                    mock.patch.object(AsyncJWTAuthentication, "aget_cached_user", return_value=None),
+                ):
+                    uncached = self.request(route)
+                cached = self.request(route)
+
+                self.assertEqual(uncached - cached, 1)
+
+    def test_user_invalidated_on_save(self):
+        """Тестирование сброса кэша при деактивации пользователя."""
+        self.assertEqual(self.client.get("/tasks/").status_code, status.HTTP_200_OK)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get("/tasks/").status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get("/async/tasks/").status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_invalidated_on_delete(self):
+        """Тестирование сброса кэша при удалении пользователя."""
+        self.assertEqual(self.client.get("/tasks/").status_code, status.HTTP_200_OK)
+
+        self.user.delete()
+
+        self.assertEqual(self.client.get("/tasks/").status_code, status.HTTP_401_UNAUTHORIZED)